@@ -0,0 +1,340 @@
+import argparse
+import hashlib
+import json
+import os
+import pickle
+from datetime import date, datetime, time as dt_time
+
+import numpy as np
+
+import graph_computing as gc
+from build_profile import StageProfiler, write_report
+from graph_builder import assemble_graph, fill_days_since_created, iter_json_items, parse_inputs
+from graph_snapshot import SNAPSHOT_FORMAT_VERSION, write_snapshot
+from influence_engine import InfluenceEngine
+from influence_parallel import solve_components
+from influence_trace import make_trace_sink
+from space_influence import SPACE_LAMBDA
+
+# 构建流程分为 5 个阶段，每个阶段的输出缓存在 cache_dir 下，文件名包含该阶段输入与参数的哈希：
+#   parse        解析 model_metadata / model_tree_raw / author_metadata    -> parse-<key>.pkl
+#   graph        由解析结果组装 DiGraph                                    -> graph-<key>.pkl
+#   features     天数、自身影响力向量与 Space 影响力（依赖参考日期、W1..W4、LAMBDA） -> features-<key>.npz
+#   propagation  影响力传播结果（依赖 ALPHA_1..ALPHA_3、max_iter、tol）     -> propagation-<key>.npy
+#   snapshot     写出 graph.pkl 与列式快照                                 -> snapshot-<key>.json（记录写出的快照）
+# parse 和 graph 只取决于输入文件，与参考日期无关：只修改权重参数或换了一天重新构建时直接从缓存读取；
+# 输入、参数和参考日期都没变时整个构建不做任何事。
+PIPELINE_VERSION = 3  # 阶段输出格式变化时递增，使旧缓存失效
+STAGES = ("parse", "graph", "features", "propagation", "snapshot")
+FEATURE_PARAMS = ("W1", "W2", "W3", "W4", "LAMBDA")
+PROPAGATION_PARAMS = ("ALPHA_1", "ALPHA_2", "ALPHA_3")
+
+
+def file_digest(path, chunk_size=1 << 20):
+    """文件内容的 sha256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def stage_key(stage, *parts):
+    """由阶段名、上游哈希和参数计算该阶段的缓存键"""
+    payload = json.dumps([PIPELINE_VERSION, stage, parts], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class BuildCache:
+    """按 阶段名-哈希 保存各阶段输出的目录，写入时先写临时文件再替换，中断的构建不会留下半个缓存文件"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, stage, key, suffix):
+        return os.path.join(self.cache_dir, f"{stage}-{key}{suffix}")
+
+    def has(self, stage, key, suffix):
+        return os.path.exists(self.path(stage, key, suffix))
+
+    def _commit(self, tmp_path, stage, key, suffix):
+        os.replace(tmp_path, self.path(stage, key, suffix))
+
+    def save_pickle(self, stage, key, obj):
+        tmp_path = self.path(stage, key, ".pkl.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self._commit(tmp_path, stage, key, ".pkl")
+
+    def load_pickle(self, stage, key):
+        with open(self.path(stage, key, ".pkl"), "rb") as f:
+            return pickle.load(f)
+
+    def save_arrays(self, stage, key, **arrays):
+        tmp_path = self.path(stage, key, ".tmp.npz")
+        np.savez(tmp_path, **arrays)
+        self._commit(tmp_path, stage, key, ".npz")
+
+    def load_arrays(self, stage, key):
+        with np.load(self.path(stage, key, ".npz"), allow_pickle=False) as data:
+            return {name: data[name] for name in data.files}
+
+    def save_vector(self, stage, key, x):
+        tmp_path = self.path(stage, key, ".tmp.npy")
+        np.save(tmp_path, x)
+        self._commit(tmp_path, stage, key, ".npy")
+
+    def load_vector(self, stage, key):
+        return np.load(self.path(stage, key, ".npy"))
+
+    def save_json(self, stage, key, obj):
+        tmp_path = self.path(stage, key, ".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(obj, f, ensure_ascii=False, indent=4)
+        self._commit(tmp_path, stage, key, ".json")
+
+    def load_json(self, stage, key):
+        with open(self.path(stage, key, ".json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def snapshot_is_current(marker, graph_pickle, snapshot_dir):
+    """快照阶段的输出是否仍然存在且就是缓存记录中的那一份"""
+    header_path = os.path.join(snapshot_dir, "header.json")
+    if not (os.path.exists(graph_pickle) and os.path.exists(header_path)):
+        return False
+    with open(header_path, "r", encoding="utf-8") as f:
+        header = json.load(f)
+    return (header.get("snapshot_id") == marker.get("snapshot_id")
+            and os.path.abspath(graph_pickle) == marker.get("graph_pickle")
+            and os.path.abspath(snapshot_dir) == marker.get("snapshot_dir"))
+
+
+def run_build(model_metadata_file, space_metadata_file, model_tree_raw_file, author_metadata_file,
+              graph_pickle="graph.pkl", snapshot_dir="graph_snapshot", cache_dir="build_cache",
+              max_iter=100, tol=1e-6, workers=1, small_component_size=1000, today=None, force=False,
+              output_dir="output", profiler=None, profile_report=None):
+    """
+    分阶段构建模型衍生关系图、计算影响力并写出 graph.pkl 与列式快照，每个阶段的输出按输入哈希缓存。
+    权重参数取 graph_computing 中的模块常量（可先用 setattr 修改）。
+    Args:
+        model_metadata_file (str): model_metadata.json 文件路径。
+        space_metadata_file (str): spaces_metadata.json 文件路径。
+        model_tree_raw_file (str): model_tree_raw.json 文件路径。
+        author_metadata_file (str): author_metadata.json 文件路径。
+        graph_pickle (str): 输出的 graph.pkl 路径。
+        snapshot_dir (str): 输出的快照目录。
+        cache_dir (str): 缓存目录。
+        max_iter: 最大迭代次数。
+        tol: 收敛误差阈值。
+        workers: 并行计算影响力的进程数，1 表示单进程迭代。
+        small_component_size: 并行计算时小分量合并的阈值。
+        today (date): 计算天数的参考日期，默认为今天；天数以该日 0 点为参考，保证同一天内重复构建的哈希不变。
+            只影响 features 及之后的阶段，parse 和 graph 的缓存跨日期复用。
+        force (bool): 忽略已有缓存，重新执行所有阶段。
+        output_dir (str): 迭代记录（convergence_summary.json）的输出文件夹。
+        profiler (StageProfiler): 记录各阶段耗时与内存的记录器，默认新建一个。
+        profile_report (str): 构建报告的保存路径，默认为快照目录旁的 <snapshot_dir>.profile.json。
+    Returns:
+        report (dict): 每个阶段的缓存键、执行情况（"cached" / "built" / "skipped"）以及构建报告（profile）。
+    """
+    cache = BuildCache(cache_dir)
+    today = today or date.today()
+    reference_time = datetime.combine(today, dt_time())
+    own_profiler = profiler is None
+    profiler = profiler or StageProfiler()
+
+    # 所有阶段的键都只由输入文件内容和参数决定，先全部算出，再从最后一个阶段往前按需执行
+    with profiler.stage("hash_inputs"):
+        digests = {name: file_digest(path) for name, path in (
+            ("model_metadata", model_metadata_file), ("spaces_metadata", space_metadata_file),
+            ("model_tree_raw", model_tree_raw_file), ("author_metadata", author_metadata_file))}
+    keys = {}
+    keys["parse"] = stage_key("parse", digests["model_metadata"], digests["model_tree_raw"],
+                              digests["author_metadata"])
+    keys["graph"] = stage_key("graph", keys["parse"])
+    keys["features"] = stage_key("features", keys["graph"], digests["spaces_metadata"], today.isoformat(),
+                                 SPACE_LAMBDA, {name: getattr(gc, name) for name in FEATURE_PARAMS})
+    # 并行与单进程的结果在 tol 范围内一致，workers 不参与哈希
+    keys["propagation"] = stage_key("propagation", keys["features"], max_iter, tol,
+                                    {name: getattr(gc, name) for name in PROPAGATION_PARAMS})
+    keys["snapshot"] = stage_key("snapshot", keys["graph"], keys["propagation"], SNAPSHOT_FORMAT_VERSION)
+    report = {"keys": keys, "stages": {}}
+
+    def mark(stage, status):
+        report["stages"][stage] = status
+        print(f"[{stage}] {status} ({keys[stage]})")
+
+    if not force and cache.has("snapshot", keys["snapshot"], ".json") and snapshot_is_current(
+            cache.load_json("snapshot", keys["snapshot"]), graph_pickle, snapshot_dir):
+        for stage in STAGES:
+            mark(stage, "cached")
+        print("Build is up to date.")
+        if own_profiler:
+            profiler.close()
+        return report
+
+    state = {}
+
+    def get_graph():
+        # 图在 features、propagation 和 snapshot 阶段都会用到，只加载一次
+        if "graph" in state:
+            return state["graph"]
+        if not force and cache.has("graph", keys["graph"], ".pkl"):
+            with profiler.stage("graph", status="cached"):
+                state["graph"] = cache.load_pickle("graph", keys["graph"])
+            mark("graph", "cached")
+            return state["graph"]
+        if not force and cache.has("parse", keys["parse"], ".pkl"):
+            with profiler.stage("parse", status="cached"):
+                records = cache.load_pickle("parse", keys["parse"])
+            mark("parse", "cached")
+        else:
+            records = parse_inputs(model_metadata_file, model_tree_raw_file, author_metadata_file,
+                                   profiler=profiler)
+            with profiler.stage("parse.cache_write"):
+                cache.save_pickle("parse", keys["parse"], records)
+            mark("parse", "built")
+        with profiler.stage("graph"):
+            state["graph"] = assemble_graph(records)
+            del records
+            cache.save_pickle("graph", keys["graph"], state["graph"])
+        mark("graph", "built")
+        return state["graph"]
+
+    def get_features():
+        if not force and cache.has("features", keys["features"], ".npz"):
+            with profiler.stage("features", status="cached"):
+                features = cache.load_arrays("features", keys["features"])
+            mark("features", "cached")
+            return features
+        graph = get_graph()
+        with profiler.stage("features"):
+            # 与日期有关的属性在这里按参考日期计算，缓存的图中 days_since_created 为 0
+            days = fill_days_since_created(graph, today=reference_time)
+            engine = InfluenceEngine(graph, dict(iter_json_items(space_metadata_file)), today=reference_time)
+            table = engine.space_table
+            features = {
+                "days_since_created": days,
+                "self_influence": engine.self_influence,
+                "space_influence": table.model_influence(
+                    [graph.nodes[node].get("spaces", []) for node in engine.node_ids]),
+                "space_ids": np.array(table.space_ids, dtype=str),
+                "space_decayed_likes": table.decayed_likes,
+            }
+            cache.save_arrays("features", keys["features"], **features)
+        mark("features", "built")
+        return features
+
+    features = get_features()
+
+    if not force and cache.has("propagation", keys["propagation"], ".npy"):
+        with profiler.stage("propagation", status="cached"):
+            x = cache.load_vector("propagation", keys["propagation"])
+        mark("propagation", "cached")
+    else:
+        graph = get_graph()
+        with profiler.stage("propagation.matrices"):
+            engine = InfluenceEngine(graph, None, self_influence=features["self_influence"])
+        with profiler.stage("propagation"):
+            if workers > 1:
+                x, iterations = solve_components(engine, max_iter=max_iter, tol=tol, workers=workers,
+                                                 small_component_size=small_component_size)
+            else:
+                x, iterations = engine.iterate(max_iter=max_iter, tol=tol,
+                                               trace=make_trace_sink("residual", output_dir))
+            cache.save_vector("propagation", keys["propagation"], x)
+        profiler.count("iterations", iterations)
+        mark("propagation", "built")
+
+    # 写出阶段：把 Space 影响力和最终影响力写回节点属性，再保存 graph.pkl 与快照
+    graph = get_graph()
+    with profiler.stage("snapshot.attributes"):
+        for node, days, space_influence, influence in zip(graph.nodes, features["days_since_created"].tolist(),
+                                                          features["space_influence"].tolist(), x.tolist()):
+            graph.nodes[node]["days_since_created"] = days
+            graph.nodes[node]["space_influence"] = space_influence
+            graph.nodes[node]["influence"] = influence
+        graph.graph["space_influence"] = dict(zip(features["space_ids"].tolist(),
+                                                  features["space_decayed_likes"].tolist()))
+    with profiler.stage("snapshot.pickle"):
+        gc.save_graph_as_pickle(graph, graph_pickle)
+    with profiler.stage("snapshot.columnar"):
+        header = write_snapshot(graph, snapshot_dir)
+    cache.save_json("snapshot", keys["snapshot"], {
+        "snapshot_id": header["snapshot_id"],
+        "graph_pickle": os.path.abspath(graph_pickle),
+        "snapshot_dir": os.path.abspath(snapshot_dir),
+    })
+    mark("snapshot", "built")
+    # 下游阶段命中缓存时，上游阶段不会被执行
+    for stage in STAGES:
+        report["stages"].setdefault(stage, "skipped")
+
+    profiler.count("num_nodes", graph.number_of_nodes())
+    profiler.count("num_edges", graph.number_of_edges())
+    profiler.count("num_spaces", len(features["space_ids"]))
+    profile = profiler.report(snapshot_id=header["snapshot_id"], keys=keys, cache=report["stages"],
+                              workers=workers)
+    report["profile"] = profile
+    profile_path = profile_report or default_profile_path(snapshot_dir)
+    write_report(profile, profile_path)
+    print(f"Build profile written to {profile_path}: {profile['total']['wall_s']:.2f}s, "
+          f"peak RSS {profile['total']['peak_rss_mb'] or 0:.0f} MB")
+    if own_profiler:
+        profiler.close()
+    return report
+
+
+def default_profile_path(snapshot_dir):
+    """构建报告默认写在快照目录旁边：graph_snapshot -> graph_snapshot.profile.json"""
+    return os.path.normpath(snapshot_dir) + ".profile.json"
+
+
+def parse_param(text):
+    """解析 --set NAME=VALUE"""
+    name, sep, value = text.partition("=")
+    if not sep or name not in FEATURE_PARAMS + PROPAGATION_PARAMS:
+        raise argparse.ArgumentTypeError(f"参数格式应为 NAME=VALUE，NAME 为 {FEATURE_PARAMS + PROPAGATION_PARAMS} 之一")
+    return name, float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="分阶段构建模型衍生关系图并计算影响力（带缓存）")
+    parser.add_argument("--model-metadata", default="model_metadata.json")
+    parser.add_argument("--spaces-metadata", default="spaces_metadata.json")
+    parser.add_argument("--model-tree", default="model_tree_raw.json")
+    parser.add_argument("--author-metadata", default="author_metadata.json")
+    parser.add_argument("--graph-pickle", default="graph.pkl")
+    parser.add_argument("--snapshot-dir", default="graph_snapshot")
+    parser.add_argument("--cache-dir", default="build_cache")
+    parser.add_argument("--set", dest="params", type=parse_param, action="append", default=[],
+                        help="覆盖 graph_computing 中的权重参数，例如 --set ALPHA_2=0.25，可重复使用")
+    parser.add_argument("--max-iter", type=int, default=100)
+    parser.add_argument("--tol", type=float, default=1e-6)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="按弱连通分量并行计算影响力的进程数，1 表示单进程")
+    parser.add_argument("--small-component-size", type=int, default=1000,
+                        help="并行计算时小分量合并成一个工作单元的阈值")
+    parser.add_argument("--today", type=date.fromisoformat, default=None,
+                        help="计算天数的参考日期（YYYY-MM-DD），默认为今天")
+    parser.add_argument("--force", action="store_true", help="忽略缓存，重新执行所有阶段")
+    parser.add_argument("--profile-report", default=None,
+                        help="构建报告的保存路径，默认为 <snapshot-dir>.profile.json")
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="不用 tracemalloc 统计各阶段的内存分配（构建更快，报告中没有分配位置）")
+    args = parser.parse_args(argv)
+
+    for name, value in args.params:
+        setattr(gc, name, value)
+    return run_build(args.model_metadata, args.spaces_metadata, args.model_tree, args.author_metadata,
+                     graph_pickle=args.graph_pickle, snapshot_dir=args.snapshot_dir, cache_dir=args.cache_dir,
+                     max_iter=args.max_iter, tol=args.tol, workers=args.workers,
+                     small_component_size=args.small_component_size, today=args.today, force=args.force,
+                     profiler=StageProfiler(trace_memory=not args.no_tracemalloc),
+                     profile_report=args.profile_report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+
+try:
+    import resource  # Windows 上没有该模块，此时不记录峰值 RSS
+except ImportError:
+    resource = None
+
+
+def peak_rss_mb():
+    """进程自启动以来的峰值常驻内存（MB），无法获取时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 上单位为 KB，macOS 上为字节
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+class StageProfiler:
+    """
+    构建阶段的耗时与内存记录器。每个阶段记录墙钟时间、CPU 时间、峰值 RSS、
+    tracemalloc 峰值以及阶段结束时占用内存最多的分配位置。
+    用法：
+        profiler = StageProfiler()
+        with profiler.stage("parse.models"):
+            ...
+        profiler.count("num_nodes", n)
+    阶段不支持嵌套，子步骤用 "parse.models" 这样的带前缀的名字区分。
+    """
+
+    def __init__(self, trace_memory=True, top_allocations=10):
+        """
+        Args:
+            trace_memory (bool): 是否用 tracemalloc 记录 Python 对象的内存分配（会让构建变慢）。
+            top_allocations (int): 每个阶段记录的分配位置个数。
+        """
+        self.trace_memory = trace_memory
+        self.top_allocations = top_allocations
+        self.stages = []
+        self.counts = {}
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    @contextmanager
+    def stage(self, name, status="built"):
+        """
+        记录一个阶段。进入时返回该阶段的记录字典，可在阶段内修改 status（例如命中缓存时改为 "cached"）。
+        """
+        record = {"name": name, "status": status}
+        rss_before = peak_rss_mb()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record["wall_s"] = time.perf_counter() - wall_start
+            record["cpu_s"] = time.process_time() - cpu_start
+            record["peak_rss_mb"] = peak_rss_mb()
+            record["rss_growth_mb"] = None if rss_before is None else record["peak_rss_mb"] - rss_before
+            if self.trace_memory:
+                record["tracemalloc_peak_mb"] = tracemalloc.get_traced_memory()[1] / 2 ** 20
+                record["top_allocations"] = self._top_allocations()
+            self.stages.append(record)
+
+    def _top_allocations(self):
+        """阶段结束时仍存活的内存按分配位置（文件:行号）汇总，取最大的若干项"""
+        # 先按位置汇总再跳过 tracemalloc 自身，比 filter_traces 逐条过滤快得多
+        stats = [stat for stat in tracemalloc.take_snapshot().statistics("lineno")
+                 if stat.traceback[0].filename != tracemalloc.__file__]
+        return [{"where": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                 "size_mb": stat.size / 2 ** 20,
+                 "count": stat.count}
+                for stat in stats[:self.top_allocations]]
+
+    def count(self, name, value):
+        """记录节点数、边数、迭代次数等计数"""
+        self.counts[name] = value
+
+    def report(self, **extra):
+        """汇总为可写成 JSON 的报告，extra 中的键值（如 snapshot_id、缓存键）原样加入"""
+        report = {
+            "started": self.started,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "total": {
+                "wall_s": time.perf_counter() - self._start,
+                "cpu_s": time.process_time() - self._cpu_start,
+                "peak_rss_mb": peak_rss_mb(),
+            },
+            "stages": self.stages,
+            "counts": self.counts,
+        }
+        report.update(extra)
+        return report
+
+    def close(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+
+def profile_stage(profiler, name):
+    """profiler 为 None 时不做记录，供可选接收 profiler 的函数使用"""
+    return nullcontext({}) if profiler is None else profiler.stage(name)
+
+
+def write_report(report, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=4)
+
+
+def load_report(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _relative_change(old, new):
+    if old is None or new is None:
+        return None
+    if old == 0:
+        return 0.0 if new == 0 else float("inf")
+    return (new - old) / old
+
+
+def compare_reports(old, new, threshold=0.2, min_seconds=0.05, min_mb=1.0):
+    """
+    逐阶段比较两份构建报告。
+    墙钟时间增长超过 threshold 比例且绝对值超过 min_seconds，或峰值内存（tracemalloc）增长超过 threshold
+    比例且超过 min_mb，记为回退。
+    Args:
+        old (dict): 基准报告。
+        new (dict): 新报告。
+        threshold (float): 相对增长阈值。
+        min_seconds (float): 忽略的耗时变化下限（秒）。
+        min_mb (float): 忽略的内存变化下限（MB）。
+    Returns:
+        rows (list): 每个阶段的比较结果。
+        regressions (list): 发生回退的 (阶段名, 指标) 列表。
+    """
+    old_stages = {stage["name"]: stage for stage in old["stages"]}
+    new_stages = {stage["name"]: stage for stage in new["stages"]}
+    names = [stage["name"] for stage in new["stages"]]
+    names += [name for name in old_stages if name not in new_stages]
+    checks = (("wall_s", min_seconds), ("tracemalloc_peak_mb", min_mb))
+
+    rows, regressions = [], []
+    for name in names + ["total"]:
+        old_stage = old["total"] if name == "total" else old_stages.get(name, {})
+        new_stage = new["total"] if name == "total" else new_stages.get(name, {})
+        row = {"name": name, "old_status": old_stage.get("status"), "new_status": new_stage.get("status")}
+        for metric in ("wall_s", "cpu_s", "peak_rss_mb", "tracemalloc_peak_mb"):
+            row[metric] = (old_stage.get(metric), new_stage.get(metric),
+                           _relative_change(old_stage.get(metric), new_stage.get(metric)))
+        # 一边命中缓存、另一边实际执行的阶段不具有可比性
+        comparable = name == "total" or row["old_status"] == row["new_status"]
+        for metric, floor in checks:
+            old_value, new_value, change = row[metric]
+            if comparable and change is not None and change > threshold and new_value - old_value > floor:
+                regressions.append((name, metric))
+        rows.append(row)
+    return rows, regressions
+
+
+def _format_value(value, unit):
+    return "-" if value is None else f"{value:.2f}{unit}"
+
+
+def _format_change(change):
+    return "" if change is None else f"{change:+.0%}"
+
+
+def print_comparison(old, new, rows, regressions):
+    print(f"old: {old.get('snapshot_id', '?')} ({old.get('started')})")
+    print(f"new: {new.get('snapshot_id', '?')} ({new.get('started')})")
+    print(f"{'stage':<24}{'wall':>22}{'cpu':>22}{'tracemalloc peak':>26}")
+    for row in rows:
+        cells = []
+        for metric, unit, width in (("wall_s", "s", 22), ("cpu_s", "s", 22), ("tracemalloc_peak_mb", "MB", 26)):
+            old_value, new_value, change = row[metric]
+            cells.append(f"{_format_value(old_value, unit)} -> {_format_value(new_value, unit)} "
+                         f"{_format_change(change)}".rjust(width))
+        status = "" if row["old_status"] == row["new_status"] else f"  ({row['old_status']} -> {row['new_status']})"
+        print(f"{row['name']:<24}{''.join(cells)}{status}")
+
+    old_counts, new_counts = old.get("counts", {}), new.get("counts", {})
+    for name in sorted(set(old_counts) | set(new_counts)):
+        if old_counts.get(name) != new_counts.get(name):
+            print(f"count {name}: {old_counts.get(name)} -> {new_counts.get(name)}")
+    if regressions:
+        print("Regressions: " + ", ".join(f"{name}.{metric}" for name, metric in regressions))
+    else:
+        print("No regressions.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="比较两次构建的耗时与内存报告")
+    parser.add_argument("old", help="基准报告（build_profile.json）")
+    parser.add_argument("new", help="新报告")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定为回退的相对增长比例")
+    parser.add_argument("--min-seconds", type=float, default=0.05, help="忽略小于该值的耗时变化")
+    parser.add_argument("--min-mb", type=float, default=1.0, help="忽略小于该值的内存变化")
+    args = parser.parse_args(argv)
+
+    old, new = load_report(args.old), load_report(args.new)
+    rows, regressions = compare_reports(old, new, threshold=args.threshold, min_seconds=args.min_seconds,
+                                        min_mb=args.min_mb)
+    print_comparison(old, new, rows, regressions)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    # 用法: python build_profile.py old/build_profile.json new/build_profile.json
+    sys.exit(main())
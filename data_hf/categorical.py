@@ -0,0 +1,108 @@
+# categorical.py
+# 分类属性（作者、头像、任务类型、语言等）的共享词表。构建端（graph_builder）和服务端（viz_hf 的 graph_provider、
+# search_index）共用本模块：新版 graph.pkl 构建时已经做过字典编码（graph.graph['categories']），
+# 旧版 graph.pkl 在加载后调用 intern_graph 补做一次，每个 worker 不再为每个节点各保存一份相同的字符串。
+
+import numpy as np
+
+# 在大量模型之间重复出现的节点属性：同一机构的几万个模型各自带着相同的作者名、头像链接、任务类型等字符串
+CATEGORICAL_ATTRIBUTES = ("author", "author_full_name", "org_type", "author_type", "task_type", "pic")
+# 多值属性：每个节点是一个列表，相同的组合共用同一个元组
+MULTI_VALUED_ATTRIBUTES = ("language",)
+
+
+class CategoryVocabulary:
+    """
+    分类属性的字典编码：每个属性一份共享词表，取值在词表中的位置即为编码。
+    节点属性字典中保存的是词表里的同一个字符串对象，而不是各自的副本，
+    因此 attrs.get("author") 等现有用法不变，每个节点只多占一个指针；
+    pickle 会对同一对象只序列化一次，加载后的图同样共享这些字符串。
+    """
+
+    def __init__(self):
+        self.values = {attr: [] for attr in CATEGORICAL_ATTRIBUTES + MULTI_VALUED_ATTRIBUTES}
+        self._codes = {attr: {} for attr in self.values}
+        self._combinations = {attr: {} for attr in MULTI_VALUED_ATTRIBUTES}
+
+    def code(self, attr, value):
+        """取值 -> 编码，第一次出现时加入词表"""
+        codes = self._codes[attr]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.values[attr])
+            self.values[attr].append(value)
+        return code
+
+    def intern(self, attr, value):
+        """返回词表中与 value 相等的那个对象；非字符串（如 None）原样返回"""
+        if not isinstance(value, str):
+            return value
+        return self.values[attr][self.code(attr, value)]
+
+    def intern_many(self, attr, values):
+        """多值属性：把列表换成共享的元组，相同的取值组合只保存一份"""
+        if isinstance(values, str):
+            values = [values]
+        key = tuple(self.intern(attr, value) for value in values or ())
+        return self._combinations[attr].setdefault(key, key)
+
+    def intern_attrs(self, attrs):
+        """原地替换一个节点属性字典中的分类属性"""
+        for attr in CATEGORICAL_ATTRIBUTES:
+            if attr in attrs:
+                attrs[attr] = self.intern(attr, attrs[attr])
+        for attr in MULTI_VALUED_ATTRIBUTES:
+            if attr in attrs:
+                attrs[attr] = self.intern_many(attr, attrs[attr])
+        return attrs
+
+    def to_dict(self):
+        """属性名 -> 词表，随图一起保存在 graph.graph['categories'] 中"""
+        return {attr: list(values) for attr, values in self.values.items()}
+
+    @classmethod
+    def from_dict(cls, categories):
+        """由 graph.graph['categories'] 恢复词表（to_dict 的逆操作）"""
+        vocabulary = cls()
+        for attr, values in categories.items():
+            if attr in vocabulary.values:
+                for value in values:
+                    vocabulary.code(attr, value)
+        return vocabulary
+
+
+def intern_graph(graph, vocabulary=None):
+    """
+    对已有的图（例如旧版本构建的 graph.pkl）做字典编码，原地替换节点属性，并把词表保存到 graph.graph['categories']。
+    未指定 vocabulary 且图已经编码过时不再遍历节点，直接返回图中保存的词表。
+    Returns:
+        vocabulary (CategoryVocabulary): 使用的词表。
+    """
+    if vocabulary is None and "categories" in graph.graph:
+        return CategoryVocabulary.from_dict(graph.graph["categories"])
+    vocabulary = vocabulary or CategoryVocabulary()
+    for node in graph.nodes:
+        vocabulary.intern_attrs(graph.nodes[node])
+    graph.graph["categories"] = vocabulary.to_dict()
+    return vocabulary
+
+
+def category_codes(graph, attr):
+    """
+    按 graph.nodes 的顺序返回某个分类属性的整数编码（int32），取值不在词表中（如 None）时为 -1，
+    便于用 numpy 做分组统计。快照视图直接返回快照中的编码列（内存映射，不做任何解码）。
+    Returns:
+        codes (np.ndarray): 每个节点的编码。
+        vocabulary (list): 编码 -> 取值。
+    """
+    snapshot = getattr(graph, "snapshot", None)
+    if snapshot is not None and attr in snapshot.header["categorical_columns"]:
+        return snapshot.column(attr), snapshot.tables[snapshot.header["categorical_columns"][attr]].tolist()
+    vocabulary = graph.graph.get("categories", {}).get(attr)
+    if vocabulary is None:
+        # 没有编码过，或者词表中缺少该属性：重新编码整个图
+        vocabulary = intern_graph(graph, CategoryVocabulary()).values[attr]
+    lookup = {value: code for code, value in enumerate(vocabulary)}
+    codes = np.fromiter((lookup.get(graph.nodes[node].get(attr), -1) for node in graph.nodes),
+                        dtype=np.int32, count=len(graph.nodes))
+    return codes, vocabulary
@@ -0,0 +1,278 @@
+import json
+from datetime import datetime
+
+import easygraph as eg
+import numpy as np
+
+from build_profile import StageProfiler, profile_stage
+from categorical import CategoryVocabulary
+
+_JSON_WHITESPACE = " \t\r\n"
+_JSON_NUMBER_CHARS = "0123456789+-.eE"
+
+
+def iter_json_items(file_path, chunk_size=1 << 20):
+    """
+    以流式方式逐个产出顶层 JSON 对象中的 (key, value)，避免 json.load 一次性读入整个文件。
+    Args:
+        file_path (str): JSON 文件路径，顶层必须是一个对象。
+        chunk_size (int): 每次从文件读取的字符数。
+    Yields:
+        (key, value): 顶层对象的键值对，value 为完整解析后的 Python 对象。
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buf, pos, eof = '', 0, False
+        read_size = chunk_size
+
+        def read_more():
+            # 丢弃已解析部分，并追加新的数据块
+            nonlocal buf, pos, eof
+            chunk = f.read(read_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_whitespace():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _JSON_WHITESPACE:
+                    pos += 1
+                if pos < len(buf) or not read_more():
+                    return
+
+        def decode_value():
+            nonlocal pos, read_size
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # 当前缓冲区里的值不完整，加大读取量后重试，避免大对象被反复从头解析
+                    read_size *= 2
+                    read_more()
+                    continue
+                # 数字可能在缓冲区末尾被截断（如 "1.5e" 只解析出 1.5），需要确认其后还有分隔符
+                if not eof and (end == len(buf) or buf[end] in _JSON_NUMBER_CHARS) and read_more():
+                    continue
+                pos = end
+                read_size = chunk_size
+                return obj
+
+        def expect(char):
+            nonlocal pos
+            skip_whitespace()
+            if buf[pos:pos + 1] != char:
+                raise ValueError(f"{file_path} 格式错误：位置 {pos} 处应为 '{char}'")
+            pos += 1
+
+        expect('{')
+        skip_whitespace()
+        if buf[pos:pos + 1] == '}':
+            return
+        while True:
+            skip_whitespace()
+            key = decode_value()
+            expect(':')
+            skip_whitespace()
+            value = decode_value()
+            yield key, value
+            skip_whitespace()
+            if buf[pos:pos + 1] == ',':
+                pos += 1
+                continue
+            expect('}')
+            return
+
+
+def batch_days_since(date_strs, today=None):
+    """
+    批量计算从给定日期到今天的天数，结果与逐个调用 graph_computing.days_since 一致。
+    Args:
+        date_strs (list): 日期字符串列表，支持 "%Y-%m-%d" 和 "%Y-%m-%d %H:%M:%S" 两种格式。
+        today (datetime): 参考时间，默认为当前时间。
+    Returns:
+        np.ndarray: int64 天数数组。
+    """
+    today = np.datetime64(today or datetime.now(), 's')
+    # numpy 的 ISO 格式用 'T' 分隔日期与时间
+    stamps = np.array([s.replace(' ', 'T') for s in date_strs], dtype='datetime64[s]')
+    # 向下取整，与 timedelta.days 的语义相同
+    return (today - stamps) // np.timedelta64(1, 'D')
+
+
+def load_author_index(author_metadata_file):
+    """
+    读取 author_metadata.json，构建 作者名 -> (pic, author_type, author_full_name, org_type) 的哈希索引。
+    """
+    author_index = {}
+    for author_name, author_data in iter_json_items(author_metadata_file):
+        author_type = author_data.get("type", "unknown")
+        if author_type == 'org':
+            org_type = author_data.get("nature", "anonymous")
+        else:
+            org_type = "individual"
+        author_index[author_name] = (
+            author_data.get("photo", "unknown"),
+            author_type,
+            author_data.get("full_name", author_name),
+            org_type,
+        )
+    return author_index
+
+
+def read_model_records(model_metadata_file, author_index, vocabulary=None):
+    """
+    逐条读取模型元数据并与作者索引连接，生成节点属性（days_since_created 暂为 0，见 fill_days_since_created）。
+    Args:
+        model_metadata_file (str): model_metadata.json 文件路径。
+        author_index (dict): load_author_index 的返回值。
+        vocabulary (CategoryVocabulary): 分类属性的共享词表，给出时节点属性中的重复字符串共用同一份。
+    Returns:
+        model_names (list): 模型名。
+        model_attrs (list): 与 model_names 一一对应的节点属性字典。
+    """
+    model_names = []
+    model_attrs = []
+    for model_name, metadata in iter_json_items(model_metadata_file):
+        author = metadata.get("author", "unknown")
+        created_at = metadata.get("created_at", "1970-01-01")
+        # 作者缺失时使用与 build_graph 相同的默认值
+        pic, author_type, author_full_name, org_type = author_index.get(
+            author, ("unknown", "unknown", author, "individual"))
+        model_names.append(model_name)
+        attrs = dict(
+            downloads=metadata.get("downloads", 0),
+            likes=metadata.get("likes", 0),
+            author=author,
+            org_type=org_type,
+            author_full_name=author_full_name,
+            created_at=created_at,
+            days_since_created=0,
+            language=metadata.get("language", []),
+            spaces=metadata.get("spaces", []),
+            pic=pic,
+            author_type=author_type,
+            task_type=metadata.get("pipeline_tag", "unknown"),
+            influence=0.0  # 初始影响力设为 0
+        )
+        if vocabulary is not None:
+            vocabulary.intern_attrs(attrs)
+        model_attrs.append(attrs)
+    return model_names, model_attrs
+
+
+def iter_edges(model_tree_raw_file, known_models):
+    """
+    逐条产出 model_tree_raw 中的衍生关系 (base_model, derived_model, derivation_type)，
+    只保留衍生模型存在于元数据中的边。
+    """
+    for base_model, derived_info in iter_json_items(model_tree_raw_file):
+        for derivation_type, derived_models in derived_info.items():
+            for derived_model in derived_models:
+                if derived_model in known_models:  # 确保衍生模型存在于元数据中
+                    yield base_model, derived_model, derivation_type
+
+
+def parse_inputs(model_metadata_file, model_tree_raw_file, author_metadata_file, profiler=None):
+    """
+    解析构图所需的全部输入，得到与图结构无关的纯数据记录，便于缓存（见 build_pipeline.py）。
+    结果只取决于输入文件，与构建日期无关；days_since_created 由 fill_days_since_created 另外填入。
+    Args:
+        model_metadata_file (str): model_metadata.json 文件路径。
+        model_tree_raw_file (str): model_tree_raw.json 文件路径。
+        author_metadata_file (str): author_metadata.json 文件路径。
+        profiler (StageProfiler): 可选，按 parse.authors / parse.models / parse.edges 记录各步骤。
+    Returns:
+        records (dict): model_names、model_attrs（days_since_created 为 0，分类属性已做字典编码）、
+            edges 列表以及分类属性词表 categories。
+    """
+    vocabulary = CategoryVocabulary()
+    with profile_stage(profiler, "parse.authors"):
+        author_index = load_author_index(author_metadata_file)
+    with profile_stage(profiler, "parse.models"):
+        model_names, model_attrs = read_model_records(model_metadata_file, author_index, vocabulary)
+    with profile_stage(profiler, "parse.edges"):
+        edges = list(iter_edges(model_tree_raw_file, set(model_names)))
+    return {"model_names": model_names, "model_attrs": model_attrs, "edges": edges,
+            "categories": vocabulary.to_dict()}
+
+
+def assemble_graph(records):
+    """
+    由 parse_inputs 的结果构建 easygraph 的 DiGraph，节点和边属性与 build_graph 相同。
+    """
+    G = eg.DiGraph()
+    for model_name, attrs in zip(records["model_names"], records["model_attrs"]):
+        G.add_node(model_name, **attrs)
+    for base_model, derived_model, derivation_type in records["edges"]:
+        G.add_edge(
+            base_model,
+            derived_model,
+            type=derivation_type,
+            influence_weight=1.0  # 初始影响力权重设为 1
+        )
+    G.graph["categories"] = records["categories"]
+    return G
+
+
+def fill_days_since_created(graph, today=None):
+    """
+    按参考时间批量计算每个节点的 days_since_created 并写入节点属性。
+    Args:
+        graph: assemble_graph 生成的 DiGraph。
+        today (datetime): 参考时间，默认为当前时间。
+    Returns:
+        days (np.ndarray): 顺序与 graph.nodes 相同的天数数组。
+    """
+    days = batch_days_since([attrs.get("created_at") or "1970-01-01" for attrs in graph.nodes.values()],
+                            today=today)
+    for attrs, days_since_created in zip(graph.nodes.values(), days.tolist()):
+        attrs["days_since_created"] = days_since_created
+    return days
+
+
+def build_graph_streaming(base_models, model_metadata_file, space_metadata_file, model_tree_raw_file,
+                          author_metadata_file, trace_memory=True, today=None, profiler=None):
+    """
+    build_graph 的流式版本：作者信息只做一次哈希连接，JSON 文件逐条解析，日期批量转换为天数。
+    即 assemble_graph(parse_inputs(...)) 再填入 days_since_created，生成的节点和边属性与 build_graph 相同。
+    Args:
+        base_models (list): 包含所有 base 模型名字的列表。
+        model_metadata_file (str): model_metadata.json 文件路径。
+        space_metadata_file (str): space_metadata.json 文件路径（构图时不需要，保留以兼容 build_graph 的参数）。
+        model_tree_raw_file (str): model_tree_raw.json 文件路径。
+        author_metadata_file (str): author_metadata.json 文件路径。
+        trace_memory (bool): 是否使用 tracemalloc 统计峰值内存（未传入 profiler 时有效）。
+        today (datetime): 计算 days_since_created 的参考时间，默认为当前时间。
+        profiler (StageProfiler): 可选，记录到调用方的 profiler 中，默认新建一个。
+    Returns:
+        graph: easygraph 的 DiGraph 表示模型网络。
+        report (dict): StageProfiler 的报告，包括各阶段耗时、峰值内存以及节点、边数量。
+    """
+    own_profiler = profiler is None
+    if own_profiler:
+        profiler = StageProfiler(trace_memory=trace_memory)
+    try:
+        records = parse_inputs(model_metadata_file, model_tree_raw_file, author_metadata_file, profiler=profiler)
+        with profiler.stage("graph"):
+            G = assemble_graph(records)
+            del records
+        with profiler.stage("graph.dates"):
+            fill_days_since_created(G, today=today)
+        profiler.count("num_nodes", G.number_of_nodes())
+        profiler.count("num_edges", G.number_of_edges())
+        report = profiler.report()
+    finally:
+        if own_profiler:
+            profiler.close()
+    print(f"Graph built: {G.number_of_nodes()} nodes, {G.number_of_edges()} edges, "
+          f"{report['total']['wall_s']:.2f}s")
+    peaks = [stage["tracemalloc_peak_mb"] for stage in report["stages"] if "tracemalloc_peak_mb" in stage]
+    if peaks:
+        print(f"Peak memory during build: {max(peaks):.1f} MB")
+    return G, report
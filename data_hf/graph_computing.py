@@ -1,6 +1,7 @@
 import easygraph as eg
 import json
 import math
+import pickle
 from datetime import datetime
 
 def days_since(date_str):
@@ -93,22 +94,6 @@ def build_graph(base_models, model_metadata_file, space_metadata_file, model_tre
                     )
     return G
 
-# 示例文件路径
-base_models_file = "basemodels_top1000_likes.txt"
-model_metadata_file = "model_metadata.json"
-space_metadata_file = "spaces_metadata.json"
-model_tree_raw_file = "model_tree_raw.json"
-author_metadata_file = "author_metadata.json"
-
-# 读取 base_models.txt
-with open(base_models_file, 'r', encoding='utf-8') as f:
-    base_models = [line.strip() for line in f]
-
-# 构建图
-graph = build_graph(base_models, model_metadata_file, space_metadata_file, model_tree_raw_file, author_metadata_file)
-
-
-import os
 
 
 # 权重参数
@@ -162,7 +147,7 @@ def compute_self_influence(node_attrs, spaces_metadata):
     return W1 * math.log(max(downloads, 1)) + W2 * likes + W3 * space_influence + W4 * time_factor
 
 
-def compute_influence(graph, spaces_metadata, max_iter=100, tol=1e-6, output_dir="output"):
+def compute_influence(graph, spaces_metadata, max_iter=100, tol=1e-6, output_dir="output", trace="full"):
     """
     计算图中每个节点的影响力值
     Args:
@@ -171,11 +156,15 @@ def compute_influence(graph, spaces_metadata, max_iter=100, tol=1e-6, output_dir
         max_iter: 最大迭代次数。
         tol: 收敛误差阈值。
         output_dir: 输出迭代结果的文件夹路径。
+        trace: 迭代过程的记录方式，见 influence_trace.make_trace_sink；"full" 为每轮写出完整排序结果。
     Returns:
         influences: 每个节点的最终影响力字典。
     """
-    # 检查并创建输出目录
-    os.makedirs(output_dir, exist_ok=True)
+    from influence_trace import make_trace_sink
+
+    sink = make_trace_sink(trace, output_dir)
+    sink.open(list(graph.nodes))
+    converged = False
 
     # 初始化影响力为自身影响力
     influences = {node: compute_self_influence(graph.nodes[node], spaces_metadata) for node in graph.nodes}
@@ -211,12 +200,8 @@ def compute_influence(graph, spaces_metadata, max_iter=100, tol=1e-6, output_dir
         diff = sum(abs(new_influences[node] - influences[node]) for node in graph.nodes)
         print(f"Iteration {iteration}: Total Difference = {diff}")
 
-        # 写入每次迭代的结果到文件
-        output_file = os.path.join(output_dir, f"iteration_{iteration + 1}.txt")
-        with open(output_file, "w", encoding="utf-8") as f:
-            sorted_results = sorted(new_influences.items(), key=lambda x: x[1], reverse=True)
-            for model, influence in sorted_results:
-                f.write(f"{model}: {influence}\n")
+        # 记录本轮迭代结果
+        sink.record(iteration + 1, diff, new_influences)
 
         # 更新影响力值
         influences = new_influences
@@ -224,7 +209,9 @@ def compute_influence(graph, spaces_metadata, max_iter=100, tol=1e-6, output_dir
         # 如果误差小于阈值，认为收敛
         if diff < tol:
             print("Convergence achieved.")
+            converged = True
             break
+    sink.close(converged)
     # 更新图中每个节点的 `influence` 属性
     for node, influence in influences.items():
         graph.nodes[node]['influence'] = influence
@@ -232,28 +219,39 @@ def compute_influence(graph, spaces_metadata, max_iter=100, tol=1e-6, output_dir
     return influences
 
 
+def compute_influence_approx(graph, spaces_metadata, error_bound=1e-3, time_budget=None, top_k=100):
+    """
+    近似计算影响力（forward push），用于新数据到达后快速预览排名。
+    达到误差上界 error_bound 或时间预算 time_budget（秒）时停止，任意时刻每个节点的误差都不超过返回的上界。
+    Args:
+        graph: easygraph 的 DiGraph，包含节点和边的属性。
+        spaces_metadata: spaces 元数据，用于计算 space 影响力。
+        error_bound: 每个节点影响力的目标误差上界。
+        time_budget: 时间预算（秒），None 表示不限。
+        top_k: 报告排名前 top_k 的节点中有多少已经可以确定。
+    Returns:
+        influences: 每个节点的影响力估计值字典。
+        residuals: 每个节点剩余的残差字典。
+        report: 推送轮数、误差上界、耗时等统计。
+    """
+    from influence_engine import InfluenceEngine
 
+    engine = InfluenceEngine(graph, spaces_metadata)
+    x, residual, report = engine.approximate(error_bound=error_bound, time_budget=time_budget, top_k=top_k)
+    influences = engine.write_back(x)
+    residuals = dict(zip(engine.node_ids, residual.tolist()))
+    return influences, residuals, report
 
-# 读取 spaces_metadata.json
-with open("spaces_metadata.json", "r", encoding="utf-8") as f:
-    spaces_metadata = json.load(f)
-
-# 计算图中每个节点的最终影响力
-influence_results = compute_influence(graph, spaces_metadata, max_iter=100, tol=1e-6, output_dir="output")
-
-
-
-
-
-
-
-
-import pickle
 
 def save_graph_as_pickle(graph, file_path):
     """将 EasyGraph 图保存为 Pickle 文件"""
     with open(file_path, "wb") as f:
         pickle.dump(graph, f)
 
-# 示例：保存图为 Pickle 文件
-save_graph_as_pickle(graph, "graph.pkl")
+
+if __name__ == "__main__":
+    # 分阶段构建（带缓存）：解析 -> 组装图 -> 自身影响力特征 -> 影响力传播 -> 写出 graph.pkl 与快照
+    # 参数见 python build_pipeline.py --help
+    from build_pipeline import main
+
+    main()
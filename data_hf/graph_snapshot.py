@@ -0,0 +1,209 @@
+import json
+import os
+import pickle
+import shutil
+import sys
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+from growth_rollup import build_rollup
+
+# 快照目录结构（所有数组均为 .npy，可用 np.load(mmap_mode='r') 直接映射）：
+#   header.json                     格式版本、节点/边数量、各列说明、边类型表
+#   str_<table>_blob.npy            字符串表：所有字符串的 UTF-8 字节拼接（uint8）
+#   str_<table>_offsets.npy         字符串表：每个字符串在 blob 中的起止位置（int64，长度为字符串数 + 1）
+#   <column>.npy                    节点列，第 i 个元素对应 model_id 字符串表中的第 i 个模型
+#   created_at.npy / created_at_code.npy / str_created_at_*.npy
+#                                   创建日期：天数（按日期筛选、汇总用）与原始字符串（展示、排序用，保留时间部分）
+#   language_indptr.npy / language.npy               每个节点的语言列表（CSR）
+#   succ_indptr.npy / succ_indices.npy / succ_type.npy  出边（子模型）CSR 与边类型
+#   pred_indptr.npy / pred_indices.npy / pred_type.npy  入边（父模型）CSR 与边类型
+#   rollup_<维度>_<指标>.npy / str_rollup_<维度>_*.npy   按创建月份的增长立方体（月 × 分组）与分组名，见 growth_rollup.py
+SNAPSHOT_FORMAT = "llm-eco-viz-graph-snapshot"
+SNAPSHOT_FORMAT_VERSION = 3
+MISSING_DATE = np.iinfo(np.int32).min  # created_at 缺失时的取值
+MISSING_CODE = -1  # 分类属性为 None 时的编码
+
+# 以字符串表编码的分类属性：列名 -> 字符串表名
+CATEGORICAL_COLUMNS = {
+    "author": "author",
+    "author_full_name": "author_full_name",
+    "author_type": "author_type",
+    "org_type": "org_type",
+    "task_type": "task_type",
+    "pic": "pic",
+}
+# 数值列：列名 -> (dtype, 缺失时的默认值)
+NUMERIC_COLUMNS = {
+    "downloads": (np.int64, 0),
+    "likes": (np.int64, 0),
+    "influence": (np.float64, 0.0),
+    "space_influence": (np.float64, 0.0),
+}
+
+
+def encode_strings(values):
+    """
+    对字符串序列做字典编码。
+    Returns:
+        vocab (list): 按首次出现顺序排列的不重复字符串。
+        codes (np.ndarray): int32 编码，None 编码为 MISSING_CODE。
+    """
+    vocab, lookup = [], {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, value in enumerate(values):
+        if value is None:
+            codes[i] = MISSING_CODE
+            continue
+        value = str(value)
+        code = lookup.get(value)
+        if code is None:
+            code = lookup[value] = len(vocab)
+            vocab.append(value)
+        codes[i] = code
+    return vocab, codes
+
+
+def string_table_arrays(strings):
+    """把字符串列表编码为 (blob, offsets) 两个数组"""
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.int64)
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+def date_column(date_strs):
+    """把 created_at 字符串转换为自 1970-01-01 起的天数（int32），缺失或无法解析的记为 MISSING_DATE"""
+    days = np.full(len(date_strs), MISSING_DATE, dtype=np.int32)
+    for i, value in enumerate(date_strs):
+        if not value:
+            continue
+        try:
+            days[i] = np.datetime64(str(value)[:10], 'D').astype(np.int64)
+        except ValueError:
+            continue
+    return days
+
+
+def adjacency_arrays(adjacency, index, edge_type_lookup):
+    """把 {节点: {邻居: 边属性}} 转换为 CSR 数组 (indptr, indices, edge_type)"""
+    indptr = np.zeros(len(index) + 1, dtype=np.int64)
+    indices, types = [], []
+    for node, i in index.items():
+        neighbors = adjacency.get(node, {})
+        for neighbor, edge_attrs in neighbors.items():
+            indices.append(index[neighbor])
+            edge_type = edge_attrs.get("type", "unknown")
+            if edge_type not in edge_type_lookup:
+                edge_type_lookup[edge_type] = len(edge_type_lookup)
+            types.append(edge_type_lookup[edge_type])
+        indptr[i + 1] = len(indices)
+    return indptr, np.asarray(indices, dtype=np.int32), np.asarray(types, dtype=np.uint8)
+
+
+def write_snapshot(graph, snapshot_dir):
+    """
+    将 EasyGraph 图写成列式快照目录。先写入临时目录，完成后改名替换，读取方不会看到写了一半的快照。
+    替换不是原子的：旧目录先改名移走、新目录再改名就位，两次改名之间 snapshot_dir 短暂不存在，
+    读取方需要容忍这一间隙（viz_hf/graph_provider.py 在此期间保持当前的快照）。
+    Args:
+        graph: easygraph 的 DiGraph，节点属性与 build_graph 生成的一致。
+        snapshot_dir (str): 快照目录路径。
+    Returns:
+        header (dict): 写入的 header.json 内容。
+    """
+    node_ids = list(graph.nodes)
+    index = {node: i for i, node in enumerate(node_ids)}
+    attrs = [graph.nodes[node] for node in node_ids]
+    arrays = {}
+
+    tables = {"model_id": node_ids}
+    for column, table in CATEGORICAL_COLUMNS.items():
+        tables[table], arrays[column] = encode_strings([a.get(column) for a in attrs])
+    for column, (dtype, default) in NUMERIC_COLUMNS.items():
+        arrays[column] = np.fromiter((a.get(column, default) or default for a in attrs), dtype=dtype,
+                                     count=len(attrs))
+    created_ats = [a.get("created_at") for a in attrs]
+    arrays["created_at"] = date_column(created_ats)
+    # 天数丢掉了时间部分，原样保存字符串，读取的结果与 graph.pkl 相同
+    tables["created_at"], arrays["created_at_code"] = encode_strings(created_ats)
+
+    # 语言为多值属性，用 CSR 存储
+    language_lists = []
+    for a in attrs:
+        languages = a.get("language") or []
+        language_lists.append([languages] if isinstance(languages, str) else list(languages))
+    tables["language"], arrays["language"] = encode_strings([lang for langs in language_lists for lang in langs])
+    arrays["language_indptr"] = np.zeros(len(attrs) + 1, dtype=np.int64)
+    arrays["language_indptr"][1:] = np.cumsum([len(langs) for langs in language_lists])
+
+    edge_type_lookup = {}
+    arrays["succ_indptr"], arrays["succ_indices"], arrays["succ_type"] = adjacency_arrays(
+        graph.adj, index, edge_type_lookup)
+    arrays["pred_indptr"], arrays["pred_indices"], arrays["pred_type"] = adjacency_arrays(
+        graph.pred, index, edge_type_lookup)
+
+    # 构图时预先计算的 Space 影响力表（见 space_influence.SpaceTable）
+    space_table = getattr(graph, "graph", {}).get("space_influence") or {}
+    tables["space_id"] = list(space_table)
+    arrays["space_table_influence"] = np.fromiter(space_table.values(), dtype=np.float64, count=len(space_table))
+
+    # 增长曲线用的月 × 分组立方体
+    rollup_tables, rollup_arrays, rollup_info = build_rollup(arrays, tables, list(edge_type_lookup), MISSING_DATE)
+    tables.update(rollup_tables)
+    arrays.update(rollup_arrays)
+
+    header = {
+        "format": SNAPSHOT_FORMAT,
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "snapshot_id": uuid.uuid4().hex,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "num_nodes": len(node_ids),
+        "num_edges": int(arrays["succ_indices"].size),
+        "edge_types": list(edge_type_lookup),
+        "string_tables": {table: len(strings) for table, strings in tables.items()},
+        "categorical_columns": CATEGORICAL_COLUMNS,
+        "numeric_columns": {column: np.dtype(dtype).name for column, (dtype, _) in NUMERIC_COLUMNS.items()},
+        "missing_date": int(MISSING_DATE),
+        "missing_code": MISSING_CODE,
+        "rollup": rollup_info,
+    }
+
+    tmp_dir = f"{snapshot_dir}.tmp-{header['snapshot_id']}"
+    os.makedirs(tmp_dir)
+    for table, strings in tables.items():
+        blob, offsets = string_table_arrays(strings)
+        np.save(os.path.join(tmp_dir, f"str_{table}_blob.npy"), blob)
+        np.save(os.path.join(tmp_dir, f"str_{table}_offsets.npy"), offsets)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+    with open(os.path.join(tmp_dir, "header.json"), "w", encoding="utf-8") as f:
+        json.dump(header, f, ensure_ascii=False, indent=4)
+
+    # 用新目录替换旧目录（两次改名之间目录不存在，见上）；已经映射了旧文件的读取方不受影响
+    old_dir = f"{snapshot_dir}.old-{header['snapshot_id']}"
+    if os.path.exists(snapshot_dir):
+        os.replace(snapshot_dir, old_dir)
+    os.replace(tmp_dir, snapshot_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return header
+
+
+def convert_pickle(pickle_path, snapshot_dir):
+    """把已有的 graph.pkl 转换为列式快照"""
+    with open(pickle_path, "rb") as f:
+        graph = pickle.load(f)
+    return write_snapshot(graph, snapshot_dir)
+
+
+if __name__ == "__main__":
+    # 用法: python graph_snapshot.py graph.pkl graph_snapshot
+    if len(sys.argv) != 3:
+        print("Usage: python graph_snapshot.py <graph.pkl> <snapshot_dir>")
+        sys.exit(1)
+    header = convert_pickle(sys.argv[1], sys.argv[2])
+    print(f"Snapshot {header['snapshot_id']} written to {sys.argv[2]}: "
+          f"{header['num_nodes']} nodes, {header['num_edges']} edges")
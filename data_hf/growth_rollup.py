@@ -0,0 +1,145 @@
+# growth_rollup.py
+# 生态增长的时间序列汇总：按模型的创建月份，统计每个分组（任务类型、机构类型、语言、衍生方式）的
+# 新增模型数、下载量和影响力，得到 月 × 分组 的小立方体。写快照时一次算好（见 graph_snapshot.write_snapshot），
+# 大屏的增长曲线只需对立方体切片，不必扫描全图。读取见 viz_hf/global_dashboard/timeline.py。
+
+import numpy as np
+
+ROLLUP_DIMENSIONS = ("total", "task_type", "org_type", "language", "derivation")
+# 指标 -> dtype；下载量用整数累加，不经过浮点数
+ROLLUP_METRICS = {"count": np.int64, "downloads": np.int64, "influence": np.float64}
+# 取值缺失（或为空字符串）时的分组名，与大屏的分组统计一致
+DEFAULT_LABELS = {"task_type": "Unknown", "org_type": "_unauthorized", "language": "Unknown"}
+TOTAL_LABEL = "all"
+BASE_LABEL = "_base"  # 没有父模型的模型在 derivation 维度上的分组
+
+
+def month_index(days):
+    """自 1970-01-01 起的天数 -> 自 1970-01 起的月数"""
+    return np.asarray(days, dtype="datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def relabel(codes, vocabulary, default):
+    """
+    把分类编码换成分组编码：缺失（-1）或空字符串记为 default，同名的分组合并。
+    Returns:
+        groups (np.ndarray): 每个元素的分组编码。
+        labels (list): 分组名。
+    """
+    labels, lookup = [], {}
+    # 最后一项对应编码 -1
+    mapping = np.empty(len(vocabulary) + 1, dtype=np.int64)
+    for code, value in enumerate(list(vocabulary) + [None]):
+        label = value or default
+        if label not in lookup:
+            lookup[label] = len(labels)
+            labels.append(label)
+        mapping[code] = lookup[label]
+    return mapping[np.asarray(codes, dtype=np.int64)], labels
+
+
+def multi_valued(indptr, codes, num_codes):
+    """
+    CSR 形式的多值属性 -> 不重复的 (节点, 编码) 对。
+    Returns:
+        nodes, codes (np.ndarray): 同一节点的同一编码只出现一次。
+    """
+    indptr = np.asarray(indptr, dtype=np.int64)
+    owners = np.repeat(np.arange(indptr.size - 1, dtype=np.int64), np.diff(indptr))
+    pairs = np.unique(owners * num_codes + np.asarray(codes, dtype=np.int64))
+    return pairs // num_codes, pairs % num_codes
+
+
+def monthly_cube(months, num_months, nodes, groups, num_groups, downloads, influence):
+    """
+    按 (月, 分组) 累加各项指标。
+    Args:
+        months (np.ndarray): 每个节点的创建月份（相对于第一个月），没有日期的节点为 -1。
+        nodes, groups (np.ndarray): 第 k 项表示节点 nodes[k] 属于分组 groups[k]（多值维度中一个节点可以出现多次）。
+    Returns:
+        dict: 指标 -> (num_months, num_groups) 的数组。
+    """
+    dated = months[nodes] >= 0
+    nodes, groups = nodes[dated], groups[dated]
+    cells = months[nodes] * num_groups + groups
+    size = num_months * num_groups
+    cube_downloads = np.zeros(size, dtype=np.int64)
+    np.add.at(cube_downloads, cells, downloads[nodes])
+    return {
+        "count": np.bincount(cells, minlength=size).astype(np.int64).reshape(num_months, num_groups),
+        "downloads": cube_downloads.reshape(num_months, num_groups),
+        "influence": np.bincount(cells, weights=influence[nodes], minlength=size).reshape(num_months, num_groups),
+    }
+
+
+def build_rollup(arrays, tables, edge_types, missing_date):
+    """
+    由快照的列计算增长立方体。
+    Args:
+        arrays (dict): 快照的数组（created_at、downloads、influence、task_type、org_type、
+            language_indptr/language、pred_indptr/pred_type）。
+        tables (dict): 快照的字符串表（task_type、org_type、language）。
+        edge_types (list): 边类型表。
+        missing_date (int): created_at 缺失时的取值。
+    Returns:
+        rollup_tables (dict): 每个维度的分组名，表名为 rollup_<维度>。
+        rollup_arrays (dict): rollup_<维度>_<指标> -> (月数, 分组数) 的数组。
+        info (dict): 写入 header.json 的说明（第一个月、月数、维度、指标、没有创建日期的模型数）。
+    """
+    created_at = np.asarray(arrays["created_at"], dtype=np.int64)
+    dated = created_at != missing_date
+    num_nodes = created_at.size
+    months = np.full(num_nodes, -1, dtype=np.int64)
+    if dated.any():
+        absolute = month_index(created_at[dated])
+        first_month = int(absolute.min())
+        months[dated] = absolute - first_month
+        num_months = int(months.max()) + 1
+    else:
+        first_month, num_months = 0, 0
+    downloads = np.asarray(arrays["downloads"], dtype=np.int64)
+    influence = np.asarray(arrays["influence"], dtype=np.float64)
+    all_nodes = np.arange(num_nodes, dtype=np.int64)
+
+    memberships = {"total": (all_nodes, np.zeros(num_nodes, dtype=np.int64), [TOTAL_LABEL])}
+    for dimension in ("task_type", "org_type"):
+        groups, labels = relabel(arrays[dimension], tables[dimension], DEFAULT_LABELS[dimension])
+        memberships[dimension] = (all_nodes, groups, labels)
+
+    # 语言：模型计入其语言列表中的每一种语言，列表为空时计入 Unknown
+    language_indptr = np.asarray(arrays["language_indptr"], dtype=np.int64)
+    language_groups, labels = relabel(arrays["language"], tables["language"], DEFAULT_LABELS["language"])
+    nodes, groups = multi_valued(language_indptr, language_groups, len(labels))
+    unknown = labels.index("Unknown") if "Unknown" in labels else len(labels)
+    if unknown == len(labels):
+        labels.append("Unknown")
+    empty = np.flatnonzero(np.diff(language_indptr) == 0)
+    memberships["language"] = (np.concatenate([nodes, empty]),
+                               np.concatenate([groups, np.full(empty.size, unknown, dtype=np.int64)]), labels)
+
+    # 衍生方式：模型计入其每一种入边（来自父模型的边）的类型，没有父模型的计入 BASE_LABEL
+    pred_indptr = np.asarray(arrays["pred_indptr"], dtype=np.int64)
+    nodes, groups = multi_valued(pred_indptr, arrays["pred_type"], len(edge_types) + 1)
+    base = np.flatnonzero(np.diff(pred_indptr) == 0)
+    memberships["derivation"] = (np.concatenate([nodes, base]),
+                                 np.concatenate([groups, np.full(base.size, len(edge_types), dtype=np.int64)]),
+                                 list(edge_types) + [BASE_LABEL])
+
+    rollup_tables, rollup_arrays = {}, {}
+    for dimension in ROLLUP_DIMENSIONS:
+        nodes, groups, labels = memberships[dimension]
+        cube = monthly_cube(months, num_months, nodes, groups, len(labels), downloads, influence)
+        # 只保留至少有一个（有创建日期的）模型的分组
+        kept = np.flatnonzero(cube["count"].sum(axis=0) > 0) if num_months else np.arange(0)
+        rollup_tables[f"rollup_{dimension}"] = [labels[g] for g in kept.tolist()]
+        for metric, dtype in ROLLUP_METRICS.items():
+            rollup_arrays[f"rollup_{dimension}_{metric}"] = np.ascontiguousarray(cube[metric][:, kept], dtype=dtype)
+
+    info = {
+        "first_month": str(np.datetime64(first_month, "M")),
+        "num_months": num_months,
+        "dimensions": list(ROLLUP_DIMENSIONS),
+        "metrics": list(ROLLUP_METRICS),
+        "undated_models": int(num_nodes - dated.sum()),
+    }
+    return rollup_tables, rollup_arrays, info
@@ -0,0 +1,581 @@
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.linalg import bicgstab
+
+import graph_computing as gc
+from influence_trace import make_trace_sink
+from space_influence import SpaceTable
+
+COMPACT_FRACTION = 0.05  # 增量更新修改过的行超过节点数的该比例时，合并进基础矩阵
+
+
+class InfluenceEngine:
+    """
+    基于稀疏矩阵的影响力计算引擎。
+
+    compute_influence 的迭代公式可写成矩阵形式：
+        x_{k+1} = ALPHA_1 * s + (ALPHA_2 * C + ALPHA_3 * P) x_k
+    其中 s 为自身影响力向量，C 为按出度归一化的子模型传播矩阵，P 为按入度归一化的父模型传播矩阵。
+    C、P 和 s 只在构造时计算一次，之后每轮迭代只是一次稀疏矩阵向量乘。
+    增量更新（update）时引擎在两次更新之间保留结果、残差和 CSR 矩阵，只重算变化涉及的行。
+    """
+
+    def __init__(self, graph, spaces_metadata, today=None, self_influence=None):
+        """
+        Args:
+            graph: easygraph 的 DiGraph，包含节点和边的属性。
+            spaces_metadata: spaces 元数据，用于计算 space 影响力。
+            today (datetime): Space 时间衰减的参考时间，默认为当前时间。
+            self_influence (np.ndarray): 已计算好的自身影响力向量（顺序与 graph.nodes 相同），可选。
+        """
+        self.graph = graph
+        self.spaces_metadata = spaces_metadata
+        self.today = today
+        self.node_ids = list(graph.nodes)
+        self.index = {node: i for i, node in enumerate(self.node_ids)}
+        self._child, self._parent = build_propagation_matrices(graph, self.index)
+        self._space_table = None
+        self._self_influence = None if self_influence is None else np.asarray(self_influence, dtype=np.float64)
+        # 增量更新的状态：上一次的结果与残差（按容量预留，新增节点时不必整体复制）、
+        # 基础矩阵 M = ALPHA_2 * C + ALPHA_3 * P 及其转置，以及此后被修改的行
+        self._x = None
+        self._residual = None
+        self._M = self._MT = None
+        self._base_n = len(self.node_ids)
+        self._rows = {}        # 被修改的行 -> 该行新的 (C 的条目, P 的条目)，合并时使用
+        self._delta_rows = {}  # 被修改的行 i -> {列 j: M[i, j] 相对基础矩阵的变化量}
+        self._delta_cols = {}  # 列 j -> {行 i: 变化量}，推送残差时按列访问
+
+    @property
+    def child(self):
+        """按出度归一化的子模型传播矩阵 C，增量更新修改过的行会先合并进来"""
+        self.compact()
+        return self._child
+
+    @property
+    def parent(self):
+        """按入度归一化的父模型传播矩阵 P，增量更新修改过的行会先合并进来"""
+        self.compact()
+        return self._parent
+
+    @property
+    def influence(self):
+        """上一次 write_back / update 的影响力向量，顺序与 self.node_ids 相同，没有时为 None"""
+        return None if self._x is None else self._x[:len(self.node_ids)]
+
+    @property
+    def space_table(self):
+        """预先计算好的 Space 影响力表，所有节点共用"""
+        if self._space_table is None:
+            self._space_table = SpaceTable(self.spaces_metadata, today=self.today)
+        return self._space_table
+
+    @property
+    def self_influence(self):
+        """自身影响力向量，首次访问时计算（增量更新只需要其中一部分）"""
+        if self._self_influence is None:
+            self._self_influence = self.self_influence_of(np.arange(len(self.node_ids)))
+        return self._self_influence
+
+    def feature_columns(self, rows):
+        """
+        取出指定行对应节点计算自身影响力所需的特征列。
+        Returns:
+            dict: downloads、likes、space_influence、days_since_created 四个 float64 数组。
+        """
+        attrs = [self.graph.nodes[self.node_ids[i]] for i in rows]
+        count = len(attrs)
+        return {
+            "downloads": np.fromiter((a.get("downloads", 0) for a in attrs), dtype=np.float64, count=count),
+            "likes": np.fromiter((a.get("likes", 0) for a in attrs), dtype=np.float64, count=count),
+            "space_influence": self.space_table.model_influence([a.get("spaces", []) for a in attrs]),
+            "days_since_created": np.fromiter((a.get("days_since_created", 1) for a in attrs),
+                                              dtype=np.float64, count=count),
+        }
+
+    def self_influence_of(self, rows):
+        """只计算指定行对应节点的自身影响力"""
+        return self_influence_from_features(self.feature_columns(rows))
+
+    def export_space_influence(self):
+        """
+        把每个节点的 Space 总影响力写入 `space_influence` 属性，并把 Space 表保存在 graph.graph['space_influence'] 中，
+        随 graph.pkl 一起提供给数据大屏使用。
+        """
+        column = self.space_table.model_influence(
+            [self.graph.nodes[node].get("spaces", []) for node in self.node_ids])
+        for node, value in zip(self.node_ids, column.tolist()):
+            self.graph.nodes[node]['space_influence'] = value
+        self.graph.graph['space_influence'] = self.space_table.to_dict()
+        return column
+
+    def propagation_matrix(self, alpha_2=None, alpha_3=None):
+        """返回 ALPHA_2 * C + ALPHA_3 * P 的 CSR 矩阵"""
+        alpha_2 = gc.ALPHA_2 if alpha_2 is None else alpha_2
+        alpha_3 = gc.ALPHA_3 if alpha_3 is None else alpha_3
+        return (alpha_2 * self.child + alpha_3 * self.parent).tocsr()
+
+    def compact(self):
+        """
+        把增量更新修改过的行合并进 C、P，并丢弃基于旧矩阵的 M。代价与整个图的边数成正比，
+        只在需要完整矩阵时（iterate、solve 等）或修改的行累计较多时执行。
+        """
+        n = len(self.node_ids)
+        if not self._rows and self._base_n == n:
+            return
+        self._child = replace_rows(self._child, {i: rows[0] for i, rows in self._rows.items()}, n)
+        self._parent = replace_rows(self._parent, {i: rows[1] for i, rows in self._rows.items()}, n)
+        self._rows, self._delta_rows, self._delta_cols = {}, {}, {}
+        self._M = self._MT = None
+        self._base_n = n
+
+    def _base_matrices(self):
+        """基础矩阵 M 及其转置（按列访问），增量更新在其上叠加被修改的行"""
+        if self._M is None:
+            self._M = (gc.ALPHA_2 * self._child + gc.ALPHA_3 * self._parent).tocsr()
+            self._MT = self._M.T.tocsr()
+        return self._M, self._MT
+
+    def add_nodes(self, nodes):
+        """
+        把新增的模型（图中需已包含）追加到节点编号末尾，影响力从 0 开始。
+        Returns:
+            rows (list): 新节点的编号。
+        """
+        rows = []
+        for node in nodes:
+            if node not in self.index:
+                self.index[node] = len(self.node_ids)
+                self.node_ids.append(node)
+                rows.append(self.index[node])
+        if rows:
+            # 完整的自身影响力向量在下次需要时重新计算
+            self._self_influence = None
+            if self._x is not None:
+                self._reserve(len(self.node_ids))
+        return rows
+
+    def _set_result(self, x, residual=None):
+        self._x = np.array(x, dtype=np.float64)
+        self._residual = np.zeros(self._x.size) if residual is None else np.array(residual, dtype=np.float64)
+        self._reserve(len(self.node_ids))
+
+    def _reserve(self, n):
+        """保证结果与残差数组能容纳 n 个节点，容量按倍数增长，新增节点的均摊代价为常数"""
+        if self._x.size >= n:
+            return
+        capacity = max(n, 2 * self._x.size)
+        for name in ("_x", "_residual"):
+            grown = np.zeros(capacity)
+            old = getattr(self, name)
+            grown[:old.size] = old
+            setattr(self, name, grown)
+
+    def _patch_row(self, i):
+        """按图的当前状态重新计算 C、P 的第 i 行，只记录 M 该行相对基础矩阵的变化，代价与该节点的度数成正比"""
+        node = self.node_ids[i]
+        rows = []
+        for neighbours in (self.graph.adj.get(node, {}), self.graph.pred.get(node, {})):
+            row = {}
+            for neighbour, edge_attrs in neighbours.items():
+                j = self.index[neighbour]
+                row[j] = row.get(j, 0.0) + edge_attrs.get("influence_weight", 1.0) / max(1, len(neighbours))
+            rows.append(row)
+        self._rows[i] = child_row, parent_row = rows
+
+        new = {j: gc.ALPHA_2 * value for j, value in child_row.items()}
+        for j, value in parent_row.items():
+            new[j] = new.get(j, 0.0) + gc.ALPHA_3 * value
+        old = {}
+        if i < self._base_n:
+            M, _ = self._base_matrices()
+            start, end = M.indptr[i], M.indptr[i + 1]
+            old = dict(zip(M.indices[start:end].tolist(), M.data[start:end].tolist()))
+        for j in self._delta_rows.pop(i, ()):
+            column = self._delta_cols[j]
+            del column[i]
+            if not column:
+                del self._delta_cols[j]
+        delta = {}
+        for j in new.keys() | old.keys():
+            value = new.get(j, 0.0) - old.get(j, 0.0)
+            if value:
+                delta[j] = value
+                self._delta_cols.setdefault(j, {})[i] = value
+        if delta:
+            self._delta_rows[i] = delta
+
+    def _row_products(self, rows, x):
+        """当前传播矩阵的指定行与 x 的乘积：基础矩阵的这些行加上被修改的部分"""
+        M, _ = self._base_matrices()
+        products = np.zeros(rows.size)
+        in_base = rows < self._base_n
+        products[in_base] = M[rows[in_base]] @ x[:self._base_n]
+        for k, i in enumerate(rows.tolist()):
+            delta = self._delta_rows.get(i)
+            if delta:
+                products[k] += sum(value * x[j] for j, value in delta.items())
+        return products
+
+    def _push(self, active):
+        """push_residuals 的增量版本：基础矩阵的列一次性分发，被修改的部分逐项补上"""
+        x, residual = self._x, self._residual
+        values = residual[active]
+        x[active] += values
+        residual[active] = 0.0
+        _, MT = self._base_matrices()
+        in_base = active < self._base_n
+        targets = [spread_residuals(MT, residual, active[in_base], values[in_base])]
+        for u, value in zip(active.tolist(), values.tolist()):
+            column = self._delta_cols.get(u)
+            if column:
+                for i, delta in column.items():
+                    residual[i] += delta * value
+                targets.append(np.fromiter(column, dtype=np.int64, count=len(column)))
+        return np.concatenate(targets)
+
+    def iterate(self, max_iter=100, tol=1e-6, x0=None, trace=None):
+        """
+        以不动点迭代求解，迭代与收敛判据和 compute_influence 完全一致。
+        Args:
+            max_iter: 最大迭代次数。
+            tol: 收敛误差阈值。
+            x0: 初始影响力向量，默认为自身影响力。
+            trace: TraceSink 实例，默认不记录迭代过程。
+        Returns:
+            x (np.ndarray): 影响力向量，顺序与 self.node_ids 相同。
+            iterations (int): 实际迭代次数。
+        """
+        M = self.propagation_matrix()
+        b = gc.ALPHA_1 * self.self_influence
+        # 与 compute_influence 相同，初始影响力为自身影响力
+        x = self.self_influence.copy() if x0 is None else np.asarray(x0, dtype=np.float64)
+        sink = make_trace_sink(trace)
+        sink.open(self.node_ids)
+        iterations = 0
+        converged = False
+        for iteration in range(max_iter):
+            new_x = b + M @ x
+            diff = np.abs(new_x - x).sum()
+            print(f"Iteration {iteration}: Total Difference = {diff}")
+            sink.record(iteration + 1, diff, new_x)
+            x = new_x
+            iterations = iteration + 1
+            if diff < tol:
+                print("Convergence achieved.")
+                converged = True
+                break
+        sink.close(converged)
+        return x, iterations
+
+    def solve(self, tol=1e-6, maxiter=None):
+        """
+        直接用稀疏迭代求解器（BiCGSTAB）求解线性方程组 (I - ALPHA_2*C - ALPHA_3*P) x = ALPHA_1 * s。
+        Returns:
+            x (np.ndarray): 影响力向量，顺序与 self.node_ids 相同。
+        """
+        M = self.propagation_matrix()
+        A = sp.identity(M.shape[0], format='csr') - M
+        b = gc.ALPHA_1 * self.self_influence
+        x, info = bicgstab(A, b, x0=self.self_influence, rtol=0.0, atol=tol, maxiter=maxiter)
+        if info > 0:
+            print(f"BiCGSTAB did not converge within {info} iterations.")
+        elif info < 0:
+            raise ValueError(f"BiCGSTAB 求解失败，返回码 {info}")
+        return x
+
+    def update(self, changed_nodes=(), changed_edges=(), new_nodes=(), previous=None, tol=1e-6, max_rounds=1000):
+        """
+        增量更新：在上一次的影响力结果上，只把变化产生的残差沿父/子传播方向推送出去。
+        设上一次结果为 x_old，新的方程为 x = ALPHA_1 * s + M x，则修正量 d = x - x_old 满足
+            d = r + M d，  r = ALPHA_1 * s + M x_old - x_old
+        r 只在元数据或边发生变化的行上非零，因此从这些行出发做残差推送（forward push），
+        每轮把绝对值超过 tol 的残差加到结果上并传播给邻居，直到所有残差都小于 tol。
+        引擎在两次更新之间保留结果、残差和传播矩阵，边的变化只重算两端节点所在的行，
+        代价与变化的规模及残差传播到的范围成正比，与整个图的规模无关。
+        Args:
+            changed_nodes: 自身属性（downloads、likes、spaces 等）发生变化的节点。
+            changed_edges: 新增、删除或权重变化的边 (base_model, derived_model)，图中需已是变化后的状态。
+            new_nodes: 新增的模型（图中需已包含），追加到节点编号末尾，上一次的影响力视为 0。
+            previous (np.ndarray): 上一次的影响力，顺序与 self.node_ids 相同（不含本次新增的节点）；
+                默认沿用上一次 update / write_back 的结果。
+            tol: 单个节点残差的推送阈值。
+            max_rounds: 最大推送轮数。
+        Returns:
+            influences (dict): 影响力发生变化的 节点 -> 新影响力。
+            report (dict): 种子节点数、被触及的节点数、推送次数等统计。
+        """
+        if previous is not None:
+            self._set_result(previous)
+        elif self._x is None:
+            raise ValueError("没有上一次的影响力结果，需要传入 previous 或先调用 write_back")
+        if len(self._rows) > COMPACT_FRACTION * self._base_n:
+            self.compact()
+
+        # 传播矩阵中需要重算的行：边的两端（出度、入度变化会改变整行的归一化系数）以及新节点
+        structural = set(self.add_nodes(new_nodes))
+        for base_model, derived_model in changed_edges:
+            structural.update(self.index[node] for node in (base_model, derived_model) if node in self.index)
+        for i in structural:
+            self._patch_row(i)
+        # 需要重新计算残差的行：再加上属性变化的节点
+        seeds = structural | {self.index[node] for node in changed_nodes if node in self.index}
+        seeds = np.fromiter(sorted(seeds), dtype=np.int64, count=len(seeds))
+
+        x, residual = self._x, self._residual
+        seed_influence = self.self_influence_of(seeds)
+        if self._self_influence is not None:
+            self._self_influence[seeds] = seed_influence
+        residual[seeds] = gc.ALPHA_1 * seed_influence + self._row_products(seeds, x) - x[seeds]
+
+        touched, pushed = [seeds], []
+        active = seeds[np.abs(residual[seeds]) > tol]
+        rounds = pushes = 0
+        while active.size and rounds < max_rounds:
+            pushed.append(active)
+            pushes += active.size
+            rounds += 1
+            targets = self._push(active)
+            touched.append(targets)
+
+            candidates = np.unique(targets)
+            active = candidates[np.abs(residual[candidates]) > tol]
+
+        touched = np.unique(np.concatenate(touched))
+        updated = np.unique(np.concatenate(pushed)) if pushed else np.empty(0, dtype=np.int64)
+        influences = {}
+        for i in updated.tolist():
+            node = self.node_ids[i]
+            influences[node] = float(x[i])
+            self.graph.nodes[node]['influence'] = influences[node]
+        report = {
+            "seed_nodes": int(seeds.size),
+            "touched_nodes": int(touched.size),
+            "updated_nodes": int(updated.size),
+            "pushes": int(pushes),
+            "rounds": rounds,
+            # 只统计被触及的节点，其余节点的残差没有变化
+            "max_residual": float(np.abs(residual[touched]).max()) if touched.size else 0.0,
+        }
+        print(f"Incremental update: {report['seed_nodes']} seeds, {report['touched_nodes']} nodes touched, "
+              f"{report['pushes']} pushes in {rounds} rounds")
+        return influences, report
+
+    def approximate(self, error_bound=1e-3, time_budget=None, max_rounds=10000, top_k=100):
+        """
+        随时可停的近似计算（forward push）：从 x = 0、残差 r = ALPHA_1 * s 出发，
+        每轮把残差最大的一批节点（不小于当前最大残差的一半）推送出去。
+        任意时刻真实结果与估计值之差满足 |x* - x|_max <= |r|_max / (1 - q)，
+        其中 q 为传播矩阵的最大行和（< 1），因此可以在误差上界或时间预算达到时停止。
+        Args:
+            error_bound: 目标误差上界（对每个节点）。
+            time_budget: 时间预算（秒），None 表示不限。
+            max_rounds: 最大推送轮数。
+            top_k: 检查排名前 top_k 的节点中有多少已经可以确定在 top_k 之内。
+        Returns:
+            x (np.ndarray): 影响力估计值。
+            residual (np.ndarray): 每个节点剩余的残差。
+            report (dict): 推送轮数、误差上界、耗时以及已确定的 top_k 节点数。
+        """
+        start = time.perf_counter()
+        M = self.propagation_matrix()
+        q = float(abs(M).sum(axis=1).max()) if M.nnz else 0.0
+        if q >= 1:
+            raise ValueError(f"传播矩阵的最大行和为 {q}，不满足 forward push 的收敛条件")
+        MT = M.T.tocsr()
+        x = np.zeros(len(self.node_ids))
+        residual = gc.ALPHA_1 * self.self_influence
+        target = error_bound * (1 - q)
+
+        rounds = pushes = 0
+        while rounds < max_rounds:
+            abs_residual = np.abs(residual)
+            max_residual = abs_residual.max() if abs_residual.size else 0.0
+            if max_residual <= target:
+                break
+            if time_budget is not None and time.perf_counter() - start >= time_budget:
+                break
+            active = np.flatnonzero(abs_residual >= max(target, 0.5 * max_residual))
+            push_residuals(MT, x, residual, active)
+            pushes += active.size
+            rounds += 1
+
+        bound = float(np.abs(residual).max()) / (1 - q) if residual.size else 0.0
+        report = {
+            "rounds": rounds,
+            "pushes": int(pushes),
+            "error_bound": bound,
+            "residual_mass": float(np.abs(residual).sum()),
+            "elapsed_s": time.perf_counter() - start,
+            "certified_top_k": certified_top_k(x, bound, top_k),
+        }
+        print(f"Approximate influence: {rounds} rounds, {report['pushes']} pushes, error bound {bound:.3g}, "
+              f"{report['certified_top_k']}/{min(top_k, x.size)} of top {top_k} certified")
+        return x, residual, report
+
+    def write_back(self, x):
+        """
+        将影响力向量写回图中每个节点的 `influence` 属性，并返回 节点 -> 影响力 的字典。
+        该结果同时作为之后增量更新（update）的起点。
+        """
+        self._set_result(x)
+        influences = dict(zip(self.node_ids, x.tolist()))
+        for node, influence in influences.items():
+            self.graph.nodes[node]['influence'] = influence
+        return influences
+
+
+def push_residuals(MT, x, residual, active):
+    """
+    把 active 节点的残差加到结果 x 上，并按传播矩阵的列（MT 的行）一次性分发给邻居。
+    Returns:
+        targets (np.ndarray): 残差被修改的节点（可能重复）。
+    """
+    values = residual[active]
+    x[active] += values
+    residual[active] = 0.0
+    return spread_residuals(MT, residual, active, values)
+
+
+def spread_residuals(MT, residual, sources, values):
+    """
+    把 sources 上的残差 values 按传播矩阵的列（MT 的行）一次性累加到邻居的残差上。
+    Returns:
+        targets (np.ndarray): 残差被修改的节点（可能重复）。
+    """
+    # 收集这些列的所有非零元，一次性累加到残差上
+    starts = MT.indptr[sources]
+    counts = MT.indptr[sources + 1] - starts
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    targets = MT.indices[offsets]
+    np.add.at(residual, targets, MT.data[offsets] * np.repeat(values, counts))
+    return targets
+
+
+def certified_top_k(x, bound, k):
+    """
+    估计值的误差不超过 bound 时，排名前 k 的节点中有多少可以确定属于真实的 top-k：
+    节点 i 的下界 x[i] - bound 大于第 k+1 名的上界时即可确定。
+    """
+    k = min(k, x.size)
+    if k == 0:
+        return 0
+    if k == x.size:
+        return k
+    order = np.argpartition(-x, k)
+    threshold = x[order[k]] + bound
+    return int(np.count_nonzero(x[order[:k]] - bound > threshold))
+
+
+def self_influence_from_features(features, w1=None, w2=None, w3=None, w4=None, lambda_=None):
+    """
+    compute_self_influence 的向量化版本：
+        W1 * log(max(downloads, 1)) + W2 * likes + W3 * space_influence + W4 * exp(-LAMBDA * days)
+    权重默认取 graph_computing 中的常量。
+    """
+    w1 = gc.W1 if w1 is None else w1
+    w2 = gc.W2 if w2 is None else w2
+    w3 = gc.W3 if w3 is None else w3
+    w4 = gc.W4 if w4 is None else w4
+    lambda_ = gc.LAMBDA if lambda_ is None else lambda_
+    return (w1 * np.log(np.maximum(features["downloads"], 1))
+            + w2 * features["likes"]
+            + w3 * features["space_influence"]
+            + w4 * np.exp(-lambda_ * features["days_since_created"]))
+
+
+def build_propagation_matrices(graph, index):
+    """
+    构建归一化后的子模型传播矩阵 C 和父模型传播矩阵 P。
+    C[v, c] = influence_weight(v->c) / max(1, 出度(v))，P[v, p] = influence_weight(p->v) / max(1, 入度(v))。
+    Args:
+        graph: easygraph 的 DiGraph。
+        index (dict): 节点 -> 行号 的映射。
+    Returns:
+        (child, parent): 两个 CSR 矩阵。
+    """
+    n = len(index)
+    rows, cols, weights = [], [], []
+    for node, successors in graph.adj.items():
+        i = index[node]
+        for child, edge_attrs in successors.items():
+            rows.append(i)
+            cols.append(index[child])
+            weights.append(edge_attrs.get("influence_weight", 1.0))
+    rows = np.asarray(rows, dtype=np.int64)
+    cols = np.asarray(cols, dtype=np.int64)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    adjacency = sp.csr_matrix((weights, (rows, cols)), shape=(n, n))
+    out_degree = np.maximum(np.bincount(rows, minlength=n), 1)
+    in_degree = np.maximum(np.bincount(cols, minlength=n), 1)
+    child = sp.diags(1.0 / out_degree) @ adjacency
+    parent = sp.diags(1.0 / in_degree) @ adjacency.T
+    return child.tocsr(), parent.tocsr()
+
+
+def replace_rows(matrix, rows, n):
+    """
+    用 rows（行号 -> {列号: 值}）替换 CSR 矩阵中的对应行，并把矩阵扩展为 n x n。
+    """
+    coo = matrix.tocoo()
+    keep = ~np.isin(coo.row, np.fromiter(rows, dtype=np.int64, count=len(rows)))
+    size = sum(len(row) for row in rows.values())
+    new_rows = np.fromiter((i for i, row in rows.items() for _ in row), dtype=np.int64, count=size)
+    new_cols = np.fromiter((j for row in rows.values() for j in row), dtype=np.int64, count=size)
+    new_data = np.fromiter((value for row in rows.values() for value in row.values()), dtype=np.float64,
+                           count=size)
+    return sp.csr_matrix((np.concatenate([coo.data[keep], new_data]),
+                          (np.concatenate([coo.row[keep], new_rows]), np.concatenate([coo.col[keep], new_cols]))),
+                         shape=(n, n))
+
+
+def compute_influence_sparse(graph, spaces_metadata, max_iter=100, tol=1e-6, method="iterate",
+                             output_dir="output", trace=None):
+    """
+    compute_influence 的稀疏矩阵版本，结果在 tol 范围内与原算法一致。
+    Args:
+        graph: easygraph 的 DiGraph，包含节点和边的属性。
+        spaces_metadata: spaces 元数据，用于计算 space 影响力。
+        max_iter: 最大迭代次数。
+        tol: 收敛误差阈值。
+        method: "iterate" 为不动点迭代，"solve" 为直接求解线性方程组。
+        output_dir: 迭代记录的输出文件夹路径。
+        trace: 迭代过程的记录方式（仅 "iterate" 有效），见 influence_trace.make_trace_sink，默认不记录。
+    Returns:
+        influences: 每个节点的最终影响力字典。
+    """
+    engine = InfluenceEngine(graph, spaces_metadata)
+    engine.export_space_influence()
+    if method == "iterate":
+        x, _ = engine.iterate(max_iter=max_iter, tol=tol, trace=make_trace_sink(trace, output_dir))
+    elif method == "solve":
+        x = engine.solve(tol=tol)
+    else:
+        raise ValueError(f"未知的求解方式: {method}")
+    return engine.write_back(x)
+
+
+def update_influence(engine, changed_nodes=(), changed_edges=(), new_nodes=(), previous=None, tol=1e-6):
+    """
+    增量更新影响力：只从变化的节点和边出发传播残差，代价与变化规模相关，而不是整个图的规模。
+    引擎应在多次更新之间复用（例如每次刷新元数据后调用一次），传播矩阵和上一次的结果都保存在其中。
+    Args:
+        engine (InfluenceEngine): 上一次计算所用的引擎，engine.graph 需已应用新的元数据和边。
+        changed_nodes: 自身属性发生变化的节点。
+        changed_edges: 发生变化的边 (base_model, derived_model)。
+        new_nodes: 新增的模型。
+        previous (np.ndarray): 上一次的影响力，顺序与 engine.node_ids 相同；默认沿用引擎中的结果，
+            引擎还没有结果时读取图中节点现有的 `influence` 属性。
+        tol: 收敛误差阈值。
+    Returns:
+        influences (dict): 影响力发生变化的 节点 -> 新影响力。
+        report (dict): 本次更新触及的节点数等统计。
+    """
+    if previous is None and engine.influence is None:
+        previous = np.fromiter((engine.graph.nodes[node].get('influence', 0.0) for node in engine.node_ids),
+                               dtype=np.float64, count=len(engine.node_ids))
+    return engine.update(changed_nodes=changed_nodes, changed_edges=changed_edges, new_nodes=new_nodes,
+                         previous=previous, tol=tol)
@@ -0,0 +1,112 @@
+import itertools
+import os
+
+import numpy as np
+from scipy.stats import rankdata
+
+import graph_computing as gc
+from influence_engine import InfluenceEngine
+
+# 可参与扫描的权重参数，默认值取 graph_computing 中的模块常量
+SWEEP_PARAMS = ("ALPHA_1", "ALPHA_2", "ALPHA_3", "W1", "W2", "W3", "W4", "LAMBDA")
+
+
+def expand_grid(grid):
+    """
+    把参数网格展开成参数组合列表，未给出的参数使用 graph_computing 中的当前值。
+    Args:
+        grid (dict): 参数名 -> 候选值列表，例如 {"ALPHA_2": [0.2, 0.3], "LAMBDA": [1, 0.01]}。
+    Returns:
+        settings (list): 每个元素是包含全部 SWEEP_PARAMS 的参数字典。
+    """
+    unknown = set(grid) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"未知的参数: {sorted(unknown)}")
+    values = [grid.get(name, [getattr(gc, name)]) for name in SWEEP_PARAMS]
+    return [dict(zip(SWEEP_PARAMS, combo)) for combo in itertools.product(*values)]
+
+
+def sweep_influence(graph, spaces_metadata, grid, max_iter=100, tol=1e-6, top_k=100,
+                    output_file="output/influence_sweep.npz", engine=None):
+    """
+    对一组权重参数同时计算影响力。
+    所有参数组合共用图结构和特征列（log 下载量、likes、Space 影响力、创建天数），
+    每轮迭代把所有组合作为一个稠密矩阵的各列一起传播：
+        X_{k+1} = S * ALPHA_1 + (C X_k) * ALPHA_2 + (P X_k) * ALPHA_3
+    每一列的迭代和收敛判据与单独运行 compute_influence 相同，已收敛的列不再参与计算。
+    Args:
+        graph: easygraph 的 DiGraph，包含节点和边的属性。
+        spaces_metadata: spaces 元数据，用于计算 space 影响力。
+        grid (dict): 参数网格，见 expand_grid。
+        max_iter: 最大迭代次数。
+        tol: 收敛误差阈值。
+        top_k: 计算 top-K 重合度时的 K。
+        output_file: 结果保存路径（.npz），为 None 时不保存。
+        engine: 已构建好的 InfluenceEngine，可选。
+    Returns:
+        result (dict): node_ids、params、influence（节点数 × 组合数）、iterations、spearman、top_k_overlap。
+    """
+    engine = engine or InfluenceEngine(graph, spaces_metadata)
+    settings = expand_grid(grid)
+    params = np.array([[setting[name] for name in SWEEP_PARAMS] for setting in settings], dtype=np.float64)
+    alpha_1, alpha_2, alpha_3, w1, w2, w3, w4, lambdas = params.T
+
+    features = engine.feature_columns(np.arange(len(engine.node_ids)))
+    log_downloads = np.log(np.maximum(features["downloads"], 1))
+    # 时间因子只依赖 LAMBDA，相同的 LAMBDA 只算一次
+    time_factors = {lambda_: np.exp(-lambda_ * features["days_since_created"]) for lambda_ in set(lambdas.tolist())}
+    S = np.column_stack([
+        w1[j] * log_downloads + w2[j] * features["likes"] + w3[j] * features["space_influence"]
+        + w4[j] * time_factors[lambdas[j]]
+        for j in range(len(settings))
+    ])
+
+    B = S * alpha_1
+    X = S.copy()
+    iterations = np.zeros(len(settings), dtype=np.int64)
+    active = np.arange(len(settings))
+    for iteration in range(max_iter):
+        X_active = X[:, active]
+        new_X = B[:, active] + (engine.child @ X_active) * alpha_2[active] + (engine.parent @ X_active) * alpha_3[active]
+        diffs = np.abs(new_X - X_active).sum(axis=0)
+        X[:, active] = new_X
+        iterations[active] = iteration + 1
+        print(f"Iteration {iteration}: {active.size} settings active, max Total Difference = {diffs.max()}")
+        active = active[diffs >= tol]
+        if active.size == 0:
+            print("Convergence achieved.")
+            break
+
+    result = {
+        "node_ids": np.array(engine.node_ids),
+        "param_names": np.array(SWEEP_PARAMS),
+        "params": params,
+        "influence": X.astype(np.float32),
+        "iterations": iterations,
+        "spearman": rank_correlation(X),
+        "top_k_overlap": top_k_overlap(X, top_k),
+    }
+    if output_file:
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        np.savez_compressed(output_file, **result)
+    return result
+
+
+def rank_correlation(X):
+    """各列（参数组合）之间影响力排名的 Spearman 相关系数矩阵"""
+    if X.shape[1] < 2:
+        return np.ones((X.shape[1], X.shape[1]))
+    ranks = rankdata(X, axis=0)
+    return np.corrcoef(ranks, rowvar=False)
+
+
+def top_k_overlap(X, k):
+    """各列 top-K 节点集合的重合比例矩阵"""
+    k = min(k, X.shape[0])
+    if k == 0:
+        return np.ones((X.shape[1], X.shape[1]))
+    tops = [set(np.argpartition(-X[:, j], k - 1)[:k].tolist()) for j in range(X.shape[1])]
+    overlap = np.empty((len(tops), len(tops)))
+    for i, j in itertools.product(range(len(tops)), repeat=2):
+        overlap[i, j] = len(tops[i] & tops[j]) / k
+    return overlap
@@ -0,0 +1,176 @@
+import heapq
+import json
+import os
+import time
+
+import numpy as np
+
+
+def _as_list(values):
+    """把 dict（节点 -> 影响力，顺序与节点列表一致）或 numpy 数组统一成 list"""
+    if isinstance(values, dict):
+        return list(values.values())
+    if isinstance(values, np.ndarray):
+        return values.tolist()
+    return list(values)
+
+
+class TraceSink:
+    """
+    影响力迭代过程的记录器基类，本身不记录任何内容（trace="none"）。
+    迭代开始时调用 open，每轮迭代后调用 record，结束时调用 close。
+    """
+
+    def open(self, node_ids):
+        pass
+
+    def record(self, iteration, diff, values):
+        """
+        Args:
+            iteration (int): 从 1 开始的迭代轮次。
+            diff (float): 本轮与上一轮影响力之差的绝对值之和。
+            values: 本轮影响力，dict 或与 node_ids 顺序一致的数组。
+        """
+        pass
+
+    def close(self, converged):
+        pass
+
+
+class ResidualTraceSink(TraceSink):
+    """只记录每轮的误差，结束时写出收敛摘要 convergence_summary.json"""
+
+    def __init__(self, output_dir="output"):
+        self.output_dir = output_dir
+        self.diffs = []
+        self.started_at = None
+        self.num_nodes = 0
+
+    def open(self, node_ids):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.diffs = []
+        self.num_nodes = len(node_ids)
+        self.started_at = time.perf_counter()
+
+    def record(self, iteration, diff, values):
+        self.diffs.append(float(diff))
+
+    def close(self, converged):
+        summary = {
+            "converged": bool(converged),
+            "iterations": len(self.diffs),
+            "final_diff": self.diffs[-1] if self.diffs else None,
+            "num_nodes": self.num_nodes,
+            "elapsed_s": time.perf_counter() - self.started_at,
+            "diffs": self.diffs,
+        }
+        with open(os.path.join(self.output_dir, "convergence_summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=4)
+
+
+class TopKTraceSink(ResidualTraceSink):
+    """每轮用有界堆取影响力最高的 top_k 个节点，写入 output_dir/top_k.txt"""
+
+    def __init__(self, output_dir="output", top_k=100):
+        super().__init__(output_dir)
+        self.top_k = top_k
+        self.node_ids = []
+        self.file = None
+
+    def open(self, node_ids):
+        super().open(node_ids)
+        self.node_ids = node_ids
+        self.file = open(os.path.join(self.output_dir, "top_k.txt"), "w", encoding="utf-8")
+
+    def record(self, iteration, diff, values):
+        super().record(iteration, diff, values)
+        top = heapq.nlargest(self.top_k, zip(_as_list(values), range(len(self.node_ids))))
+        self.file.write(f"# Iteration {iteration}: Total Difference = {diff}\n")
+        for influence, i in top:
+            self.file.write(f"{self.node_ids[i]}: {influence}\n")
+
+    def close(self, converged):
+        self.file.close()
+        super().close(converged)
+
+
+class CheckpointTraceSink(ResidualTraceSink):
+    """
+    每 every 轮保存一次完整的影响力向量（float64 的 .npy 文件），节点顺序只在 node_ids.txt 中写一次。
+    最后一轮总会保存。
+    """
+
+    def __init__(self, output_dir="output", every=10):
+        super().__init__(output_dir)
+        self.every = every
+        self.last_saved = 0
+        self.last_values = None
+
+    def open(self, node_ids):
+        super().open(node_ids)
+        self.last_saved = 0
+        with open(os.path.join(self.output_dir, "node_ids.txt"), "w", encoding="utf-8") as f:
+            f.writelines(f"{node}\n" for node in node_ids)
+
+    def record(self, iteration, diff, values):
+        super().record(iteration, diff, values)
+        self.last_values = values
+        if iteration % self.every == 0:
+            self._save(iteration, values)
+
+    def _save(self, iteration, values):
+        np.save(os.path.join(self.output_dir, f"checkpoint_{iteration}.npy"),
+                np.asarray(_as_list(values) if isinstance(values, dict) else values, dtype=np.float64))
+        self.last_saved = iteration
+
+    def close(self, converged):
+        if self.diffs and self.last_saved != len(self.diffs):
+            self._save(len(self.diffs), self.last_values)
+        self.last_values = None
+        super().close(converged)
+
+
+class FullDumpTraceSink(ResidualTraceSink):
+    """原有行为：每轮把所有节点按影响力排序后写入 output_dir/iteration_N.txt（仅用于调试）"""
+
+    def __init__(self, output_dir="output"):
+        super().__init__(output_dir)
+        self.node_ids = []
+
+    def open(self, node_ids):
+        super().open(node_ids)
+        self.node_ids = node_ids
+
+    def record(self, iteration, diff, values):
+        super().record(iteration, diff, values)
+        output_file = os.path.join(self.output_dir, f"iteration_{iteration}.txt")
+        with open(output_file, "w", encoding="utf-8") as f:
+            sorted_results = sorted(zip(self.node_ids, _as_list(values)), key=lambda x: x[1], reverse=True)
+            for model, influence in sorted_results:
+                f.write(f"{model}: {influence}\n")
+
+
+def make_trace_sink(trace, output_dir="output", top_k=100, every=10):
+    """
+    根据模式名创建记录器。
+    Args:
+        trace: "none"、"residual"、"topk"、"checkpoint"、"full" 之一，也可以直接传入 TraceSink 实例。
+        output_dir: 输出文件夹路径。
+        top_k: "topk" 模式下每轮记录的节点数。
+        every: "checkpoint" 模式下保存完整向量的间隔轮数。
+    Returns:
+        TraceSink 实例。
+    """
+    if isinstance(trace, TraceSink):
+        return trace
+    if trace is None or trace == "none":
+        return TraceSink()
+    if trace == "residual":
+        return ResidualTraceSink(output_dir)
+    if trace == "topk":
+        return TopKTraceSink(output_dir, top_k=top_k)
+    if trace == "checkpoint":
+        return CheckpointTraceSink(output_dir, every=every)
+    if trace == "full":
+        return FullDumpTraceSink(output_dir)
+    raise ValueError(f"未知的 trace 模式: {trace}")
@@ -0,0 +1,67 @@
+import numpy as np
+import scipy.sparse as sp
+
+from graph_builder import batch_days_since
+
+SPACE_LAMBDA = 0.001  # Space 影响力的时间衰减因子，与 compute_space_influence 一致
+
+
+class SpaceTable:
+    """
+    Space 影响力表：按 Space id 预先计算 likes * exp(-SPACE_LAMBDA * 天数)。
+    一个 Space 往往被许多模型引用，这里每个 Space 只解析一次日期、计算一次衰减。
+    """
+
+    def __init__(self, spaces_metadata, lambda_=SPACE_LAMBDA, today=None):
+        """
+        Args:
+            spaces_metadata (dict): spaces_metadata.json 的内容。
+            lambda_ (float): 时间衰减因子。
+            today (datetime): 参考时间，默认为当前时间。
+        """
+        self.space_ids = list(spaces_metadata)
+        self.index = {space: i for i, space in enumerate(self.space_ids)}
+        likes = np.fromiter((data.get("likes", 0) for data in spaces_metadata.values()),
+                            dtype=np.float64, count=len(self.space_ids))
+        days = batch_days_since([data.get("created_at", "1970-01-01") or "1970-01-01"
+                                 for data in spaces_metadata.values()], today=today)
+        self.decayed_likes = likes * np.exp(-lambda_ * days)
+
+    def __len__(self):
+        return len(self.space_ids)
+
+    def model_space_matrix(self, model_spaces):
+        """
+        构建 模型 × Space 的稀疏关联矩阵，第 i 行对应 model_spaces[i] 中出现在表里的 Space。
+        Args:
+            model_spaces (list): 每个模型的 spaces 列表。
+        Returns:
+            scipy.sparse.csr_matrix: 形状为 (模型数, Space 数)。
+        """
+        rows, cols = [], []
+        for i, spaces in enumerate(model_spaces):
+            for space in spaces or ():
+                j = self.index.get(space)
+                if j is not None:
+                    rows.append(i)
+                    cols.append(j)
+        data = np.ones(len(rows), dtype=np.float64)
+        # 重复出现的 Space 会被累加，与 compute_space_influence 逐个求和的行为一致
+        return sp.csr_matrix((data, (rows, cols)), shape=(len(model_spaces), len(self.space_ids)))
+
+    def model_influence(self, model_spaces):
+        """一次稀疏矩阵乘法得到每个模型关联的所有 Spaces 的总影响力"""
+        return self.model_space_matrix(model_spaces) @ self.decayed_likes
+
+    def top(self, k=20):
+        """返回衰减后 likes 最高的 k 个 Space：[(space_id, decayed_likes), ...]"""
+        k = min(k, len(self.space_ids))
+        if k <= 0:
+            return []
+        top = np.argpartition(-self.decayed_likes, k - 1)[:k]
+        top = top[np.argsort(-self.decayed_likes[top])]
+        return [(self.space_ids[i], float(self.decayed_likes[i])) for i in top]
+
+    def to_dict(self):
+        """Space id -> 衰减后的 likes，用于随图一起保存供数据大屏使用"""
+        return dict(zip(self.space_ids, self.decayed_likes.tolist()))
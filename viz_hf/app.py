@@ -1,16 +1,27 @@
 # app.py
 
+import gc
+import os
+import sys
+
 from flask import Flask
 
+# 与构建端共用的模块（分类属性的词表 categorical.py）在 data_hf 目录下，需在导入蓝图之前加入搜索路径
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data_hf'))
+
 from global_dashboard.routes import dashboard_bp
 from leaderboard.routes import leaderboard_bp
 from network_graph.routes import network_bp
+from graph_provider import init_graph_provider
 
 def create_app():
     app = Flask(__name__)
     
     # 配置应用（可选）
     app.config.from_object('config.Config')  # 如果你有配置文件
+
+    # 图数据在进程内只加载一次，文件更新后在后台热替换
+    init_graph_provider(app)
     
     # 注册蓝图
     app.register_blueprint(leaderboard_bp, url_prefix='/leaderboard')  # leaderboard 在 /leaderboard 路径下
@@ -27,6 +38,28 @@ def create_app():
     @app.errorhandler(400)
     def bad_request(error):
         return render_template('400.html', error=error), 400
+
+    # 诊断：处理本请求的 worker 的独占 / 共享内存以及当前图数据的版本
+    from flask import jsonify
+    from serving import process_memory
+
+    @app.route('/api/memory')
+    def memory():
+        provider = app.extensions['graph_provider']
+        try:
+            loaded = provider.current()
+        except FileNotFoundError:
+            # 图数据还没有生成（见 init_graph_provider），其余诊断信息照常返回
+            loaded = None
+        return jsonify({
+            "memory_mb": process_memory(),
+            "gc_frozen_objects": gc.get_freeze_count(),
+            "graph_source": loaded.source if loaded else None,
+            "graph_version": loaded.version if loaded else None,
+            "reload_count": provider.reload_count,
+            "last_reload_error": provider.last_error,
+            "network_cache": app.extensions['network_render_cache'].stats(),
+        })
     
     return app
 
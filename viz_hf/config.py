@@ -3,4 +3,9 @@
 class Config:
     SECRET_KEY = 'your_secret_key'
     GRAPH_PICKLE_PATH = 'graph.pkl'  # 替换为你的 pkl 文件路径
+    GRAPH_SNAPSHOT_PATH = 'graph_snapshot'  # 列式图快照目录（data_hf/graph_snapshot.py 生成），存在时优先使用
+    GRAPH_RELOAD_INTERVAL = 5  # 检查图数据文件是否更新的间隔（秒），0 表示不热更新
+    NETWORK_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 每个进程缓存渲染好的网络图所用的内存上限（字节）
+    NETWORK_CACHE_DIR = 'network_cache'  # 渲染好的网络图的磁盘缓存目录（所有 worker 共享），None 表示不使用磁盘
+    NETWORK_CACHE_DISK_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 磁盘缓存目录的大小上限（字节），超出时删除最久未使用的视图
     # 其他配置项...
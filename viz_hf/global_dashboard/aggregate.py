@@ -0,0 +1,425 @@
+# global_dashboard/aggregate.py
+# 大屏数据的聚合：每个图版本只算一次（见 graph_provider.derived），/dashboard/ 和 /dashboard/api/data 共用。
+# 先把每个节点在四个维度（语言、机构类型、任务类型、作者）上的分组编码和影响力整理成列，
+# 再用 numpy 一次性分组：np.bincount 计算每组的模型数和总影响力，一次稳定排序取出每组影响力最高的 10 个。
+# 只有被选中的模型才读取完整属性、生成 model_info，而不是为每个节点都生成一份。
+# 带筛选条件（创建日期、任务类型、基座模型家族）的下钻请求复用同一份节点列，条件转换为布尔掩码后重新分组。
+
+from datetime import date
+
+import numpy as np
+
+
+TOP_K = 10
+TOP_MODELS = 20
+TOP_SPACES = 20
+DIMENSIONS = ('language', 'org_type', 'task_type', 'author')
+# 个人作者刷分严重：机构类型统计中跳过个人账号，作者统计中跳过个人账号和模型数过多的作者
+AUTHOR_MAX_MODELS = 100
+
+LANGUAGE_MAPPING = {
+    "en": "英语",
+    "th": "泰语",
+    "zh": "中文",
+    "ko": "韩语",
+    "pt": "葡萄牙语",
+    "ar": "阿拉伯语",
+    "es": "西班牙语",
+    # ... to be updated
+}
+# 语言统计中只建立分组、不计入模型的语言
+LANGUAGE_SKIPPED = ('Unknown', 'multilingual')
+
+_EPOCH = date(1970, 1, 1)
+MISSING_DATE = -(1 << 62)  # 缺失或无法解析的创建日期
+
+
+def recursive_sanitize(obj):
+    """
+    递归遍历数据结构，将 None 替换为适当的默认值。
+
+    Args:
+        obj: 任意数据类型（dict, list, etc.）
+
+    Returns:
+        清洗后的数据结构
+    """
+    if isinstance(obj, dict):
+        return {k: recursive_sanitize(v) for k, v in obj.items()}
+    elif isinstance(obj, list):
+        return [recursive_sanitize(item) for item in obj]
+    elif obj is None:
+        return ""  # 根据需求选择默认值，例如空字符串
+    else:
+        return obj
+
+
+def _parse_days(created_at):
+    """创建日期字符串（YYYY-MM-DD...）-> 距 1970-01-01 的天数"""
+    try:
+        return (date.fromisoformat(created_at[:10]) - _EPOCH).days
+    except (TypeError, ValueError):
+        return MISSING_DATE
+
+
+def _language_key(language):
+    return LANGUAGE_MAPPING[language] if language in LANGUAGE_MAPPING else language
+
+
+class _Registry:
+    """分组名 -> 编码，编码按第一次出现的顺序分配（与原来按节点顺序插入 dict 的顺序一致）"""
+
+    def __init__(self):
+        self.codes = {}
+
+    def code(self, key):
+        code = self.codes.get(key)
+        if code is None:
+            code = self.codes[key] = len(self.codes)
+        return code
+
+    @property
+    def keys(self):
+        return list(self.codes)
+
+
+def _first_appearance(codes, keys, positions=None):
+    """
+    把编码重新按第一次出现的位置排序。
+    Args:
+        codes (np.ndarray): 每个元素的编码（0..len(keys)-1）。
+        keys (list): 编码 -> 分组名。
+        positions (np.ndarray): 每个元素出现的位置，默认为下标。
+    Returns:
+        remap (np.ndarray): 旧编码 -> 新编码，未出现的分组为 -1。
+        keys (list): 新编码 -> 分组名。
+    """
+    positions = np.arange(codes.size) if positions is None else positions
+    first = np.full(len(keys), np.inf)
+    np.minimum.at(first, codes, positions)
+    present = np.flatnonzero(np.isfinite(first))
+    present = present[np.argsort(first[present], kind='stable')]
+    remap = np.full(len(keys) + 1, -1, dtype=np.int64)
+    remap[present] = np.arange(present.size)
+    return remap, [keys[code] for code in present.tolist()]
+
+
+def _recode(raw, vocabulary, key_of):
+    """
+    把快照中的分类编码（缺失为 -1）转换为分组编码：key_of(取值) 相同的取值合并为一组，分组按第一次出现的顺序编号。
+    """
+    registry = _Registry()
+    # 编码 -1 通过下标 -1 取到最后一项，即缺失值
+    mapping = np.array([registry.code(key_of(value)) for value in list(vocabulary) + [None]], dtype=np.int64)
+    codes = mapping[np.asarray(raw, dtype=np.int64)]
+    remap, keys = _first_appearance(codes, registry.keys)
+    return remap[codes], keys
+
+
+class DashboardColumns:
+    """
+    大屏聚合用到的节点列，节点编号为 graph.nodes 的遍历顺序：
+        influence                  每个节点的影响力（attrs.get('influence', 0.0) or 0.0）
+        by_influence               按影响力降序（相同时按节点顺序）排列的节点编号，与 heapq.nlargest 的顺序一致
+        codes[dimension]           每个节点所属分组的编码，不计入该维度时为 -1
+        keys[dimension]            编码 -> 分组名，按第一次出现的顺序
+        language_indptr/_codes     每个节点的语言列表（CSR，编码同 keys['language']，空列表记为 'Unknown'）
+        author_excluded            每个作者是否不计入作者统计（第一个模型为个人账号，或模型数过多）
+        created_at                 创建日期（距 1970-01-01 的天数），缺失为 MISSING_DATE
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.snapshot = getattr(graph, "snapshot", None)
+        if self.snapshot is not None:
+            self._init_from_snapshot(self.snapshot)
+        else:
+            self._init_from_graph(graph)
+        self.num_nodes = len(self.node_ids)
+        self.by_influence = np.argsort(-self.influence, kind='stable')
+        # 作者是否为个人账号按其第一个模型判断
+        authors = self.codes['author']
+        first = np.full(len(self.keys['author']), self.num_nodes, dtype=np.int64)
+        np.minimum.at(first, authors, np.arange(self.num_nodes))
+        counts = np.bincount(authors, minlength=len(self.keys['author']))
+        self.author_excluded = self.individual[first] | (counts > AUTHOR_MAX_MODELS)
+        self._successors = None
+        self._positions = None
+
+    def _init_from_graph(self, graph):
+        # 只遍历一次节点，同时得到四个维度的分组
+        self.node_ids = list(graph.nodes)
+        count = len(self.node_ids)
+        registries = {dimension: _Registry() for dimension in DIMENSIONS}
+        codes = {dimension: np.empty(count, dtype=np.int64) for dimension in DIMENSIONS}
+        influence = np.empty(count, dtype=np.float64)
+        individual = np.empty(count, dtype=bool)
+        created_at = np.empty(count, dtype=np.int64)
+        language_indptr = np.zeros(count + 1, dtype=np.int64)
+        language_codes = []
+        for i, node_id in enumerate(self.node_ids):
+            attrs = graph.nodes[node_id]
+            influence[i] = attrs.get('influence', 0.0) or 0.0
+            created_at[i] = _parse_days(attrs.get('created_at'))
+
+            language_lst = attrs.get('language', ['Unknown']) or ['Unknown']
+            if isinstance(language_lst, str):
+                language_lst = [language_lst]
+            for language in language_lst:
+                language = _language_key(language)
+                language_codes.append(registries['language'].code(language))
+            language_indptr[i + 1] = len(language_codes)
+            # 模型计入其语言列表中的最后一种语言
+            codes['language'][i] = -1 if language in LANGUAGE_SKIPPED else registries['language'].code(language)
+
+            org_type = attrs.get('org_type', '_unauthorized') or '_unauthorized'
+            individual[i] = org_type == 'individual'
+            codes['org_type'][i] = -1 if individual[i] else registries['org_type'].code(org_type)
+
+            codes['task_type'][i] = registries['task_type'].code(attrs.get('task_type', 'Unknown') or 'Unknown')
+            codes['author'][i] = registries['author'].code(attrs.get('author_full_name', 'Unknown') or 'Unknown')
+        self.influence = influence
+        self.individual = individual
+        self.created_at = created_at
+        self.language_indptr = language_indptr
+        self.language_codes = np.array(language_codes, dtype=np.int64)
+        self.codes = codes
+        self.keys = {dimension: registry.keys for dimension, registry in registries.items()}
+
+    def _init_from_snapshot(self, snapshot):
+        # 快照中的列本身就是编码数组，分组编码由词表换算，不需要逐个节点解码
+        self.node_ids = snapshot.model_ids
+        self.influence = np.asarray(snapshot.column('influence'), dtype=np.float64)
+        created_at = np.asarray(snapshot.column('created_at'), dtype=np.int64)
+        self.created_at = np.where(created_at == snapshot.missing_date, MISSING_DATE, created_at)
+        self.codes, self.keys = {}, {}
+        vocabulary = snapshot.tables[snapshot.header['categorical_columns']['org_type']].tolist()
+        org_type, org_keys = _recode(snapshot.column('org_type'), vocabulary, lambda v: v or '_unauthorized')
+        self.individual = org_type == (org_keys.index('individual') if 'individual' in org_keys else -2)
+        self.codes['org_type'], self.keys['org_type'] = self._without(org_type, org_keys, ('individual',))
+        vocabulary = snapshot.tables[snapshot.header['categorical_columns']['task_type']].tolist()
+        self.codes['task_type'], self.keys['task_type'] = _recode(snapshot.column('task_type'), vocabulary,
+                                                                  lambda v: v or 'Unknown')
+        vocabulary = snapshot.tables[snapshot.header['categorical_columns']['author_full_name']].tolist()
+        self.codes['author'], self.keys['author'] = _recode(snapshot.column('author_full_name'), vocabulary,
+                                                            lambda v: v or 'Unknown')
+        self._snapshot_languages(snapshot)
+
+    @staticmethod
+    def _without(codes, keys, skipped):
+        """去掉 skipped 中的分组（对应节点编码置为 -1），其余分组重新连续编号"""
+        kept = [code for code, key in enumerate(keys) if key not in skipped]
+        remap = np.full(len(keys) + 1, -1, dtype=np.int64)
+        remap[kept] = np.arange(len(kept))
+        return remap[codes], [keys[code] for code in kept]
+
+    def _snapshot_languages(self, snapshot):
+        indptr = np.asarray(snapshot.column('language_indptr'), dtype=np.int64)
+        registry = _Registry()
+        mapping = np.array([registry.code(_language_key(value)) for value in snapshot.tables['language'].tolist()],
+                           dtype=np.int64)
+        unknown = registry.code('Unknown')
+        lengths = np.diff(indptr)
+        # 语言列表为空的节点视为 ['Unknown']
+        new_indptr = np.zeros(indptr.size, dtype=np.int64)
+        np.cumsum(np.maximum(lengths, 1), out=new_indptr[1:])
+        flat = np.full(new_indptr[-1], unknown, dtype=np.int64)
+        owner = np.repeat(np.arange(lengths.size), lengths)
+        flat[new_indptr[owner] + np.arange(owner.size) - indptr[owner]] = mapping[
+            np.asarray(snapshot.column('language'), dtype=np.int64)]
+        # 分组按第一次出现的顺序编号
+        remap, keys = _first_appearance(flat, registry.keys)
+        self.language_indptr = new_indptr
+        self.language_codes = remap[flat]
+        # 模型计入其语言列表中的最后一种语言
+        codes = self.language_codes[new_indptr[1:] - 1].copy()
+        skipped = [keys.index(key) for key in LANGUAGE_SKIPPED if key in keys]
+        codes[np.isin(codes, skipped)] = -1
+        self.codes['language'], self.keys['language'] = codes, keys
+
+    def attrs(self, i):
+        """第 i 个节点的属性字典"""
+        if self.snapshot is not None:
+            return self.snapshot.node_attrs(i)
+        return self.graph.nodes[self.node_ids[i]]
+
+    def node_index(self, node_id):
+        """模型 id -> 节点编号，不存在时返回 None"""
+        if self.snapshot is not None:
+            return self.snapshot.node_index(node_id)
+        if self._positions is None:
+            self._positions = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        return self._positions.get(node_id)
+
+    def successors(self):
+        """子模型的 CSR 邻接表 (indptr, indices)；pickle 图第一次用到时构建"""
+        if self._successors is None:
+            if self.snapshot is not None:
+                self._successors = (np.asarray(self.snapshot.column('succ_indptr'), dtype=np.int64),
+                                    np.asarray(self.snapshot.column('succ_indices'), dtype=np.int64))
+            else:
+                indptr = np.zeros(self.num_nodes + 1, dtype=np.int64)
+                indices = []
+                for i, node_id in enumerate(self.node_ids):
+                    indices.extend(self.node_index(child) for child in self.graph.successors(node_id))
+                    indptr[i + 1] = len(indices)
+                self._successors = (indptr, np.array(indices, dtype=np.int64))
+        return self._successors
+
+    def family(self, root):
+        """
+        以 root 为根的模型家族（root 及其所有后代）的布尔掩码，按层展开，每层一次向量化的 CSR 取数。
+        """
+        indptr, indices = self.successors()
+        mask = np.zeros(self.num_nodes, dtype=bool)
+        mask[root] = True
+        frontier = np.array([root], dtype=np.int64)
+        while frontier.size:
+            starts, lengths = indptr[frontier], indptr[frontier + 1] - indptr[frontier]
+            offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+            children = np.unique(indices[offsets])
+            frontier = children[~mask[children]]
+            mask[frontier] = True
+        return mask
+
+    def filter_mask(self, created_from=None, created_to=None, task_type=None, base_model=None):
+        """
+        把筛选条件转换为节点的布尔掩码，没有任何条件时返回 None。
+        Args:
+            created_from (date): 创建日期不早于该日期（含），缺失日期的模型不计入。
+            created_to (date): 创建日期不晚于该日期（含）。
+            task_type (str): 任务类型（与大屏中的任务类型分组名相同，缺失为 'Unknown'）。
+            base_model (str): 只统计该基座模型及其所有衍生模型。
+        Raises:
+            KeyError: base_model 不在图中。
+        """
+        if created_from is None and created_to is None and task_type is None and base_model is None:
+            return None
+        mask = np.ones(self.num_nodes, dtype=bool)
+        if created_from is not None or created_to is not None:
+            mask &= self.created_at != MISSING_DATE
+            if created_from is not None:
+                mask &= self.created_at >= (created_from - _EPOCH).days
+            if created_to is not None:
+                mask &= self.created_at <= (created_to - _EPOCH).days
+        if task_type is not None:
+            keys = self.keys['task_type']
+            mask &= self.codes['task_type'] == (keys.index(task_type) if task_type in keys else -2)
+        if base_model is not None:
+            root = self.node_index(base_model)
+            if root is None:
+                raise KeyError(base_model)
+            mask &= self.family(root)
+        return mask
+
+
+def group_stats(codes, num_groups, influence, ranked, mask=None, k=TOP_K):
+    """
+    按分组编码统计。
+    Args:
+        codes (np.ndarray): 每个节点的分组编码，-1 表示不计入。
+        num_groups (int): 分组数。
+        influence (np.ndarray): 每个节点的影响力。
+        ranked (np.ndarray): 参与统计的节点，已按影响力降序（相同时按节点顺序）排列。
+        mask (np.ndarray): 参与统计的节点的布尔掩码，为 None 时为全部节点（与 ranked 对应）。
+        k (int): 每组保留影响力最高的模型数。
+    Returns:
+        counts (np.ndarray): 每组的模型数。
+        sums (np.ndarray): 每组的总影响力（按节点顺序累加，与逐个相加的结果相同）。
+        tops (list): 每组影响力最高的 k 个节点编号，影响力相同时按节点顺序（与 heapq.nlargest 一致）。
+    """
+    selected = codes >= 0 if mask is None else (codes >= 0) & mask
+    group = codes[selected]
+    counts = np.bincount(group, minlength=num_groups)
+    sums = np.bincount(group, weights=influence[selected], minlength=num_groups)
+    # ranked 已按影响力排好，按分组稳定排序后组内仍是影响力降序，每组的前 k 个即为该组的 top k
+    ranked = ranked[codes[ranked] >= 0]
+    ranked = ranked[np.argsort(codes[ranked], kind='stable')]
+    starts = np.concatenate([[0], np.cumsum(counts)])
+    tops = [ranked[starts[g]:starts[g] + min(k, counts[g])] for g in range(num_groups)]
+    return counts, sums, tops
+
+
+def _model_info(node_id, attrs, name=None):
+    return {
+        'name': node_id if name is None else name,
+        'task_type': attrs.get('task_type', 'Unknown'),
+        'author_full_name': attrs.get('author_full_name', 'Unknown'),
+        'created_at': attrs.get('created_at', '0001-01-01') or '0001-01-01',
+        'downloads': attrs.get('downloads', 0) or 0,
+        'likes': attrs.get('likes', 0) or 0,
+        'influence': attrs.get('influence', 0.0) or 0.0,
+        'pic': attrs.get('pic', '')
+    }
+
+
+def _top_model_info(node_id, attrs):
+    downloads = attrs.get('downloads', 0) or 0
+    likes = attrs.get('likes', 0) or 0
+    influence = attrs.get('influence', 0.0) or 0.0
+    return {
+        'name': node_id.split('/')[-1],
+        'downloads': downloads,
+        'likes': likes,
+        'influence': influence,
+        'score': influence,
+        'task_type': attrs.get('task_type', 'Unknown') or 'Unknown',
+        'author_full_name': attrs.get('author_full_name', 'Unknown') or 'Unknown',
+        'created_at': attrs.get('created_at', '0001-01-01') or '0001-01-01',
+        'pic': attrs.get('pic', '') or '',
+        'space_influence': attrs.get('space_influence', 0.0) or 0.0
+    }
+
+
+def _entry(columns, dimension, i):
+    """分组 top 列表中的一项，字段与原来各模块生成的 model_info 相同"""
+    node_id = columns.node_ids[i]
+    attrs = columns.attrs(i)
+    if dimension == 'language':
+        return _model_info(node_id, attrs, name=attrs.get('name', node_id))
+    info = _model_info(node_id, attrs)
+    if dimension == 'author':
+        info['org_type'] = attrs.get('org_type', '_unauthorized') or '_unauthorized'
+    return info
+
+
+def aggregate(columns, mask=None):
+    """
+    计算大屏的全部数据。
+    Args:
+        columns (DashboardColumns): 节点列。
+        mask (np.ndarray): 只统计这些节点（见 DashboardColumns.filter_mask），为 None 时统计全部节点。
+    Returns:
+        dict: language/org_type/task_type/author 的 *_dict（每组前 10 个模型）与 *_info（模型数、总影响力），
+            以及 top20_models，所有 None 已替换为 ""。
+    """
+    ranked = columns.by_influence if mask is None else columns.by_influence[mask[columns.by_influence]]
+    data = {}
+    for dimension in DIMENSIONS:
+        keys = columns.keys[dimension]
+        counts, sums, tops = group_stats(columns.codes[dimension], len(keys), columns.influence, ranked, mask)
+        if dimension == 'language':
+            # 语言分组由模型的语言列表中出现过的语言建立（即使模型只计入最后一种语言）
+            present = np.zeros(len(keys), dtype=bool)
+            listed = columns.language_codes if mask is None else \
+                columns.language_codes[np.repeat(mask, np.diff(columns.language_indptr))]
+            present[listed] = True
+        else:
+            present = counts > 0
+        group_dict, group_info = {}, {}
+        for g in np.flatnonzero(present).tolist():
+            key = keys[g]
+            group_dict[key] = [_entry(columns, dimension, i) for i in tops[g].tolist()]
+            if dimension == 'author' and columns.author_excluded[g]:
+                continue
+            group_info[key] = {
+                'num_models': int(counts[g]),
+                # 空分组与 sum([]) 一样为整数 0
+                'total_influence': sums[g].item() if counts[g] else 0
+            }
+        data[f'{dimension}_dict'] = recursive_sanitize(group_dict)
+        data[f'{dimension}_info'] = recursive_sanitize(group_info)
+    data['top20_models'] = recursive_sanitize([_top_model_info(columns.node_ids[i], columns.attrs(i))
+                                               for i in ranked[:TOP_MODELS].tolist()])
+    return data
+
@@ -0,0 +1,56 @@
+# global_dashboard/payload.py
+# 预先序列化、预先压缩的大屏数据：每个图版本只序列化一次 JSON，并同时保存 gzip 和 brotli 两份压缩结果，
+# 请求到来时根据 Accept-Encoding 直接返回对应的字节，不再每次调用 jsonify 或压缩。
+
+import gzip
+import hashlib
+import json
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，没有安装时只提供 gzip
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9  # 11 的压缩率只高一点，但大图上慢一个数量级，会拖慢热更新后的预热
+
+# 优先级从高到低
+ENCODINGS = ('br', 'gzip')
+
+
+class Payload:
+    """
+    一份 JSON 数据的原始字节与各种压缩编码，以及每种编码各自的强 ETag（内容哈希）。
+    """
+
+    def __init__(self, data):
+        """
+        Args:
+            data: 可以 JSON 序列化的对象。
+        """
+        self.body = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        self.digest = hashlib.sha256(self.body).hexdigest()[:32]
+        self.variants = {None: self.body, 'gzip': gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(self.body, quality=BROTLI_QUALITY)
+
+    def etag(self, encoding=None):
+        """每种编码的字节不同，ETag 也加上编码后缀"""
+        return self.digest if encoding is None else f"{self.digest}-{encoding}"
+
+    def choose(self, accept_encodings):
+        """
+        按请求的 Accept-Encoding 选择编码。
+        Args:
+            accept_encodings: request.accept_encodings。
+        Returns:
+            (encoding, body): 不压缩时 encoding 为 None。
+        """
+        for encoding in ENCODINGS:
+            if encoding in self.variants and accept_encodings[encoding] > 0:
+                return encoding, self.variants[encoding]
+        return None, self.body
+
+    def sizes(self):
+        """各编码的字节数，便于查看压缩效果"""
+        return {encoding or 'identity': len(body) for encoding, body in self.variants.items()}
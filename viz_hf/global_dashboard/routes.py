@@ -1,116 +1,154 @@
 # global_dashboard/routes.py
 
-from flask import Blueprint, render_template, jsonify
-from .utils import load_graph, language_module, org_type_module, task_type_module, author_module, get_top20_models
-import heapq
+from flask import Blueprint, Response, render_template, jsonify, request, url_for
+from werkzeug.http import is_resource_modified
+from .aggregate import DashboardColumns, aggregate, TOP_SPACES
+from .payload import Payload
+from .timeline import build_growth_cube
+from .utils import get_top_spaces, parse_filters, FILTER_ARGS
+from graph_provider import current_graph, derived, register_warmer
 
 dashboard_bp = Blueprint('dashboard_bp', __name__, template_folder='templates', static_folder='static')
 
-def recursive_sanitize(obj):
-    """
-    递归遍历数据结构，将 None 替换为适当的默认值。
-    
-    Args:
-        obj: 任意数据类型（dict, list, etc.）
-    
-    Returns:
-        清洗后的数据结构
-    """
-    if isinstance(obj, dict):
-        return {k: recursive_sanitize(v) for k, v in obj.items()}
-    elif isinstance(obj, list):
-        return [recursive_sanitize(item) for item in obj]
-    elif obj is None:
-        return ""  # 根据需求选择默认值，例如空字符串
+
+class DashboardPayload(Payload):
+    """
+    大屏数据序列化后的字节；另外保留 TOP20 模型列表（供 /api/top20_models 使用）、
+    节点列（带筛选条件的请求在其上重新聚合）和影响力最高的 Space（与筛选条件无关）。
+    """
+
+    def __init__(self, data, columns):
+        super().__init__(data)
+        self.top20_models = data['top20_models']
+        self.top20_spaces = data['top20_spaces']
+        self.columns = columns
+
+
+def build_dashboard_payload(graph):
+    """derived 的构建函数：聚合（见 aggregate.py）后立即序列化、压缩"""
+    columns = DashboardColumns(graph)
+    data = aggregate(columns)
+    data['top20_spaces'] = get_top_spaces(graph, TOP_SPACES)
+    return DashboardPayload(data, columns)
+
+
+register_warmer(dashboard_bp, 'dashboard_payload', build_dashboard_payload)
+register_warmer(dashboard_bp, 'growth_cube', build_growth_cube)
+
+
+def get_dashboard_payload(loaded=None):
+    """
+    当前图版本的大屏数据（语言、机构类型、任务类型、作者的分组统计与 TOP 模型），每个版本只计算、序列化一次。
+    """
+    return derived(loaded or current_graph(), 'dashboard_payload', build_dashboard_payload)
+
+
+def version_headers(response, loaded):
+    """
+    只取决于图版本和查询参数的响应：ETag 与 Last-Modified 取自图数据的版本，图更新之前可以用 304 重新验证。
+    """
+    response.set_etag(str(loaded.version))
+    response.last_modified = loaded.modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def payload_response(payload):
+    """
+    按 Accept-Encoding 直接返回预先压缩好的字节；ETag 与请求的 If-None-Match 相同时返回 304。
+    """
+    encoding, body = payload.choose(request.accept_encodings)
+    etag = payload.etag(encoding)
+    if not is_resource_modified(request.environ, etag=etag):
+        response = Response(status=304)
     else:
-        return obj
+        response = Response(body, mimetype='application/json')
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = True
+    return response
+
 
 @dashboard_bp.route('/')
 def dashboard():
     """
-    渲染大模型开源洞察大屏的主页面。
+    渲染大模型开源洞察大屏的主页面。数据不内嵌在页面中，由页面脚本从 /dashboard/api/data 获取。
     """
-    try:
-        graph = load_graph()
-    except FileNotFoundError as e:
-        return str(e), 404
-
-    # 获取语言、机构类型、任务类型和作者的数据
-    language_dict, language_info = language_module(graph)
-    org_type_dict, org_type_info = org_type_module(graph)
-    task_type_dict, task_type_info = task_type_module(graph)
-    author_dict, author_info = author_module(graph)
-    top20_models = get_top20_models(graph)
-
-    # 清洗所有数据，替换 None 为 ""
-    language_dict = recursive_sanitize(language_dict)
-    language_info = recursive_sanitize(language_info)
-    org_type_dict = recursive_sanitize(org_type_dict)
-    org_type_info = recursive_sanitize(org_type_info)
-    task_type_dict = recursive_sanitize(task_type_dict)
-    task_type_info = recursive_sanitize(task_type_info)
-    author_dict = recursive_sanitize(author_dict)
-    author_info = recursive_sanitize(author_info)
-    top20_models = recursive_sanitize(top20_models)
-
-    return render_template(
-        'dashboard.html',
-        language_dict=language_dict,
-        language_info=language_info,
-        org_type_dict=org_type_dict,
-        org_type_info=org_type_info,
-        task_type_dict=task_type_dict,
-        task_type_info=task_type_info,
-        author_dict=author_dict,
-        author_info=author_info,
-        top20_models=top20_models
-    )
+    # 页面地址上的筛选参数原样转交给数据接口，例如 /dashboard/?task_type=text-generation
+    filters = {name: request.args[name] for name in FILTER_ARGS if request.args.get(name)}
+    return render_template('dashboard.html', data_url=url_for('dashboard_bp.get_dashboard_data', **filters),
+                           timeline_url=url_for('dashboard_bp.get_timeline_data'))
 
 @dashboard_bp.route('/api/data')
 def get_dashboard_data():
     """
     提供前端需要的所有数据，以 JSON 格式返回。
+    不带参数时返回预先序列化并压缩的全量数据；可以用以下参数只统计一部分模型（下钻）：
+        created_from / created_to: 创建日期范围（YYYY-MM-DD，含两端）
+        task_type: 任务类型
+        base_model: 基座模型 id，只统计该模型及其所有衍生模型
+    筛选条件在节点列上转换为布尔掩码后重新分组聚合，不遍历图。
     """
     try:
-        graph = load_graph()
+        filters = parse_filters(request.args)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    try:
+        loaded = current_graph()
+        payload = get_dashboard_payload(loaded)
     except FileNotFoundError as e:
         return jsonify({"error": str(e)}), 404
 
-    # 获取语言、机构类型、任务类型和作者的数据
-    language_dict, language_info = language_module(graph)
-    org_type_dict, org_type_info = org_type_module(graph)
-    task_type_dict, task_type_info = task_type_module(graph)
-    author_dict, author_info = author_module(graph)
-    top20_models = get_top20_models(graph )  
-
-    # 清洗所有数据，替换 None 为 ""
-    language_dict = recursive_sanitize(language_dict)
-    language_info = recursive_sanitize(language_info)
-    org_type_dict = recursive_sanitize(org_type_dict)
-    org_type_info = recursive_sanitize(org_type_info)
-    task_type_dict = recursive_sanitize(task_type_dict)
-    task_type_info = recursive_sanitize(task_type_info)
-    author_dict = recursive_sanitize(author_dict)
-    author_info = recursive_sanitize(author_info)
-    top20_models = recursive_sanitize(top20_models)
-    data = {
-        "language_info": language_info,
-        "org_type_info": org_type_info,
-        "task_type_info": task_type_info,
-        "author_info": author_info,
-        "language_dict": language_dict,
-        "org_type_dict": org_type_dict,
-        "task_type_dict": task_type_dict,
-        "author_dict": author_dict,
-        "top20_models": top20_models
-    }
-
-    # 添加调试日志
-    print("API Data - Author Info: %s", author_info)
-
-    print("API Data - Author Dict: %s", author_dict)
-
-    return jsonify(data)
+    if not filters:
+        return payload_response(payload)
+
+    if not is_resource_modified(request.environ, etag=str(loaded.version), last_modified=loaded.modified):
+        return version_headers(Response(status=304), loaded)
+    try:
+        mask = payload.columns.filter_mask(**filters)
+    except KeyError:
+        return jsonify({"error": f"模型不存在: {filters['base_model']}"}), 404
+    data = aggregate(payload.columns, mask)
+    data['top20_spaces'] = payload.top20_spaces
+    data['num_models'] = int(mask.sum())
+    data['filters'] = {name: str(value) for name, value in filters.items()}
+    return version_headers(jsonify(data), loaded)
+
+
+@dashboard_bp.route('/api/timeline')
+def get_timeline_data():
+    """
+    生态增长曲线：按创建月份统计的新增模型数、下载量或影响力，以 JSON 格式返回。
+    参数：
+        dimension: total / task_type / org_type / language / derivation（衍生方式，即来自父模型的边的类型），默认 total
+        metric: count / downloads / influence，默认 count
+        from / to: 月份范围（YYYY-MM，含两端）
+        cumulative: 为 1 时返回累计值
+        top: 只返回数值最大的若干个分组，其余合并为 Others，默认 10
+    数据来自写快照时预先算好的 月 × 分组 立方体，每个请求只是数组切片。
+    """
+    try:
+        loaded = current_graph()
+    except FileNotFoundError as e:
+        return jsonify({"error": str(e)}), 404
+    cube = derived(loaded, 'growth_cube', build_growth_cube)
+    if cube is None:
+        return jsonify({"error": "当前图数据没有增长曲线汇总，请用 data_hf/graph_snapshot.py 重新生成快照"}), 404
+    if not is_resource_modified(request.environ, etag=str(loaded.version), last_modified=loaded.modified):
+        return version_headers(Response(status=304), loaded)
+
+    dimension = request.args.get('dimension', 'total')
+    metric = request.args.get('metric', 'count')
+    top = request.args.get('top', 10, type=int)
+    try:
+        data = cube.series(dimension, metric, request.args.get('from') or None, request.args.get('to') or None,
+                           cumulative=request.args.get('cumulative') == '1', top=max(top, 0))
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    data.update({'dimension': dimension, 'metric': metric})
+    return version_headers(jsonify(data), loaded)
 
 
 @dashboard_bp.route('/api/top20_models')
@@ -119,17 +157,8 @@ def get_top20_models_api():
     提供TOP20模型的数据，以 JSON 格式返回。
     """
     try:
-        graph = load_graph()
+        payload = get_dashboard_payload()
     except FileNotFoundError as e:
         return jsonify({"error": str(e)}), 404
 
-    # 获取TOP20模型数据
-    top20_models = get_top20_models(graph, alpha=1, beta=1, gamma=1)  # 调整权重系数
-    
-    # 清洗数据
-    top20_models = recursive_sanitize(top20_models)
-    
-    # 添加调试日志
-    logger.debug("API Top20 Models: %s", top20_models)
-    
-    return jsonify({"top20_models": top20_models})
\ No newline at end of file
+    return jsonify({"top20_models": payload.top20_models})
@@ -0,0 +1,117 @@
+# global_dashboard/timeline.py
+# 生态增长曲线：读取快照中预先算好的 月 × 分组 立方体（写快照时由 data_hf/growth_rollup.py 生成），
+# 每个请求只对内存映射的数组切片、求前缀和，不扫描节点。
+
+import numpy as np
+
+from .aggregate import _language_key
+
+TIMELINE_DIMENSIONS = ('total', 'task_type', 'org_type', 'language', 'derivation')
+TIMELINE_METRICS = ('count', 'downloads', 'influence')
+OTHERS_LABEL = 'Others'
+
+
+class GrowthCube:
+    """
+    每个维度、每个指标一个 (月数, 分组数) 的数组：第 m 行为第 m 个月（从 first_month 起）创建的模型的
+    模型数 / 下载量 / 影响力之和。多值维度（语言、衍生方式）中一个模型计入它的每个分组。
+    """
+
+    def __init__(self, first_month, num_months, cubes, labels):
+        """
+        Args:
+            first_month (int): 第一个月，自 1970-01 起的月数。
+            num_months (int): 月数。
+            cubes (dict): (维度, 指标) -> 数组。
+            labels (dict): 维度 -> 分组名列表。
+        """
+        self.first_month = first_month
+        self.num_months = num_months
+        self.cubes = cubes
+        self.labels = labels
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """读取快照中的立方体；快照由旧版本生成、没有立方体时返回 None"""
+        info = snapshot.header.get('rollup')
+        if info is None:
+            return None
+        cubes, labels = {}, {}
+        for dimension in TIMELINE_DIMENSIONS:
+            labels[dimension] = snapshot.tables[f'rollup_{dimension}'].tolist()
+            for metric in TIMELINE_METRICS:
+                cubes[dimension, metric] = snapshot.column(f'rollup_{dimension}_{metric}')
+        # 语言名与大屏的语言统计一致（如 en -> 英语），换名后同名的分组合并
+        names = [_language_key(language) for language in labels['language']]
+        if len(set(names)) < len(names):
+            merged = list(dict.fromkeys(names))
+            columns = np.array([merged.index(name) for name in names], dtype=np.int64)
+            for metric in TIMELINE_METRICS:
+                cube = cubes['language', metric]
+                total = np.zeros((cube.shape[0], len(merged)), dtype=cube.dtype)
+                np.add.at(total, (slice(None), columns), cube)
+                cubes['language', metric] = total
+            names = merged
+        labels['language'] = names
+        return cls(np.datetime64(info['first_month'], 'M').astype(np.int64).item(), info['num_months'], cubes, labels)
+
+    def month_label(self, m):
+        """第 m 个月 -> 'YYYY-MM'"""
+        return str(np.datetime64(self.first_month + m, 'M'))
+
+    def month_offset(self, month):
+        """
+        'YYYY-MM' -> 相对于第一个月的序号（可能超出范围，由调用方截断）。
+        Raises:
+            ValueError: 格式不正确。
+        """
+        try:
+            return np.datetime64(month, 'M').astype(np.int64).item() - self.first_month
+        except ValueError as error:
+            raise ValueError(f"无效的月份: {month}，应为 YYYY-MM") from error
+
+    def series(self, dimension, metric='count', start=None, end=None, cumulative=False, top=None):
+        """
+        切出一段时间的增长曲线。
+        Args:
+            dimension (str): TIMELINE_DIMENSIONS 之一。
+            metric (str): TIMELINE_METRICS 之一。
+            start (str): 起始月份 'YYYY-MM'（含），默认为第一个月。
+            end (str): 结束月份 'YYYY-MM'（含），默认为最后一个月。
+            cumulative (bool): 是否返回累计值（从第一个月起累加，而不是从 start 起）。
+            top (int): 只保留这段时间内（累计时为截至 end）数值最大的 top 个分组，其余合并为 Others。
+        Returns:
+            dict: {'months': ['YYYY-MM', ...], 'series': [{'name', 'values'}, ...]}，分组按数值降序。
+        Raises:
+            ValueError: 维度、指标或月份无效。
+        """
+        if dimension not in TIMELINE_DIMENSIONS:
+            raise ValueError(f"不支持的维度: {dimension}")
+        if metric not in TIMELINE_METRICS:
+            raise ValueError(f"不支持的指标: {metric}")
+        lo = 0 if start is None else max(self.month_offset(start), 0)
+        hi = self.num_months if end is None else min(self.month_offset(end) + 1, self.num_months)
+        hi = max(hi, lo)
+        cube = self.cubes[dimension, metric]
+        values = np.cumsum(cube[:hi], axis=0)[lo:] if cumulative else np.asarray(cube[lo:hi])
+        labels = self.labels[dimension]
+
+        totals = (values[-1] if cumulative else values.sum(axis=0)) if values.shape[0] else np.zeros(len(labels))
+        rest = None
+        if top is not None and len(labels) > top:
+            # 只需前 top 个分组的顺序：argpartition 选出后只对这几个排序，其余合并
+            chosen = np.argpartition(-totals, top - 1)[:top] if top > 0 else np.arange(0)
+            order = chosen[np.lexsort((chosen, -totals[chosen]))]
+            rest = np.setdiff1d(np.arange(len(labels)), chosen, assume_unique=True)
+        else:
+            order = np.argsort(-totals, kind='stable')
+        series = [{'name': labels[g], 'values': values[:, g].tolist()} for g in order.tolist()]
+        if rest is not None:
+            series.append({'name': OTHERS_LABEL, 'values': values[:, rest].sum(axis=1).tolist()})
+        return {'months': [self.month_label(m) for m in range(lo, hi)], 'series': series}
+
+
+def build_growth_cube(graph):
+    """derived 的构建函数：快照中有立方体时读取，否则（graph.pkl 或旧版快照）返回 None"""
+    snapshot = getattr(graph, 'snapshot', None)
+    return GrowthCube.from_snapshot(snapshot) if snapshot is not None else None
@@ -0,0 +1,212 @@
+# graph_provider.py
+# 进程内共享的图对象：create_app 时加载一次，之后所有请求共用。
+# 请求到来时（最多每 reload_interval 秒一次）检查快照的 snapshot_id 或 graph.pkl 的修改时间，
+# 发生变化时在后台线程中加载新图，加载完成后整体替换引用；请求既不会等待重新加载，也不会看到加载了一半的图。
+# 检查放在请求里而不是常驻线程里做，是因为 gunicorn 在 fork worker 时不会复制主进程的线程。
+
+import json
+import os
+import pickle
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from categorical import intern_graph
+from snapshot import GraphSnapshot
+
+# graph: 图对象（快照视图或 EasyGraph 图）；version: 快照的 snapshot_id 或 pickle 文件的修改时间与大小；
+# source: "snapshot" 或 "pickle"；loaded_at: 加载完成的时间戳；
+# modified: 快照 header.json 或 pickle 文件的修改时间（UTC datetime），所有 worker 一致，用作 HTTP 的 Last-Modified；
+# derived: 由该版本的图派生出的索引、聚合结果等（见 derived），随图一起替换
+LoadedGraph = namedtuple("LoadedGraph", ["graph", "version", "source", "loaded_at", "modified", "derived"])
+
+_derived_locks = {}
+_derived_locks_guard = threading.Lock()
+
+
+def derived(loaded, name, builder):
+    """
+    取出（第一次时构建）某个版本的图的派生数据，例如排行榜的排序索引。每个版本每种数据只构建一次，
+    并发请求等待同一次构建；图被热更新后自动随新版本重新构建。
+    Args:
+        loaded (LoadedGraph): 当前图。
+        name (str): 派生数据的名字。
+        builder: builder(graph) -> 派生数据。
+    """
+    value = loaded.derived.get(name)
+    if value is not None:
+        return value
+    with _derived_locks_guard:
+        lock = _derived_locks.setdefault(name, threading.Lock())
+    with lock:
+        value = loaded.derived.get(name)
+        if value is None:
+            value = loaded.derived[name] = builder(loaded.graph)
+    return value
+
+
+def file_signature(snapshot_path, pickle_path):
+    """
+    当前磁盘上图数据的版本标识，优先使用快照。
+    Returns:
+        (source, version): 两者都不存在时返回 (None, None)。
+    """
+    header_path = os.path.join(snapshot_path, "header.json") if snapshot_path else None
+    if header_path and os.path.exists(header_path):
+        with open(header_path, "r", encoding="utf-8") as f:
+            return "snapshot", json.load(f)["snapshot_id"]
+    if pickle_path and os.path.exists(pickle_path):
+        stat = os.stat(pickle_path)
+        return "pickle", f"{stat.st_mtime_ns}-{stat.st_size}"
+    return None, None
+
+
+def file_modified(path):
+    """文件的修改时间（UTC datetime）"""
+    return datetime.fromtimestamp(os.path.getmtime(path), timezone.utc)
+
+
+def load_graph_file(snapshot_path, pickle_path):
+    """
+    加载图对象：优先以内存映射方式打开列式快照，不存在时从 pickle 文件中加载 EasyGraph 对象。
+    Returns:
+        LoadedGraph
+    """
+    source, version = file_signature(snapshot_path, pickle_path)
+    if source == "snapshot":
+        snapshot = GraphSnapshot.open(snapshot_path)
+        modified = file_modified(os.path.join(snapshot_path, "header.json"))
+        return LoadedGraph(snapshot.as_graph(), snapshot.version, source, time.time(), modified, {})
+    if source is None:
+        raise FileNotFoundError(f"Pickle 文件未找到，路径: {pickle_path}")
+    modified = file_modified(pickle_path)
+    with open(pickle_path, 'rb') as f:
+        graph = pickle.load(f)
+    # 旧版本的 graph.pkl 没有做过字典编码，加载后补做，重复的分类属性字符串只保留一份
+    intern_graph(graph)
+    return LoadedGraph(graph, version, source, time.time(), modified, {})
+
+
+class GraphProvider:
+    """
+    持有当前图对象并负责热更新。current() 总是立即返回，最多触发一次后台检查。
+    """
+
+    def __init__(self, snapshot_path, pickle_path, reload_interval=5.0):
+        """
+        Args:
+            snapshot_path (str): 列式快照目录。
+            pickle_path (str): graph.pkl 路径，快照不存在时使用。
+            reload_interval (float): 检查文件变化的最小间隔（秒），为 0 或 None 时不检查。
+        """
+        self.snapshot_path = snapshot_path
+        self.pickle_path = pickle_path
+        self.reload_interval = reload_interval
+        self._loaded = None
+        self._lock = threading.Lock()  # 保证同一时间只有一个加载线程
+        self._reloading = False
+        self._last_check = 0.0
+        self.reload_count = 0
+        self.last_error = None
+        self.warmers = {}  # 派生数据名 -> builder，预热时和热更新后在后台提前构建
+
+    def load(self):
+        """同步加载（create_app 中调用，或第一次请求时），返回 LoadedGraph"""
+        with self._lock:
+            if self._loaded is None:
+                self._loaded = load_graph_file(self.snapshot_path, self.pickle_path)
+                self._last_check = time.monotonic()
+            return self._loaded
+
+    def current(self):
+        """返回当前的 LoadedGraph；距离上次检查超过 reload_interval 时在后台检查文件是否变化"""
+        loaded = self._loaded or self.load()
+        if self.reload_interval and time.monotonic() - self._last_check >= self.reload_interval:
+            self._last_check = time.monotonic()
+            self._maybe_reload(loaded)
+        return loaded
+
+    def add_warmer(self, name, builder):
+        """登记一种派生数据，warm() 和后台热更新时提前构建，不必等第一个请求"""
+        self.warmers[name] = builder
+
+    def warm(self):
+        """加载图并预先建立查找表和所有登记的派生数据（见 serving.prepare_for_fork）"""
+        loaded = self.load()
+        self._warm(loaded)
+        return loaded
+
+    def _warm(self, loaded):
+        if hasattr(loaded.graph, "warm"):
+            loaded.graph.warm()
+        for name, builder in self.warmers.items():
+            derived(loaded, name, builder)
+
+    @property
+    def graph(self):
+        return self.current().graph
+
+    @property
+    def version(self):
+        return self.current().version
+
+    def _maybe_reload(self, loaded):
+        try:
+            source, version = file_signature(self.snapshot_path, self.pickle_path)
+        except (OSError, ValueError, KeyError) as error:
+            # 快照正在被替换时可能短暂读不到 header.json，下次再检查
+            self.last_error = repr(error)
+            return
+        if version is None or (source, version) == (loaded.source, loaded.version):
+            return
+        if loaded.source == "snapshot" and source != "snapshot":
+            # write_snapshot 替换目录时，两次改名之间快照目录短暂不存在，此时不能回退到 graph.pkl：
+            # 否则会完整加载一次 pickle，随后新快照就位又要再加载一次。
+            # 当前使用快照时，快照消失视为没有变化（要改回 graph.pkl 需重启服务）
+            return
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(target=self._reload, name="graph-reload", daemon=True).start()
+
+    def _reload(self):
+        try:
+            loaded = load_graph_file(self.snapshot_path, self.pickle_path)
+            # 查找表和派生数据也在后台线程中建好，避免替换后的第一个请求来承担
+            self._warm(loaded)
+            # 引用赋值是原子的：之前拿到旧 LoadedGraph 的请求继续使用旧图，之后的请求使用新图
+            self._loaded = loaded
+            self.reload_count += 1
+            self.last_error = None
+        except Exception as error:  # 新文件损坏或写了一半时保留旧图继续服务
+            self.last_error = repr(error)
+        finally:
+            with self._lock:
+                self._reloading = False
+
+
+def init_graph_provider(app):
+    """在 create_app 中创建进程内共享的 GraphProvider，并立即加载一次"""
+    provider = GraphProvider(app.config.get('GRAPH_SNAPSHOT_PATH'), app.config['GRAPH_PICKLE_PATH'],
+                             reload_interval=app.config.get('GRAPH_RELOAD_INTERVAL', 5.0))
+    app.extensions['graph_provider'] = provider
+    try:
+        provider.load()
+    except FileNotFoundError:
+        # 图数据还没有生成时应用仍可启动，第一次用到图的请求会再次尝试加载
+        pass
+    return provider
+
+
+def current_graph():
+    """当前请求使用的 LoadedGraph（图对象与版本号）"""
+    return current_app.extensions['graph_provider'].current()
+
+
+def register_warmer(blueprint, name, builder):
+    """在蓝图注册到应用时登记派生数据的预热函数"""
+    blueprint.record_once(lambda state: state.app.extensions['graph_provider'].add_warmer(name, builder))
@@ -0,0 +1,20 @@
+# gunicorn.conf.py
+# 用法（在 viz_hf 目录下）：gunicorn -c gunicorn.conf.py
+# 主进程先加载应用和图数据（preload_app），再 fork 出各个 worker，worker 之间共享图数据所在的内存页。
+
+import gc
+import os
+
+wsgi_app = "wsgi:app"
+bind = os.environ.get("VIZ_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("VIZ_WORKERS", 16))
+preload_app = True
+
+# 主进程加载图数据期间关闭 GC：加载的对象会在 wsgi.py 中被 gc.freeze() 冻结，
+# 在此之前的 GC 只会白白改写这些对象的头部。冻结后 serving.prepare_for_fork 重新开启 GC
+gc.disable()
+
+
+def post_fork(server, worker):
+    # 确保 worker 中 GC 是开启的（prepare_for_fork 没有执行到时也一样），被冻结的对象不参与扫描，不会触发写时复制
+    gc.enable()
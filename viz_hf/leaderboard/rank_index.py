@@ -0,0 +1,228 @@
+# leaderboard/rank_index.py
+# 排行榜的预排序索引：每个图版本只构建一次（见 graph_provider.derived），
+# 之后每次翻页只需要从排好序的编号数组中切出一页，代价与 per_page 成正比，与页码无关。
+
+import numpy as np
+
+from .utils import parse_date
+
+# 可以使用索引的排序键；其他排序键回退到 process_nodes
+SORT_KEYS = ('influence', 'downloads', 'likes', 'created_at')
+SORT_ORDERS = ('desc', 'asc', 'none')
+MISSING_DATE = -(1 << 62)  # 旧版快照中缺失的创建日期，小于所有有效日期
+
+
+def date_sort_key(created_at):
+    """与 process_nodes 相同，按 parse_date 的结果排序（缺失或无法解析的日期视为最早）"""
+    return parse_date(created_at or '0001-01-01').toordinal()
+
+
+class RankIndex:
+    """
+    节点编号为 graph.nodes 的遍历顺序（即 process_nodes 中的 original_index）。
+    对每个排序键分别保存升序、降序两个排列，排序是稳定的：取值相同的节点保持原始顺序，与 list.sort 一致。
+    按任务类型筛选时，从对应排列中取出该类型的子序列，第一次用到时生成并缓存。
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.snapshot = getattr(graph, "snapshot", None)
+        if self.snapshot is not None:
+            self._init_from_snapshot(self.snapshot)
+        else:
+            self._init_from_graph(graph)
+        self.num_nodes = len(self.node_ids)
+        # 所有任务类型（不含缺失值），供筛选下拉框使用
+        self.all_task_types = sorted(name for name in self.task_type_names if name not in ('None', 'nan'))
+        self._task_code = {name: code for code, name in enumerate(self.task_type_names)}
+        self._orders = {}
+        self._ranks = {}
+        self._subsets = {}
+        self._positions = None
+
+    def _init_from_graph(self, graph):
+        self.node_ids = list(graph.nodes)
+        attrs = [graph.nodes[node] for node in self.node_ids]
+        count = len(attrs)
+        self.columns = {
+            'influence': np.fromiter((a.get('influence', 0.0) or 0.0 for a in attrs), dtype=np.float64, count=count),
+            'downloads': np.fromiter((a.get('downloads', 0) or 0 for a in attrs), dtype=np.float64, count=count),
+            'likes': np.fromiter((a.get('likes', 0) or 0 for a in attrs), dtype=np.float64, count=count),
+            'created_at': np.fromiter((date_sort_key(a.get('created_at')) for a in attrs), dtype=np.int64, count=count),
+        }
+        # 任务类型与 process_nodes 一样按 str() 后的值比较
+        names, lookup = [], {}
+        codes = np.empty(count, dtype=np.int32)
+        for i, a in enumerate(attrs):
+            name = str(a.get('task_type', 'nan'))
+            code = lookup.get(name)
+            if code is None:
+                code = lookup[name] = len(names)
+                names.append(name)
+            codes[i] = code
+        self.task_type_names = names
+        self.task_codes = codes
+
+    def _init_from_snapshot(self, snapshot):
+        # 快照中的列本身就是数组，不需要逐个节点解码
+        self.node_ids = snapshot.model_ids
+        self.columns = {
+            'influence': np.asarray(snapshot.column('influence'), dtype=np.float64),
+            'downloads': np.asarray(snapshot.column('downloads'), dtype=np.float64),
+            'likes': np.asarray(snapshot.column('likes'), dtype=np.float64),
+            'created_at': self._snapshot_date_keys(snapshot),
+        }
+        vocab = snapshot.tables[snapshot.header['categorical_columns']['task_type']].tolist()
+        # 编码 -1（缺失）放在词表末尾，对应 str(None)
+        self.task_type_names = [str(name) for name in vocab] + ['None']
+        codes = np.asarray(snapshot.column('task_type'), dtype=np.int32)
+        self.task_codes = np.where(codes == snapshot.missing_code, len(vocab), codes).astype(np.int32)
+
+    @staticmethod
+    def _snapshot_date_keys(snapshot):
+        if 'created_at' in snapshot.tables:
+            # 对原始字符串的词表（加上缺失值）各计算一次排序键，与 graph.pkl 的结果相同
+            vocab = snapshot.tables['created_at'].tolist()
+            keys = np.array([date_sort_key(value) for value in vocab] + [date_sort_key(None)], dtype=np.int64)
+            codes = np.asarray(snapshot.column('created_at_code'), dtype=np.int64)
+            return keys[np.where(codes == snapshot.missing_code, len(vocab), codes)]
+        # 旧版快照只有天数：缺失日期排在最前，与 parse_date('0001-01-01') 的结果一致；
+        # 不用 int64 的最小值，降序排序时取负会溢出
+        created_at = snapshot.column('created_at').astype(np.int64)
+        return np.where(created_at == snapshot.missing_date, MISSING_DATE, created_at)
+
+    def supports(self, sort_by, sort_order):
+        """该排序方式能否使用索引"""
+        if not sort_by or sort_order not in SORT_ORDERS or sort_order == 'none':
+            return True
+        return sort_by in SORT_KEYS
+
+    @staticmethod
+    def normalize(sort_by, sort_order):
+        """
+        不排序（sort_by 为空、sort_order 为 'none' 或非法值）统一为 (None, 'none')。
+        缓存键都由该结果构成，查询参数中任意取值的 sort_order 不会各自占用一份缓存。
+        """
+        if not sort_by or sort_order not in ('desc', 'asc'):
+            return None, 'none'
+        return sort_by, sort_order
+
+    def order(self, sort_by, sort_order):
+        """
+        按排序方式返回全部节点编号的排列。
+        不排序（sort_by 为空、sort_order 为 'none' 或非法值）时为原始顺序。
+        """
+        key = sort_by, sort_order = self.normalize(sort_by, sort_order)
+        perm = self._orders.get(key)
+        if perm is None:
+            if sort_by is None:
+                perm = np.arange(self.num_nodes, dtype=np.int64)
+            else:
+                values = self.columns[sort_by]
+                # 降序时对取负后的值做稳定排序，相同取值仍保持原始顺序（与 reverse=True 的 list.sort 一致）
+                perm = np.argsort(-values if sort_order == 'desc' else values, kind='stable')
+            self._orders[key] = perm
+        return perm
+
+    def rank(self, sort_by, sort_order):
+        """order 的逆排列：节点编号 -> 在该排序中的位置"""
+        key = self.normalize(sort_by, sort_order)
+        rank = self._ranks.get(key)
+        if rank is None:
+            perm = self.order(sort_by, sort_order)
+            rank = np.empty_like(perm)
+            rank[perm] = np.arange(perm.size)
+            self._ranks[key] = rank
+        return rank
+
+    def ranking(self, filter_task_type, sort_by, sort_order, candidates=None):
+        """
+        排好序的节点编号数组。
+        Args:
+            filter_task_type (str): 任务类型，'all' 表示不筛选。
+            sort_by (str): 排序键。
+            sort_order (str): 'desc'、'asc' 或 'none'。
+            candidates (np.ndarray): 只在这些节点中排序（如 search_index 的搜索结果），为 None 时使用全部节点。
+        """
+        sort_by, sort_order = self.normalize(sort_by, sort_order)
+        code = None
+        if filter_task_type != 'all':
+            code = self._task_code.get(filter_task_type)
+            if code is None:
+                # 不存在的任务类型结果为空，不缓存，避免任意取值的查询参数占用内存
+                return np.empty(0, dtype=np.int64)
+
+        if candidates is not None:
+            candidates = np.asarray(candidates, dtype=np.int64)
+            if code is not None:
+                candidates = candidates[self.task_codes[candidates] == code]
+            return candidates[np.argsort(self.rank(sort_by, sort_order)[candidates], kind='stable')]
+
+        if code is None:
+            return self.order(sort_by, sort_order)
+        key = (filter_task_type, sort_by, sort_order)
+        subset = self._subsets.get(key)
+        if subset is None:
+            perm = self.order(sort_by, sort_order)
+            subset = self._subsets[key] = perm[self.task_codes[perm] == code]
+        return subset
+
+    def node_index(self, node_id):
+        """模型 id -> 节点编号，不存在时返回 None"""
+        if self.snapshot is not None:
+            return self.snapshot.node_index(node_id)
+        if self._positions is None:
+            self._positions = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        return self._positions.get(node_id)
+
+    def sort_value(self, sort_by, sort_order, i):
+        """节点 i 在该排序方式下的排序值（不排序时为节点编号本身），用于生成分页游标"""
+        if not sort_by or sort_order not in ('desc', 'asc'):
+            return int(i)
+        return self.columns[sort_by][i].item()
+
+    def seek(self, ranking, sort_by, sort_order, value, node=None):
+        """
+        keyset 分页：在排好序的 ranking 中二分查找排在游标 (value, node) 之后的第一个位置，代价与翻到第几页无关。
+        取值相同的节点按编号排列，所以 (排序值, 节点编号) 唯一确定一个位置；
+        node 为 None（该模型在新版本中已不存在）时，从取值等于 value 的第一个节点开始。
+        Args:
+            ranking (np.ndarray): ranking() 的返回值。
+            value: 上一页最后一个节点的排序值（见 sort_value）。
+            node (int): 上一页最后一个节点的编号。
+        """
+        values = self.columns[sort_by] if sort_by and sort_order in ('desc', 'asc') else None
+        descending = values is not None and sort_order == 'desc'
+        target = (-value if descending else value, -1 if node is None else node)
+        lo, hi = 0, len(ranking)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            i = int(ranking[mid])
+            v = i if values is None else values[i].item()
+            if (-v if descending else v, i) <= target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def rows(self, positions, start_rank=1):
+        """
+        生成一页的行数据，字段与 process_nodes 相同，并带上排名 rank。
+        """
+        rows = []
+        for rank, i in enumerate(np.asarray(positions).tolist(), start=start_rank):
+            node_id = self.node_ids[i]
+            attrs = self.snapshot.node_attrs(i) if self.snapshot is not None else self.graph.nodes[node_id]
+            rows.append({
+                'original_index': i,
+                'id': node_id,
+                'name': attrs.get('name', node_id),
+                'created_at': attrs.get('created_at', '0001-01-01') or '0001-01-01',
+                'downloads': attrs.get('downloads', 0) or 0,
+                'likes': attrs.get('likes', 0) or 0,
+                'task_type': str(attrs.get('task_type', 'nan')),
+                'influence': attrs.get('influence', 0.0) or 0.0,
+                'pic': attrs.get('pic', ''),
+                'rank': rank,
+            })
+        return rows
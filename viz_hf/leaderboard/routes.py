@@ -1,40 +1,66 @@
-from flask import Blueprint, render_template, request
-from .utils import load_graph, get_pagination_pages, process_nodes, process_nodes_v2
+from flask import Blueprint, Response, render_template, request
+from werkzeug.http import is_resource_modified
+from .utils import load_graph, get_pagination_pages, process_nodes, process_nodes_v2, encode_cursor, decode_cursor
+from .rank_index import RankIndex
+from .search_index import ModelSearchIndex
+from graph_provider import current_graph, derived, register_warmer
 from flask import jsonify
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
+register_warmer(leaderboard_bp, 'rank_index', RankIndex)
+register_warmer(leaderboard_bp, 'search_index', ModelSearchIndex)
+
+SUGGEST_LIMIT = 10
+SUGGEST_MAX_LIMIT = 50
+API_PAGE_SIZE = 50
+API_MAX_PAGE_SIZE = 500
+
+
+def get_rank_index(loaded=None):
+    """当前图版本的排行榜排序索引（每个版本只构建一次）"""
+    return derived(loaded or current_graph(), 'rank_index', RankIndex)
+
+
+def get_search_index(loaded=None):
+    """当前图版本的模型搜索索引（每个版本只构建一次）"""
+    return derived(loaded or current_graph(), 'search_index', ModelSearchIndex)
 
 @leaderboard_bp.route('/', methods=['GET'])
 def leaderboard():
     """
     显示排行榜页面，支持排序、筛选和分页功能。
     """
-    # 加载图对象
-    graph = load_graph()
+    # 排序索引和搜索索引（每个图版本构建一次），两者取自同一个版本
+    loaded = current_graph()
+    index = get_rank_index(loaded)
 
     # 获取筛选和排序参数
     filter_task_type = request.args.get('filter_task_type', 'all')
     sort_by = request.args.get('sort_by', 'influence')
     sort_order = request.args.get('sort_order', 'desc')
     search_query = request.args.get('search', '').strip().lower()
-    # 处理搜索查询：显示名称中包含搜索字符串的模型
-    if search_query:
-        nodes_data = process_nodes_v2(graph, filter_task_type, sort_by, sort_order, search_query)
-    else:
-        # 筛选和排序节点
-        nodes_data = process_nodes(graph, filter_task_type, sort_by, sort_order)
     # 提取所有任务类型（从未过滤的数据中）
-    all_task_types = sorted(list(set(
-        str(node['task_type']) for node in graph.nodes.values() if node['task_type'] not in [None, 'nan']
-    )))
+    all_task_types = index.all_task_types
     # 获取分页参数
     page = max(1, int(request.args.get('page', 1)))
     per_page = max(30, int(request.args.get('per_page', 30)))
 
-    
+    if index.supports(sort_by, sort_order):
+        # 从预排序的编号数组中只取出当前页，搜索时只对匹配的模型排序
+        candidates = get_search_index(loaded).search_ids(search_query) if search_query else None
+        ranking = index.ranking(filter_task_type, sort_by, sort_order, candidates)
+        nodes_data = None
+        total_nodes = len(ranking)
+    else:
+        # 其他排序键：逐个节点生成数据后排序
+        graph = load_graph()
+        if search_query:
+            nodes_data = process_nodes_v2(graph, filter_task_type, sort_by, sort_order, search_query)
+        else:
+            nodes_data = process_nodes(graph, filter_task_type, sort_by, sort_order)
+        total_nodes = len(nodes_data)
 
-    # 获取总项目数和总页数
-    total_nodes = len(nodes_data)
+    # 获取总页数
     total_pages = (total_nodes + per_page - 1) // per_page
 
     # 确保当前页码不超过总页数
@@ -45,12 +71,13 @@ def leaderboard():
     start_idx = (page - 1) * per_page
     end_idx = start_idx + per_page
 
-    # 切片 nodes_data 以获取当前页的数据
-    paginated_nodes = nodes_data[start_idx:end_idx]
-
-    # 添加排名列
-    for rank, node in enumerate(paginated_nodes, start=start_idx + 1):
-        node['rank'] = rank
+    # 获取当前页的数据，并添加排名列
+    if nodes_data is None:
+        paginated_nodes = index.rows(ranking[start_idx:end_idx], start_rank=start_idx + 1)
+    else:
+        paginated_nodes = nodes_data[start_idx:end_idx]
+        for rank, node in enumerate(paginated_nodes, start=start_idx + 1):
+            node['rank'] = rank
 
     # 获取分页信息
     has_prev = page > 1
@@ -73,4 +100,88 @@ def leaderboard():
         pages=pages,
         search_query=search_query  # 传递给模板
     )
- 
\ No newline at end of file
+ 
+
+
+@leaderboard_bp.route('/api/suggest', methods=['GET'])
+def suggest():
+    """
+    搜索框的输入提示：返回模型 id 或作者名包含 q 的模型中影响力最高的若干个。
+    参数：q 查询串；limit 返回条数（默认 10，最多 50）。
+    """
+    query = request.args.get('q', '').strip()
+    try:
+        limit = int(request.args.get('limit', SUGGEST_LIMIT))
+    except ValueError:
+        limit = SUGGEST_LIMIT
+    limit = min(max(limit, 1), SUGGEST_MAX_LIMIT)
+    loaded = current_graph()
+    results = get_search_index(loaded).suggest(query, get_rank_index(loaded), limit)
+    return jsonify({'query': query, 'results': results})
+
+
+def _int_arg(name, default, low, high):
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        value = default
+    return min(max(value, low), high)
+
+
+def _conditional_headers(response, loaded):
+    """ETag 与 Last-Modified 取自图数据的版本，图更新之前客户端和反向代理可以用 304 重新验证"""
+    response.set_etag(str(loaded.version))
+    response.last_modified = loaded.modified
+    response.cache_control.no_cache = True
+    return response
+
+
+@leaderboard_bp.route('/api/models', methods=['GET'])
+def api_models():
+    """
+    排行榜的 JSON 接口，筛选和排序参数与页面相同（filter_task_type、sort_by、sort_order、search）。
+    分页使用游标：limit 为每页条数（默认 50，最多 500），cursor 为上一页返回的 next_cursor；
+    游标记录上一页最后一个模型的 (排序值, 模型 id)，每一页的代价与翻到第几页无关。
+    响应带有与图数据版本对应的 ETag / Last-Modified，未变化时返回 304。
+    """
+    loaded = current_graph()
+    if not is_resource_modified(request.environ, etag=str(loaded.version), last_modified=loaded.modified):
+        return _conditional_headers(Response(status=304), loaded)
+
+    filter_task_type = request.args.get('filter_task_type', 'all')
+    sort_by = request.args.get('sort_by', 'influence')
+    sort_order = request.args.get('sort_order', 'desc')
+    search_query = request.args.get('search', '').strip().lower()
+    limit = _int_arg('limit', API_PAGE_SIZE, 1, API_MAX_PAGE_SIZE)
+
+    index = get_rank_index(loaded)
+    if not index.supports(sort_by, sort_order):
+        return jsonify({'error': f"不支持的排序方式: {sort_by}"}), 400
+    candidates = get_search_index(loaded).search_ids(search_query) if search_query else None
+    ranking = index.ranking(filter_task_type, sort_by, sort_order, candidates)
+
+    start = 0
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            cursor_sort_by, cursor_sort_order, value, node_id = decode_cursor(cursor)
+        except ValueError as error:
+            return jsonify({'error': str(error)}), 400
+        if (cursor_sort_by, cursor_sort_order) != (sort_by, sort_order):
+            return jsonify({'error': "分页游标与当前排序方式不一致"}), 400
+        start = index.seek(ranking, sort_by, sort_order, value, index.node_index(node_id))
+
+    page = ranking[start:start + limit]
+    next_cursor = None
+    if start + limit < len(ranking):
+        last = int(page[-1])
+        next_cursor = encode_cursor(sort_by, sort_order, index.sort_value(sort_by, sort_order, last),
+                                    index.node_ids[last])
+    response = jsonify({
+        'version': loaded.version,
+        'total': len(ranking),
+        'limit': limit,
+        'next_cursor': next_cursor,
+        'models': index.rows(page, start_rank=start + 1),
+    })
+    return _conditional_headers(response, loaded)
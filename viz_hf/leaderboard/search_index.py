@@ -0,0 +1,274 @@
+# leaderboard/search_index.py
+# 模型搜索的三元组（trigram）倒排索引：每个图版本构建一次（见 graph_provider.derived）。
+# 子串查询先对查询中所有三元组的倒排表求交集，再对候选逐个确认确实包含该子串，
+# 不必在每次输入时扫描全部模型 id。
+
+import numpy as np
+
+from categorical import category_codes
+
+MIN_QUERY_LENGTH = 3  # 少于 3 个字符的查询没有三元组，回退到线性扫描
+BUILD_CHUNK = 65536  # 构建时每批处理的文档数，限制临时数组的大小
+SCAN_CHUNK = 4096  # 按顺序查找时每批检查的文档数
+
+
+def _trigram_codes(chars):
+    """连续三个字符（Unicode 码位，各 21 位）拼成一个 int64"""
+    return (chars[:-2] << 42) | (chars[1:-1] << 21) | chars[2:]
+
+
+def _code_points(text):
+    return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+
+
+def _chunk_pairs(texts, offset):
+    """
+    一批文本中不重复的 (三元组编码, 文档编号) 对，按编码、编号排序。
+    同一对只可能出现在同一个文档内，所以分批去重即可。
+    """
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    chars = _code_points("".join(texts))
+    if chars.size < 3:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    docs = np.repeat(np.arange(offset, offset + len(texts), dtype=np.int64), lengths)
+    # 只保留三个字符属于同一个文档的位置
+    valid = docs[:-2] == docs[2:]
+    codes = _trigram_codes(chars)[valid]
+    docs = docs[:-2][valid]
+    order = np.lexsort((docs, codes))
+    codes, docs = codes[order], docs[order]
+    keep = np.ones(codes.size, dtype=bool)
+    keep[1:] = (codes[1:] != codes[:-1]) | (docs[1:] != docs[:-1])
+    return codes[keep], docs[keep]
+
+
+class TrigramIndex:
+    """
+    字符串列表上的三元组倒排索引，倒排表以 CSR 形式保存：
+    trigrams 为排好序的三元组编码，postings[indptr[j]:indptr[j+1]] 为包含第 j 个三元组的文档编号（升序）。
+    """
+
+    def __init__(self, texts):
+        """
+        Args:
+            texts (list): 已转为小写的字符串，下标即文档编号。
+        """
+        self.texts = texts
+        starts = range(0, len(texts), BUILD_CHUNK)
+        # 第一遍：统计每个三元组出现在多少个文档中
+        chunk_counts = []
+        for start in starts:
+            codes, _ = _chunk_pairs(texts[start:start + BUILD_CHUNK], start)
+            chunk_counts.append(np.unique(codes, return_counts=True))
+        if chunk_counts:
+            self.trigrams = np.unique(np.concatenate([codes for codes, _ in chunk_counts]))
+        else:
+            self.trigrams = np.empty(0, dtype=np.int64)
+        counts = np.zeros(self.trigrams.size, dtype=np.int64)
+        for codes, chunk_count in chunk_counts:
+            counts[np.searchsorted(self.trigrams, codes)] += chunk_count
+        self.indptr = np.zeros(self.trigrams.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.indptr[1:])
+        # 第二遍：按批次顺序填入倒排表，每个三元组的文档编号自然是升序的
+        self.postings = np.empty(self.indptr[-1], dtype=np.int32)
+        fill = self.indptr[:-1].copy()
+        for start in starts:
+            codes, docs = _chunk_pairs(texts[start:start + BUILD_CHUNK], start)
+            if codes.size == 0:
+                continue
+            tids = np.searchsorted(self.trigrams, codes)
+            # 批内每个三元组的起始位置、文档数，以及每一对在组内的序号
+            first = np.ones(tids.size, dtype=bool)
+            first[1:] = tids[1:] != tids[:-1]
+            group_start = np.flatnonzero(first)
+            group_size = np.diff(np.append(group_start, tids.size))
+            offset_in_group = np.arange(tids.size) - np.repeat(group_start, group_size)
+            self.postings[fill[tids] + offset_in_group] = docs
+            fill[tids[group_start]] += group_size
+
+    def __len__(self):
+        return len(self.texts)
+
+    def posting(self, code):
+        j = np.searchsorted(self.trigrams, code)
+        if j == self.trigrams.size or self.trigrams[j] != code:
+            return None
+        return self.postings[self.indptr[j]:self.indptr[j + 1]]
+
+    def candidates(self, query, max_size=None):
+        """
+        包含 query 的所有三元组的文档编号（升序），是子串匹配结果的超集；query 少于 3 个字符时返回 None。
+        Args:
+            max_size (int): 交集已经多于这么多个时不再继续求交（结果仍是超集，由调用方逐个确认）。
+        """
+        if len(query) < MIN_QUERY_LENGTH:
+            return None
+        lists = []
+        for code in np.unique(_trigram_codes(_code_points(query))).tolist():
+            posting = self.posting(code)
+            if posting is None:
+                return np.empty(0, dtype=np.int64)
+            lists.append(posting)
+        # 从最短的倒排表开始求交集
+        lists.sort(key=len)
+        result = lists[0]
+        for posting in lists[1:]:
+            if result.size == 0 or (max_size is not None and result.size > max_size):
+                break
+            # 结果通常比倒排表短得多，逐个二分查找比 intersect1d 的整体排序快
+            pos = np.searchsorted(posting, result)
+            pos[pos == posting.size] = 0
+            result = result[posting[pos] == result]
+        return result.astype(np.int64)
+
+    def _verify(self, query, docs):
+        texts = self.texts
+        return docs[np.fromiter((query in texts[i] for i in docs.tolist()), dtype=bool, count=docs.size)]
+
+    def search(self, query):
+        """
+        包含子串 query（已转为小写）的文档编号，升序排列。
+        """
+        if not query:
+            return np.arange(len(self.texts), dtype=np.int64)
+        docs = self.candidates(query)
+        if docs is None:
+            return self._verify(query, np.arange(len(self.texts), dtype=np.int64))
+        # 只有一个三元组时候选即结果；否则所有三元组都出现并不代表它们连在一起，需要确认
+        return self._verify(query, docs) if len(query) > MIN_QUERY_LENGTH else docs
+
+    def first_matches(self, query, order, rank, limit):
+        """
+        按给定顺序取前 limit 个包含 query 的文档，找够即停，不确认其余候选。
+        Args:
+            query (str): 已转为小写的查询串。
+            order (np.ndarray): 全部文档编号的排列（如按影响力降序）。
+            rank (np.ndarray): order 的逆排列。
+            limit (int): 最多返回的个数。
+        """
+        dense = order.size // 16
+        docs = self.candidates(query, max_size=dense)
+        exact = docs is not None and len(query) == MIN_QUERY_LENGTH
+        if docs is not None and docs.size <= dense:
+            # 候选较少：直接按顺序排好
+            docs = docs[np.argsort(rank[docs], kind='stable')]
+            if exact:
+                return docs[:limit]
+            chunks = (docs[start:start + SCAN_CHUNK] for start in range(0, docs.size, SCAN_CHUNK))
+        else:
+            # 候选很多（或查询太短）：沿 order 分批查找，匹配的文档很密，通常第一批就能找够
+            mask = None
+            if docs is not None:
+                mask = np.zeros(order.size, dtype=bool)
+                mask[docs] = True
+            chunks = (order[start:start + SCAN_CHUNK] if mask is None else
+                      order[start:start + SCAN_CHUNK][mask[order[start:start + SCAN_CHUNK]]]
+                      for start in range(0, order.size, SCAN_CHUNK))
+        found = []
+        count = 0
+        for chunk in chunks:
+            matched = chunk if exact else self._verify(query, chunk)
+            found.append(matched)
+            count += matched.size
+            if count >= limit:
+                break
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(found)[:limit].astype(np.int64)
+
+
+class ModelSearchIndex:
+    """
+    模型搜索索引：模型 id 和作者（author、author_full_name）各一个三元组索引。
+    作者的取值在大量模型间重复，只对不重复的作者名建索引；每个作者名下的模型按影响力排好序保存，
+    输入提示只需查看匹配到的作者中排在最前的几个模型。
+    """
+
+    def __init__(self, graph):
+        """
+        Args:
+            graph: 图对象（快照视图或 EasyGraph 图），节点编号与 RankIndex 相同，为 graph.nodes 的遍历顺序。
+        """
+        snapshot = getattr(graph, "snapshot", None)
+        if snapshot is not None:
+            ids = snapshot.model_ids.tolist()
+            influence = np.asarray(snapshot.column('influence'), dtype=np.float64)
+        else:
+            ids = list(graph.nodes)
+            influence = np.fromiter((graph.nodes[node].get('influence', 0.0) or 0.0 for node in ids),
+                                    dtype=np.float64, count=len(ids))
+        # 影响力降序，相同时保持原始顺序，与 RankIndex.order('influence', 'desc') 相同
+        self.order = np.argsort(-influence, kind='stable').astype(np.int32)
+        self.rank = np.empty_like(self.order)
+        self.rank[self.order] = np.arange(self.order.size, dtype=np.int32)
+        self.ids = TrigramIndex([node_id.lower() for node_id in ids])
+        self.authors = {}
+        self.vocabularies = {}
+        for attr in ("author", "author_full_name"):
+            codes, vocabulary = category_codes(graph, attr)
+            codes = np.asarray(codes)
+            # 按 (作者编码, 影响力排名) 排序，每个作者的模型连续存放，组内按影响力降序
+            nodes = np.lexsort((self.rank, codes)).astype(np.int32)
+            sorted_codes = codes[nodes]
+            indptr = np.searchsorted(sorted_codes, np.arange(len(vocabulary) + 1))
+            head_rank = np.full(len(vocabulary), self.order.size, dtype=np.int64)
+            nonempty = indptr[1:] > indptr[:-1]
+            head_rank[nonempty] = self.rank[nodes[indptr[:-1][nonempty]]]
+            index = TrigramIndex([str(value).lower() for value in vocabulary])
+            self.authors[attr] = (codes, index, nodes, indptr, head_rank)
+            self.vocabularies[attr] = vocabulary
+
+    def search_ids(self, query):
+        """模型 id 包含 query 的节点编号（与原来的 search_query in node_id.lower() 相同），按原始顺序"""
+        return self.ids.search(query.lower())
+
+    def first_author_matches(self, query, limit):
+        """作者名包含 query 的模型中影响力最高的 limit 个（query 已转为小写）"""
+        found = []
+        for codes, index, nodes, indptr, head_rank in self.authors.values():
+            matched = index.search(query)
+            if matched.size == 0:
+                continue
+            # 前 limit 名一定来自组内第一名排名最靠前的 limit 个作者
+            if matched.size > limit:
+                matched = matched[np.argpartition(head_rank[matched], limit - 1)[:limit]]
+            for code in matched.tolist():
+                found.append(nodes[indptr[code]:min(indptr[code + 1], indptr[code] + limit)])
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found)).astype(np.int64)
+
+    def suggest(self, query, rank_index, limit=10):
+        """
+        输入提示：模型 id 或作者名包含 query 的模型中影响力最高的 limit 个。
+        Args:
+            query (str): 查询串。
+            rank_index (RankIndex): 同一版本的排序索引，用于生成行数据。
+            limit (int): 最多返回的条数。
+        Returns:
+            list: [{'id', 'author_full_name', 'task_type', 'influence', 'match'}, ...]，按影响力降序。
+        """
+        query = query.strip().lower()
+        if not query or limit <= 0:
+            return []
+        # 按影响力降序依次确认，找够 limit 个即停
+        by_id = self.ids.first_matches(query, self.order, self.rank, limit)
+        by_author = self.first_author_matches(query, limit)
+        candidates = np.union1d(by_id, by_author)
+        if candidates.size == 0:
+            return []
+        candidates = candidates[np.argsort(self.rank[candidates])][:limit]
+        id_matches = set(by_id.tolist())
+        codes = self.authors['author_full_name'][0]
+        names = self.vocabularies['author_full_name']
+        results = []
+        for row in rank_index.rows(candidates):
+            code = codes[row['original_index']]
+            results.append({
+                'id': row['id'],
+                'author_full_name': names[code] if code >= 0 else None,
+                'task_type': row['task_type'],
+                'influence': row['influence'],
+                'match': 'id' if row['original_index'] in id_matches else 'author',
+            })
+        return results
@@ -1,19 +1,13 @@
-import pickle
-import os
+import base64
+import json
 from datetime import datetime
-from flask import current_app as app
+from graph_provider import current_graph
 
 def load_graph():
     """
-    从 pickle 文件中加载 EasyGraph 对象。
+    获取当前的图对象（由 create_app 中创建的 GraphProvider 统一加载并在文件更新后热替换，不在每个请求中重新读取）。
     """
-    pickle_path = app.config['GRAPH_PICKLE_PATH']
-    if not os.path.exists(pickle_path):
-        raise FileNotFoundError(f"Pickle 文件未找到，路径: {pickle_path}")
-
-    with open(pickle_path, 'rb') as f:
-        graph = pickle.load(f)
-    return graph
+    return current_graph().graph
 
 
 def get_pagination_pages(current_page, total_pages):
@@ -33,6 +27,32 @@ def get_pagination_pages(current_page, total_pages):
     return pages
 
 
+def encode_cursor(sort_by, sort_order, value, node_id):
+    """
+    生成分页游标：上一页最后一个模型的 (排序值, 模型 id)，连同排序方式一起编码为 URL 安全的字符串。
+    """
+    payload = json.dumps([sort_by, sort_order, value, node_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    解析 encode_cursor 生成的游标。
+    Returns:
+        (sort_by, sort_order, value, node_id)
+    Raises:
+        ValueError: 游标格式不正确。
+    """
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        sort_by, sort_order, value, node_id = json.loads(payload.decode('utf-8'))
+    except (ValueError, TypeError) as error:
+        raise ValueError(f"无效的分页游标: {cursor}") from error
+    if not isinstance(value, (int, float)) or not isinstance(node_id, str):
+        raise ValueError(f"无效的分页游标: {cursor}")
+    return sort_by, sort_order, value, node_id
+
+
 def parse_date(date_str):
     """
     将日期字符串解析为 datetime 对象。
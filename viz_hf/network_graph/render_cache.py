@@ -0,0 +1,249 @@
+# network_graph/render_cache.py
+# 渲染好的网络图（head_html, body_html）的两级缓存：
+#   1. 进程内的 LRU，按占用的字节数而不是条目数限制大小（一个大模型家族的 HTML 可能有几十 MB）；
+#   2. 磁盘目录，同一台机器上的所有 gunicorn worker 共享，一个 worker 渲染过的视图其他 worker 直接读取；
+#      按总字节数限制大小，超出时删除最久未使用（修改时间最早）的文件。
+# 键中包含图数据的版本，图热更新后旧版本的条目自然不再命中，磁盘上只保留最近几个版本的目录。
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+from collections import OrderedDict
+
+DISK_KEEP_VERSIONS = 2  # 磁盘上保留的图版本数（热更新期间各 worker 可能暂时处于不同版本）
+DISK_COMPRESS_LEVEL = 1  # HTML 重复度很高，最快的压缩级别就能缩小很多
+DISK_PRUNE_TARGET = 0.9  # 超出上限时删到上限的这个比例以下，避免每次写入都清理
+# 各 worker 只知道自己写入的字节数：本进程写入量达到上限的这个比例时重新统计整个目录，
+# 其他 worker 的写入因此最多让目录超出上限 worker 数 × 该比例
+DISK_RESCAN_FRACTION = 0.1
+
+
+def _entry_size(value):
+    return sum(sys.getsizeof(part) for part in value)
+
+
+class RenderCache:
+    """
+    (head_html, body_html) 的缓存，键为 (图版本, 视图参数...)。
+    hits / disk_hits / misses / evictions 等计数器为本进程的统计，见 stats()。
+    """
+
+    def __init__(self, max_bytes, directory=None, max_disk_bytes=None):
+        """
+        Args:
+            max_bytes (int): 进程内 LRU 的字节数上限，为 0 时不在内存中缓存。
+            directory (str): 磁盘缓存目录，为 None 时不使用磁盘。
+            max_disk_bytes (int): 磁盘目录的字节数上限（所有 worker 合计），为 None 时不限制。
+        """
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = None  # 磁盘目录的估计大小，第一次写入时统计
+        self._disk_written = 0  # 上次统计以来本进程写入的字节数
+        self._entries = OrderedDict()  # 键 -> (值, 字节数)，最近使用的在最后
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._render_locks = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_evictions = 0
+        self.disk_errors = 0
+
+    # ---- 内存 ----
+
+    def _get_memory(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _put_memory(self, key, value):
+        size = _entry_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self.evictions += 1
+
+    # ---- 磁盘 ----
+
+    def _path(self, key):
+        version, params = str(key[0]), json.dumps(key[1:], ensure_ascii=False)
+        version_dir = hashlib.sha256(version.encode("utf-8")).hexdigest()[:16]
+        name = hashlib.sha256(params.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, version_dir), os.path.join(self.directory, version_dir, f"{name}.json.gz")
+
+    def _get_disk(self, key):
+        if self.directory is None:
+            return None
+        _, path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = tuple(json.load(f))
+            # 更新修改时间，超出上限时按最久未使用的顺序删除
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # 文件损坏时当作未命中，重新渲染后覆盖
+            self.disk_errors += 1
+            return None
+
+    def _put_disk(self, key, value):
+        if self.directory is None:
+            return
+        version_dir, path = self._path(key)
+        try:
+            new_version = not os.path.isdir(version_dir)
+            os.makedirs(version_dir, exist_ok=True)
+            # 先写临时文件再改名，其他 worker 不会读到写了一半的文件
+            tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+            with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=DISK_COMPRESS_LEVEL) as f:
+                json.dump(list(value), f, ensure_ascii=False)
+            size = os.path.getsize(tmp_path)
+            if self.max_disk_bytes is not None and size > self.max_disk_bytes:
+                os.remove(tmp_path)
+                return
+            os.replace(tmp_path, path)
+            if new_version:
+                self._prune_disk()
+            self._account_disk(size)
+        except OSError:
+            self.disk_errors += 1
+
+    def _prune_disk(self):
+        """只保留最近修改的 DISK_KEEP_VERSIONS 个版本目录"""
+        version_dirs = [entry for entry in os.scandir(self.directory) if entry.is_dir()]
+        version_dirs.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+        for entry in version_dirs[DISK_KEEP_VERSIONS:]:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+    def _disk_files(self):
+        """磁盘目录中的缓存文件：[(修改时间, 字节数, 路径)]"""
+        files = []
+        for version_entry in os.scandir(self.directory):
+            if not version_entry.is_dir():
+                continue
+            for entry in os.scandir(version_entry.path):
+                if entry.name.endswith(".json.gz"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:  # 其他 worker 刚刚删除
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, entry.path))
+        return files
+
+    def _account_disk(self, size):
+        """记录本进程写入的字节数，估计的目录大小超出上限或写入量较多时重新统计并清理"""
+        if self.max_disk_bytes is None:
+            return
+        with self._disk_lock:
+            if self._disk_bytes is None:
+                self._enforce_disk_limit()
+                return
+            self._disk_bytes += size
+            self._disk_written += size
+            if self._disk_bytes > self.max_disk_bytes or \
+                    self._disk_written > self.max_disk_bytes * DISK_RESCAN_FRACTION:
+                self._enforce_disk_limit()
+
+    def _enforce_disk_limit(self):
+        """统计整个目录；超出上限时从最久未使用的文件开始删除，直到低于上限的 DISK_PRUNE_TARGET"""
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        if total > self.max_disk_bytes:
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_disk_bytes * DISK_PRUNE_TARGET:
+                    break
+                try:
+                    os.remove(path)
+                    self.disk_evictions += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+        self._disk_bytes = total
+        self._disk_written = 0
+
+    # ---- 接口 ----
+
+    def get_or_render(self, key, render):
+        """
+        取出缓存的视图，未命中时调用 render() 渲染并写入两级缓存。
+        同一进程中同一个键的并发请求只渲染一次。
+        Args:
+            key (tuple): (图版本, 视图参数...)，各元素可以 JSON 序列化。
+            render: 无参数的函数，返回 (head_html, body_html)。
+        """
+        value = self._get_memory(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        with self._lock:
+            render_lock = self._render_locks.setdefault(key, threading.Lock())
+        try:
+            with render_lock:
+                value = self._get_memory(key)
+                if value is not None:
+                    self.hits += 1
+                    return value
+                value = self._get_disk(key)
+                if value is not None:
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                    value = tuple(render())
+                    self._put_disk(key, value)
+                self._put_memory(key, value)
+                return value
+        finally:
+            with self._lock:
+                self._render_locks.pop(key, None)
+
+    def stats(self):
+        """本进程的命中统计与内存占用"""
+        with self._lock:
+            entries, used = len(self._entries), self._bytes
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else None,
+            "evictions": self.evictions,
+            "disk_evictions": self.disk_evictions,
+            "disk_errors": self.disk_errors,
+            "entries": entries,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "directory": self.directory,
+            "disk_bytes": self._disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes,
+        }
+
+
+def init_render_cache(app):
+    """按配置创建进程内的渲染缓存，保存在 app.extensions['network_render_cache']"""
+    directory = app.config.get('NETWORK_CACHE_DIR')
+    cache = RenderCache(app.config.get('NETWORK_CACHE_MAX_BYTES', 256 << 20),
+                        os.path.abspath(directory) if directory else None,
+                        app.config.get('NETWORK_CACHE_DISK_MAX_BYTES'))
+    app.extensions['network_render_cache'] = cache
+    return cache
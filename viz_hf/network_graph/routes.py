@@ -1,14 +1,42 @@
 # network_graph/routes.py
 
-from flask import Blueprint, render_template, request, abort, current_app as app
+import json
+
+from flask import Blueprint, Response, render_template, request, abort, jsonify, current_app as app
+from werkzeug.http import is_resource_modified
 import networkx as nx
 import pickle
 import os
 from pyvis.network import Network
 import math
-from .utils import load_graph, generate_graph_html, generate_large_graph_html, generate_specific_large_graph_html
+from .utils import load_graph, generate_graph_html, generate_large_graph_html, generate_specific_large_graph_html, \
+    node_details, subgraph_data, children_page, ALL_EDGE_TYPES, CHILDREN_PAGE_SIZE, VIEW_TYPES, LARGE_GRAPH_MAX_TOP_K
+from .render_cache import init_render_cache
+from .subtree_index import SubtreeIndex
+from graph_provider import current_graph, derived, register_warmer
 
 network_bp = Blueprint('network', __name__)
+network_bp.record_once(lambda state: init_render_cache(state.app))
+register_warmer(network_bp, 'subtree_index', SubtreeIndex)
+
+
+def get_subtree_index(loaded=None):
+    """当前图版本的子树索引（每个版本只构建一次）"""
+    return derived(loaded or current_graph(), 'subtree_index', SubtreeIndex)
+
+
+def cached_render(key, render, loaded=None):
+    """
+    渲染结果按 (图版本, *key) 缓存（内存 LRU + 多 worker 共享的磁盘目录，见 render_cache.py）。
+    Args:
+        key (tuple): 视图参数。
+        render: render(graph) -> (head_html, body_html)，或其他由字符串组成的元组。
+        loaded (LoadedGraph): 使用的图版本，默认为当前版本。
+    """
+    loaded = loaded or current_graph()
+    return app.extensions['network_render_cache'].get_or_render(
+        (loaded.version,) + key, lambda: render(loaded.graph))
+
 
 @network_bp.route('/', methods=['GET'])
 def network_view():
@@ -18,14 +46,18 @@ def network_view():
     URL 示例: /network/?view_type=1&base_model=meta-llama/Meta-Llama-3-70B
     """
     # 获取查询参数
-    view_type = int(request.args.get('view_type', 1))
+    view_type = request.args.get('view_type', 1, type=int)
     base_model = request.args.get('base_model', 'meta-llama/Meta-Llama-3-70B')  # 设置默认的base_model 
+    # 参数会成为缓存的键，只接受支持的视图和存在的模型
+    if view_type not in VIEW_TYPES:
+        abort(400, description=f"不支持的 view_type: {view_type}")
+    loaded = current_graph()
+    if base_model not in loaded.graph.nodes:
+        abort(404, description=f"模型不存在: {base_model}")
     
-    # 加载图对象
-    graph = load_graph(app.config['GRAPH_PICKLE_PATH'])
-    
-    # 生成 head_html 和 body_html
-    head_html, body_html = generate_graph_html(graph, base_model, view_type)
+    # 生成 head_html 和 body_html（热门模型的视图直接取缓存）
+    head_html, body_html = cached_render(('view', base_model, view_type), lambda graph: generate_graph_html(
+        graph, base_model, view_type, get_subtree_index(loaded)), loaded)
     
     # 渲染模板并传递变量
     return render_template('network.html', head_html=head_html, body_html=body_html)
@@ -38,14 +70,12 @@ def network_large_graph():
     
     URL 示例: /network/large_graph/?top_k=100
     """
-    # 获取查询参数
-    top_k = int(request.args.get('top_k', 100))
+    # 获取查询参数（top_k 会成为缓存的键，限制在 1 ~ LARGE_GRAPH_MAX_TOP_K 之间）
+    top_k = min(max(request.args.get('top_k', 100, type=int), 1), LARGE_GRAPH_MAX_TOP_K)
 
-    # 加载图对象
-    graph = load_graph(app.config['GRAPH_PICKLE_PATH'])
-    
     # 生成 head_html 和 body_html
-    head_html, body_html = generate_large_graph_html(graph, top_k)
+    head_html, body_html = cached_render(('large_graph', top_k),
+                                         lambda graph: generate_large_graph_html(graph, top_k))
     
     # 渲染模板并传递变量
     return render_template('network_large.html', head_html=head_html, body_html=body_html)
@@ -58,7 +88,7 @@ def network_specific_large_graph():
     URL 示例: /network/specific_large_graph/?base_model_to_show=b1,b2,bk
     """ 
     # 加载图对象
-    eg_graph = load_graph(app.config['GRAPH_PICKLE_PATH'])
+    eg_graph = load_graph()
 
     # 获取 'base_model_to_show' 参数的字符串值，默认为空字符串
     base_models_str = request.args.get('base_model_to_show', '')
@@ -70,3 +100,74 @@ def network_specific_large_graph():
     head_html, body_html = generate_specific_large_graph_html(eg_graph, base_models)
     
     return render_template('network_large.html', head_html=head_html, body_html=body_html)
+
+
+def _conditional_headers(response, loaded):
+    """JSON 接口的结果只取决于图版本和查询参数：ETag 与 Last-Modified 取自图数据的版本"""
+    response.set_etag(str(loaded.version))
+    response.last_modified = loaded.modified
+    response.cache_control.no_cache = True
+    return response
+
+
+@network_bp.route('/api/subgraph', methods=['GET'])
+def api_subgraph():
+    """
+    与 /network/ 相同的节点和边（base_model、view_type 参数相同，不支持 view_type=2 的作者折叠），
+    以紧凑的 JSON 返回（见 utils.subgraph_data），不包含侧边栏 HTML。
+
+    URL 示例: /network/api/subgraph?view_type=1&base_model=meta-llama/Meta-Llama-3-70B
+    """
+    view_type = request.args.get('view_type', 1, type=int)
+    base_model = request.args.get('base_model', 'meta-llama/Meta-Llama-3-70B')
+    if view_type not in VIEW_TYPES:
+        return jsonify({"error": f"不支持的 view_type: {view_type}"}), 400
+    if view_type == 2:
+        return jsonify({"error": "view_type=2（同作者折叠）只提供页面"}), 400
+    loaded = current_graph()
+    if base_model not in loaded.graph.nodes:
+        return jsonify({"error": f"模型不存在: {base_model}"}), 404
+    if not is_resource_modified(request.environ, etag=str(loaded.version), last_modified=loaded.modified):
+        return _conditional_headers(Response(status=304), loaded)
+    # 序列化后的字节与 HTML 视图共用同一个缓存
+    body, = cached_render(('subgraph', base_model, view_type), lambda graph: (
+        json.dumps(subgraph_data(graph, base_model, view_type, get_subtree_index(loaded)), ensure_ascii=False, separators=(',', ':')),), loaded)
+    return _conditional_headers(Response(body, mimetype='application/json'), loaded)
+
+
+@network_bp.route('/api/node/<path:model_id>', methods=['GET'])
+def api_node(model_id):
+    """
+    点击节点时侧边栏需要的模型信息（见 utils.node_details），由 network.js 渲染。
+
+    URL 示例: /network/api/node/meta-llama/Meta-Llama-3-70B
+    """
+    loaded = current_graph()
+    if model_id not in loaded.graph.nodes:
+        return jsonify({"error": f"模型不存在: {model_id}"}), 404
+    if not is_resource_modified(request.environ, etag=str(loaded.version), last_modified=loaded.modified):
+        return _conditional_headers(Response(status=304), loaded)
+    return _conditional_headers(jsonify(node_details(loaded.graph, model_id)), loaded)
+
+
+@network_bp.route('/api/children/<path:model_id>', methods=['GET'])
+def api_children(model_id):
+    """
+    渐进展开视图（view_type=9）点击节点时加载的子模型，按影响力从高到低分页（见 utils.children_page）。
+    参数: type（衍生类型，默认 all）、cursor（上一页的 next_cursor，默认 0）、limit（每页个数）。
+
+    URL 示例: /network/api/children/meta-llama/Meta-Llama-3-70B?type=finetune&cursor=10
+    """
+    edge_type = request.args.get('type', ALL_EDGE_TYPES) or ALL_EDGE_TYPES
+    cursor = request.args.get('cursor', '0') or '0'
+    limit = request.args.get('limit', CHILDREN_PAGE_SIZE, type=int)
+    loaded = current_graph()
+    if model_id not in loaded.graph.nodes:
+        return jsonify({"error": f"模型不存在: {model_id}"}), 404
+    if not is_resource_modified(request.environ, etag=str(loaded.version), last_modified=loaded.modified):
+        return _conditional_headers(Response(status=304), loaded)
+    try:
+        page = children_page(loaded.graph, get_subtree_index(loaded), model_id, edge_type, cursor, limit)
+    except ValueError as error:
+        return jsonify({"error": str(error)}), 400
+    return _conditional_headers(jsonify(page), loaded)
@@ -0,0 +1,296 @@
+# network_graph/subtree_index.py
+# 模型家族（子树）的预计算索引：每个图版本只构建一次（见 graph_provider.derived）。
+# 对全部边、以及每一种衍生类型的边，各保存一份 CSR 邻接表和一次全局深度优先遍历的先序编号；
+# 家族是一棵树时（绝大多数模型如此），某个模型的全部后代就是先序序列中的一段连续区间，直接切片即可。
+# 家族中有合并模型（有多个父模型）或环时，对整数邻接表做一次遍历，结果按模型缓存。
+# 每个模型的子模型另按影响力从高到低排好序，渐进展开的视图按页从中切出。
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+SUBTREE_CACHE_SIZE = 256  # 缓存的非树家族（遍历得到的结果）的个数
+
+
+def _gather(indptr, nodes):
+    """CSR 中若干节点的出边在边数组中的下标，按节点顺序、每个节点内按邻接表顺序排列"""
+    starts = indptr[nodes]
+    counts = indptr[nodes + 1] - starts
+    if counts.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.cumsum(counts) - counts
+    return np.repeat(starts - offsets, counts) + np.arange(counts.sum(), dtype=np.int64)
+
+
+class _Forest:
+    """
+    只保留某一种类型的边（或全部边）后的图上的生成森林。
+    入度恰好为 1 的节点挂在唯一的父节点下，其余节点（以及从这些根出发到达不了的环上的节点）是森林的根。
+    先序遍历与 network_graph.utils.collect_graph_view 的栈式遍历一致：子节点按邻接表顺序入栈，最后一个先展开。
+    """
+
+    def __init__(self, num_nodes, indptr, indices, edge_ids):
+        """
+        Args:
+            num_nodes (int): 节点数。
+            indptr, indices (np.ndarray): 这些边的 CSR 邻接表。
+            edge_ids (np.ndarray): 每条边在完整邻接表中的下标（用于取边类型）。
+        """
+        self.indptr = indptr
+        self.indices = indices
+        self.edge_ids = edge_ids
+        self._ranked = None
+        owners = np.repeat(np.arange(num_nodes, dtype=np.int64), np.diff(indptr))
+        in_degree = np.bincount(indices, minlength=num_nodes)
+
+        # 入度为 1 的节点的父节点与这条边的下标
+        parent = np.full(num_nodes, -1, dtype=np.int64)
+        parent_edge = np.full(num_nodes, -1, dtype=np.int64)
+        single = np.flatnonzero(in_degree[indices] == 1)
+        parent[indices[single]] = owners[single]
+        parent_edge[indices[single]] = single
+
+        # 从根出发逐层向下，只走森林中的边
+        levels = [np.flatnonzero(parent < 0)]
+        reached = np.zeros(num_nodes, dtype=bool)
+        reached[levels[0]] = True
+        while levels[-1].size:
+            children = indices[_gather(indptr, levels[-1])]
+            children = children[(in_degree[children] == 1) & ~reached[children]]
+            reached[children] = True
+            levels.append(children)
+        levels.pop()
+        # 到达不了的节点都在环上或环的下游，把它们各自当作只有一个节点的根
+        unreached = np.flatnonzero(~reached)
+        if unreached.size:
+            parent[unreached] = -1
+            levels[0] = np.concatenate([levels[0], unreached])
+
+        # 不在森林中的边（指向合并节点、环或自身）的起点：以它为祖先的家族不是树
+        tree_edge = parent[indices] == owners
+        self.leaky = np.bincount(owners[~tree_edge], minlength=num_nodes) > 0
+
+        # 子树大小：从最深的一层向上累加
+        size = np.ones(num_nodes, dtype=np.int64)
+        for level in reversed(levels[1:]):
+            np.add.at(size, parent[level], size[level])
+        # 先序编号：兄弟节点按邻接表倒序排列，每个节点的编号为父节点编号 + 1 + 排在它前面的兄弟的子树大小之和
+        pre = np.empty(num_nodes, dtype=np.int64)
+        roots = levels[0]
+        pre[roots] = np.cumsum(size[roots]) - size[roots]
+        for level in levels[1:]:
+            level = level[np.argsort(-parent_edge[level], kind='stable')]
+            parents = parent[level]
+            before = np.cumsum(size[level]) - size[level]
+            first = np.flatnonzero(np.r_[True, parents[1:] != parents[:-1]])
+            group = np.cumsum(np.r_[True, parents[1:] != parents[:-1]]) - 1
+            pre[level] = pre[parents] + 1 + before - before[first][group]
+        self.pre = pre
+        self.size = size
+        self.order = np.empty(num_nodes, dtype=np.int64)
+        self.order[pre] = np.arange(num_nodes, dtype=np.int64)
+        # 先序序列上 leaky 的前缀和，判断一段区间中是否有 leaky 节点只需两次查表
+        self.leaky_prefix = np.concatenate([[0], np.cumsum(self.leaky[self.order])])
+
+    def is_tree(self, i):
+        """以 i 为根的家族是否是树（此时家族即先序序列中的一段区间）"""
+        pre, size = self.pre[i], self.size[i]
+        return self.leaky_prefix[pre + size] == self.leaky_prefix[pre]
+
+    def interval(self, i):
+        """家族在先序序列中的区间，按 collect_graph_view 展开节点的顺序"""
+        return self.order[self.pre[i]:self.pre[i] + self.size[i]]
+
+    def ranked(self, influence):
+        """
+        每个节点的出边按子节点影响力从高到低排列（相同时保持邻接表顺序）后的边下标，第一次用到时计算。
+        """
+        if self._ranked is None:
+            owners = np.repeat(np.arange(self.indptr.size - 1, dtype=np.int64), np.diff(self.indptr))
+            positions = np.arange(self.indices.size, dtype=np.int64)
+            self._ranked = np.lexsort((positions, -influence[self.indices], owners))
+        return self._ranked
+
+
+class SubtreeIndex:
+    """
+    节点编号为 graph.nodes 的遍历顺序（快照中即 model_id 表的顺序），边的顺序与 graph[node] 的顺序一致。
+    每种边类型的 _Forest 第一次用到时构建并缓存，全部边的森林在构建索引时就建好。
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.snapshot = getattr(graph, "snapshot", None)
+        if self.snapshot is not None:
+            self._init_from_snapshot(self.snapshot)
+        else:
+            self._init_from_graph(graph)
+        self.num_nodes = self.indptr.size - 1
+        self.out_degree = np.diff(self.indptr)
+        self._type_code = {name: code for code, name in enumerate(self.edge_types)}
+        self._forests = {None: _Forest(self.num_nodes, self.indptr, self.indices,
+                                       np.arange(self.indices.size, dtype=np.int64))}
+        self._walks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _init_from_graph(self, graph):
+        self.node_ids = list(graph.nodes)
+        lookup = {node: i for i, node in enumerate(self.node_ids)}
+        self._lookup = lookup.get
+        self.influence = np.fromiter((graph.nodes[node].get('influence', 0.0) or 0.0 for node in self.node_ids),
+                                     dtype=np.float64, count=len(self.node_ids))
+        names, type_lookup = [], {}
+        counts, targets, types = [], [], []
+        for node in self.node_ids:
+            children = graph[node].items()
+            counts.append(len(children))
+            for successor, edge_data in children:
+                name = edge_data.get("type", "unknown")
+                code = type_lookup.get(name)
+                if code is None:
+                    code = type_lookup[name] = len(names)
+                    names.append(name)
+                targets.append(lookup[successor])
+                types.append(code)
+        self.indptr = np.concatenate([[0], np.cumsum(counts, dtype=np.int64)]).astype(np.int64)
+        self.indices = np.array(targets, dtype=np.int64)
+        self.types = np.array(types, dtype=np.int64)
+        self.edge_types = names
+
+    def _init_from_snapshot(self, snapshot):
+        # 快照中的邻接表本身就是 CSR
+        self.node_ids = snapshot.model_ids
+        self._lookup = snapshot.node_index
+        self.influence = np.asarray(snapshot.column('influence'), dtype=np.float64)
+        self.indptr = np.asarray(snapshot.column('succ_indptr'), dtype=np.int64)
+        self.indices = np.asarray(snapshot.column('succ_indices'), dtype=np.int64)
+        self.types = np.asarray(snapshot.column('succ_type'), dtype=np.int64)
+        self.edge_types = list(snapshot.edge_types)
+
+    def node_index(self, model_id):
+        """模型 id -> 节点编号，不存在时返回 None"""
+        return self._lookup(model_id)
+
+    def forest(self, edge_type=None):
+        """只保留 edge_type 类型的边（None 表示全部边）后的森林"""
+        forest = self._forests.get(edge_type)
+        if forest is None:
+            code = self._type_code.get(edge_type, -1)
+            edge_ids = np.flatnonzero(self.types == code)
+            owners = np.repeat(np.arange(self.num_nodes, dtype=np.int64), np.diff(self.indptr))
+            counts = np.bincount(owners[edge_ids], minlength=self.num_nodes)
+            indptr = np.concatenate([[0], np.cumsum(counts)]).astype(np.int64)
+            forest = self._forests[edge_type] = _Forest(self.num_nodes, indptr, self.indices[edge_ids], edge_ids)
+        return forest
+
+    def _walk(self, i, forest):
+        """
+        非树家族：按 collect_graph_view 的规则在整数邻接表上遍历。
+        Returns:
+            nodes (np.ndarray): 按加入顺序的节点编号。
+            sources, targets, edge_ids (np.ndarray): 按加入顺序的边。
+        """
+        key = (i, id(forest))
+        with self._lock:
+            walk = self._walks.get(key)
+            if walk is not None:
+                self._walks.move_to_end(key)
+                return walk
+        indptr, indices = forest.indptr, forest.indices
+        nodes, sources, targets, edges = [i], [], [], []
+        added = {i}
+        visited = set()
+        stack = [i]
+        while stack:
+            node = stack.pop()
+            if node in visited:
+                continue
+            visited.add(node)
+            start = int(indptr[node])
+            for offset, successor in enumerate(indices[start:indptr[node + 1]].tolist()):
+                if successor in added:
+                    continue
+                added.add(successor)
+                nodes.append(successor)
+                sources.append(node)
+                targets.append(successor)
+                edges.append(start + offset)
+                stack.append(successor)
+        walk = (np.array(nodes, dtype=np.int64), np.array(sources, dtype=np.int64),
+                np.array(targets, dtype=np.int64), forest.edge_ids[np.array(edges, dtype=np.int64)])
+        with self._lock:
+            self._walks[key] = walk
+            if len(self._walks) > SUBTREE_CACHE_SIZE:
+                self._walks.popitem(last=False)
+        return walk
+
+    def subtree(self, model_id, edge_type=None):
+        """
+        模型及其全部后代（只沿 edge_type 类型的边，None 表示全部边）的节点编号。
+        家族是树时为先序序列的切片（不复制），否则为遍历结果（缓存）。
+        Raises:
+            KeyError: 模型不存在。
+        """
+        i = self.node_index(model_id)
+        if i is None:
+            raise KeyError(model_id)
+        forest = self.forest(edge_type)
+        if forest.is_tree(i):
+            return forest.interval(i)
+        return self._walk(i, forest)[0]
+
+    def tree_view(self, model_id, edge_type=None):
+        """
+        与 collect_graph_view 的 view_type 1、4~7 相同的节点和边。
+        Returns:
+            nodes (list): 节点 id，按加入的顺序。
+            edges (list): (父节点, 子节点, 边类型)，按加入的顺序。
+        Raises:
+            KeyError: 模型不存在。
+        """
+        i = self.node_index(model_id)
+        if i is None:
+            raise KeyError(model_id)
+        forest = self.forest(edge_type)
+        if forest.is_tree(i):
+            # 按展开顺序取出每个节点的全部出边（树中每条出边都指向新节点）
+            expanded = forest.interval(i)
+            positions = _gather(forest.indptr, expanded)
+            sources = np.repeat(expanded, forest.indptr[expanded + 1] - forest.indptr[expanded])
+            targets = forest.indices[positions]
+            nodes = np.concatenate([[i], targets])
+            edge_ids = forest.edge_ids[positions]
+        else:
+            nodes, sources, targets, edge_ids = self._walk(i, forest)
+        node_ids, edge_types = self.node_ids, self.edge_types
+        return ([node_ids[j] for j in nodes.tolist()],
+                [(node_ids[s], node_ids[t], edge_types[c])
+                 for s, t, c in zip(sources.tolist(), targets.tolist(), self.types[edge_ids].tolist())])
+
+    def has_edge_type(self, edge_type):
+        return edge_type in self._type_code
+
+    def children(self, model_id, edge_type=None, offset=0, limit=None):
+        """
+        按影响力从高到低排列的子模型（只看 edge_type 类型的边，None 表示全部边）中的一段。
+        Args:
+            offset (int): 从第几个子模型开始。
+            limit (int): 最多返回几个，None 表示全部。
+        Returns:
+            children (np.ndarray): 子模型的节点编号。
+            edge_types (list): 对应的边类型。
+            total (int): 子模型总数。
+        Raises:
+            KeyError: 模型不存在。
+        """
+        i = self.node_index(model_id)
+        if i is None:
+            raise KeyError(model_id)
+        forest = self.forest(edge_type)
+        start, end = int(forest.indptr[i]), int(forest.indptr[i + 1])
+        stop = end if limit is None else min(end, start + offset + limit)
+        positions = forest.ranked(self.influence)[min(start + offset, end):stop]
+        return (forest.indices[positions],
+                [self.edge_types[c] for c in self.types[forest.edge_ids[positions]].tolist()],
+                end - start)
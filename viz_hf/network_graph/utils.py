@@ -3,27 +3,24 @@
 from flask import Flask, render_template, jsonify, request
 from pyvis.network import Network
 import networkx as nx
-import pickle
 import math
 import os
 import re 
 import json
+from graph_provider import current_graph
+
+from .subtree_index import SubtreeIndex
 
 TOPK_K = 100  # 用于控制only top models的top数量（100） 
 
-def load_graph(pickle_path):
+def load_graph():
     """
-    从 pickle 文件中加载 networkx 图对象。
-    
-    参数:
-    - pickle_path: pickle 文件的路径
+    获取当前的图对象（由 create_app 中创建的 GraphProvider 统一加载并在文件更新后热替换，不在每个请求中重新读取）。
     
     返回:
-    - graph: networkx 图对象
+    - graph: EasyGraph 图对象，或与之接口兼容的快照视图
     """
-    with open(pickle_path, 'rb') as f:
-        graph = pickle.load(f)
-    return graph
+    return current_graph().graph
 
 
 # 设置pyvis物理引擎参数
@@ -75,7 +72,10 @@ def calculate_color(value, max_value, color_start, color_end, text_color_light="
     return f"rgba({r}, {g}, {b}, 0.8)", text_color  # 背景颜色使用透明度 0.8
 
 # 定义一个辅助函数，用于添加节点到图中
-def add_node_to_net(net, node, node_attrs, eg_graph):
+def add_node_to_net(net, node, node_attrs, eg_graph, sidebar=True):
+    """
+    sidebar 为 False 时不在节点中内嵌侧边栏 HTML，由页面在点击节点时请求 /network/api/node/<id>（见 node_details）。
+    """
     influence = node_attrs.get("influence", 1.0)
     pic = node_attrs.get("pic", "https://huggingface.co/front/assets/huggingface_logo-noborder.svg")
     downloads = node_attrs.get("downloads", 0)
@@ -85,6 +85,18 @@ def add_node_to_net(net, node, node_attrs, eg_graph):
     author_type = node_attrs.get("author_type", "unknown") 
     created_at = node_attrs.get("created_at", "unknown") 
 
+    if not sidebar:
+        net.add_node(
+            node,
+            label="",
+            size=math.sqrt(influence)*3,
+            title=f"{node} \nby {author_full_name}",
+            shape="image",
+            image=pic,
+            font=dict(size=0)
+        )
+        return
+
     # 具体化author_type
     if author_type == "usr":
         author_type_on_board = "an individual user"
@@ -187,7 +199,93 @@ def add_node_to_net(net, node, node_attrs, eg_graph):
         font=dict(size=0)  # 设置字体大小为 0 来确保标签隐藏
     )
 
-def generate_graph_html(eg_graph, base_model , view_type=1):
+# 边的颜色对应衍生类型
+EDGE_COLORS = {
+    "adapter": "blue",
+    "finetune": "green",
+    "merge": "red",
+    "quantized": "purple",
+}
+# view_type 4~7：只展示某一种衍生类型的边
+VIEW_EDGE_TYPES = {4: "adapter", 5: "finetune", 6: "merge", 7: "quantized"}
+# view_type 9：渐进展开。初始只展示 base_model 及其每种衍生类型中影响力最高的 PROGRESSIVE_TOP_N 个子模型，
+# 点击节点时由 /network/api/children/<id> 按页加载更多子模型（见 children_page）
+PROGRESSIVE_VIEW = 9
+PROGRESSIVE_TOP_N = 10
+CHILDREN_PAGE_SIZE = 20
+CHILDREN_MAX_PAGE_SIZE = 200
+ALL_EDGE_TYPES = "all"  # children 接口的 type 参数：不区分衍生类型
+# 支持的 view_type（1：完整网络，2：同作者折叠，3：过滤个人用户，4~7：按衍生类型，8：每层 TOPK_K 个，9：渐进展开）
+VIEW_TYPES = (1, 2, 3, 4, 5, 6, 7, 8, PROGRESSIVE_VIEW)
+LARGE_GRAPH_MAX_TOP_K = 500  # /network/large_graph/ 的 top_k 上限
+
+
+def collect_graph_view(eg_graph, base_model, view_type=1, subtree_index=None):
+    """
+    从 base_model 开始深度优先遍历，按视图类型收集要展示的节点和边（view_type 2 的作者折叠除外）。
+    每个节点只经由第一次遇到它的边加入，与页面上画出的树一致。
+    Args:
+        eg_graph: EasyGraph 的 DiGraph 对象（或快照视图）。
+        base_model: 根节点。
+        view_type: 1：完整网络，3：过滤个人用户，4~7：只看某种衍生类型，8：每层只取影响力最高的 TOPK_K 个子模型。
+        subtree_index (SubtreeIndex): 该图的子树索引，给出时 view_type 1、4~7 直接从索引中取出，结果相同。
+    Returns:
+        nodes (list): 节点 id，按加入的顺序。
+        edges (list): (父节点, 子节点, 边类型)，按加入的顺序。
+    """
+    if subtree_index is not None and (view_type == 1 or view_type in VIEW_EDGE_TYPES):
+        return subtree_index.tree_view(base_model, VIEW_EDGE_TYPES.get(view_type))
+    if view_type == PROGRESSIVE_VIEW:
+        nodes, edges, _ = collect_progressive_view(subtree_index or SubtreeIndex(eg_graph), base_model)
+        return nodes, edges
+    nodes, edges = [], []
+    added = set()
+    visited = set()
+    stack = [base_model]
+    in_stack = {base_model}
+
+    def add(node):
+        if node not in added:
+            added.add(node)
+            nodes.append(node)
+
+    while stack:
+        node = stack.pop()
+        in_stack.discard(node)
+        if node in visited:
+            continue
+        visited.add(node)
+        add(node)
+        # 一次取出全部出边及其属性，不对每个子节点再查一次 eg_graph[node]
+        children = eg_graph[node].items()
+
+        if view_type == 8:
+            # 子节点按 influence 从大到小排序，只取前 TOPK_K 个
+            ranked = sorted(children, key=lambda item: eg_graph.nodes[item[0]].get('influence', 0), reverse=True)
+            for successor, edge_data in ranked[:TOPK_K]:
+                add(successor)
+                edges.append((node, successor, edge_data.get("type", "unknown")))
+                if successor not in visited and successor not in in_stack:
+                    stack.append(successor)
+                    in_stack.add(successor)
+            continue
+
+        for successor, edge_data in children:
+            if successor in added:
+                continue
+            edge_type = edge_data.get("type", "unknown")
+            if view_type in VIEW_EDGE_TYPES and edge_type != VIEW_EDGE_TYPES[view_type]:
+                continue
+            if view_type == 3 and eg_graph.nodes[successor].get("author_type", "unknown") == "usr":
+                continue
+            add(successor)
+            edges.append((node, successor, edge_type))
+            stack.append(successor)
+            in_stack.add(successor)
+    return nodes, edges
+
+
+def generate_graph_html(eg_graph, base_model , view_type=1, subtree_index=None):
     """
     可视化指定 base_model 的子图，支持不同的视图类型。
     Args:
@@ -195,117 +293,194 @@ def generate_graph_html(eg_graph, base_model , view_type=1):
         base_model: 要可视化的根节点（base_model）。
         output_file: 输出 HTML 文件的路径。
         view_type: 可视化模式，1：完整网络，2：同作者折叠，3：过滤企业，4：按类别展示
+        subtree_index: 该图的子树索引（见 subtree_index.py），可选。
     """
     if view_type == 2:
         return generate_graph_html_for2(eg_graph, base_model)
+    if view_type == PROGRESSIVE_VIEW:
+        return generate_progressive_graph_html(eg_graph, base_model, subtree_index or SubtreeIndex(eg_graph))
     # 初始化 PyVis 图
     net = Network(height="1000px", width="100%", notebook=False, directed=True, cdn_resources='remote')
-    
-    # 边的颜色对应衍生类型
-    edge_colors = {
-        "adapter": "blue",
-        "finetune": "green",
-        "merge": "red",
-        "quantized": "purple",
-    }  
 
+    nodes, edges = collect_graph_view(eg_graph, base_model, view_type, subtree_index)
+    for node in nodes:
+        add_node_to_net(net, node, eg_graph.nodes[node], eg_graph, sidebar=False)
+    for source, target, edge_type in edges:
+        net.add_edge(source, target, color=EDGE_COLORS.get(edge_type, "black"), title=edge_type)
 
-    # 深度优先遍历，从 base_model 开始构建子图
-    visited = set()  # 用于避免重复访问节点
-    stack = [base_model]  # 使用栈模拟深度优先遍历 
+    # 生成 HTML 字符串
+    #return net.generate_html().replace("</body>", menu_html + sidebar_html + "</body>")#.split('<body>')[1].split('</body>')[0]
+    set_physics_options(net)
+    graph_html = net.generate_html()  # 只生成一次，head 和 body 都从中切出
+    head_html = graph_html.split('<head>')[1].split('</head>')[0]
+    body_html = graph_html.split('<body>')[1].split('</body>')[0]
 
-    # 获取eg_graph所有结点中
-    while stack:
-        node = stack.pop()
-        if node in visited:
-            continue
-        visited.add(node)
+    # 将 head_content 和 body_content 传递给模板
+    return head_html, body_html
 
+def node_details(eg_graph, node):
+    """
+    侧边栏中展示的模型信息（点击节点时由 /network/api/node/<id> 返回，页面中渲染），字段与默认值与 add_node_to_net 相同。
+    """
+    node_attrs = eg_graph.nodes[node]
+    author = node_attrs.get("author", "unknown")
+    details = {
+        "id": node,
+        "pic": node_attrs.get("pic", "https://huggingface.co/front/assets/huggingface_logo-noborder.svg"),
+        "created_at": node_attrs.get("created_at", "unknown"),
+        "author": author,
+        "author_full_name": node_attrs.get("author_full_name", author),
+        "author_type": node_attrs.get("author_type", "unknown"),
+        "downloads": node_attrs.get("downloads", 0),
+        "likes": node_attrs.get("likes", 0),
+        "influence": node_attrs.get("influence", 1.0),
+        "parent": None,
+        "parent_edge_type": None,
+    }
+    # 有父模型时，侧边栏显示“A <type> version of <父模型>”（取第一条入边）
+    predecessors = list(eg_graph.predecessors(node))
+    if predecessors:
+        details["parent"] = predecessors[0]
+        details["parent_edge_type"] = eg_graph[predecessors[0]][node].get("type", "unknown")
+    return details
+
+
+def subgraph_data(eg_graph, base_model, view_type=1, subtree_index=None):
+    """
+    与 generate_graph_html 相同的节点和边，以紧凑的 JSON 结构返回，由页面自行绘制：
+    节点为按列存放的 id / size / image / author，image、author 是 images、authors 表中的下标；
+    边为 source / target（nodes 中的下标）和 type（edge_types 中的下标）。侧边栏信息不在其中，点击时再请求。
+    """
+    nodes, edges = collect_graph_view(eg_graph, base_model, view_type, subtree_index)
+    position = {node: i for i, node in enumerate(nodes)}
+    images, authors, edge_types = {}, {}, {}
+    columns = {"id": nodes, "size": [], "image": [], "author": []}
+    for node in nodes:
         node_attrs = eg_graph.nodes[node]
-        author = node_attrs.get("author", "unknown") 
+        pic = node_attrs.get("pic", "https://huggingface.co/front/assets/huggingface_logo-noborder.svg")
+        author_full_name = node_attrs.get("author_full_name", node_attrs.get("author", "unknown"))
+        columns["size"].append(round(math.sqrt(node_attrs.get("influence", 1.0)) * 3, 2))
+        columns["image"].append(images.setdefault(pic, len(images)))
+        columns["author"].append(authors.setdefault(author_full_name, len(authors)))
+    return {
+        "base_model": base_model,
+        "view_type": view_type,
+        "nodes": columns,
+        "images": list(images),
+        "authors": list(authors),
+        "edges": {
+            "source": [position[source] for source, _, _ in edges],
+            "target": [position[target] for _, target, _ in edges],
+            "type": [edge_types.setdefault(edge_type, len(edge_types)) for _, _, edge_type in edges],
+        },
+        "edge_types": list(edge_types),
+    }
 
-        # 添加节点到 PyVis 图
-        if node not in net.get_nodes():
-            ''' unnecessary code: save for future use if my decision is wrong
-            if view_type == 3 and node_attrs.get("author_type", "unknown") == "usr" and node != base_model:
-                continue '''
-            add_node_to_net(net, node, node_attrs, eg_graph)  # 传递 eg_graph 参数
 
-        # 处理view_type == 8的情况
-        if view_type == 8:
-            # 获取以 base_model 为根节点的子图，并按 influence 排序
-            all_successors = list(eg_graph.successors(node))
-            successor_attrs = [(node0, eg_graph.nodes[node0]) for node0 in all_successors]
-
-            # 排序子节点，按 influence 从大到小排序
-            sorted_successors = sorted(successor_attrs, key=lambda x: x[1].get('influence', 0), reverse=True)
-            # 只取前 TOPK_K 个节点
-            top_successors = sorted_successors[:TOPK_K]
-            # 前五十结点加入图中
-            for successor, attrs in top_successors:
-                add_node_to_net(net, successor, attrs, eg_graph)
-                # 添加边到图中
-                edge_data = eg_graph[node][successor]
-                edge_type = edge_data.get("type", "unknown")
-                edge_color = edge_colors.get(edge_type, "black")
-                net.add_edge(node, successor, color=edge_color, title=edge_type)
-                if successor not in visited and successor not in stack:
-                    stack.append(successor)
-            continue
+def child_cursors(subtree_index, node):
+    """
+    尚未展开的节点的加载游标：有子模型时为 {ALL_EDGE_TYPES: "0"}，即从第一个子模型开始按页加载，否则为空。
+    页面在节点上保存游标，点击节点时按游标请求 /network/api/children/<id>，加载完的类型从中删除。
+    """
+    return {ALL_EDGE_TYPES: "0"} if subtree_index.out_degree[subtree_index.node_index(node)] else {}
 
-        # 遍历所有子节点（出边）
-        for successor in eg_graph.successors(node):
-            successor_attrs = eg_graph.nodes[successor]
-            
 
-            # 加载边数据
-            edge_data = eg_graph[node][successor]
-            edge_type = edge_data.get("type", "unknown")
-            edge_color = edge_colors.get(edge_type, "black")
+def collect_progressive_view(subtree_index, base_model, top_n=PROGRESSIVE_TOP_N):
+    """
+    渐进展开视图的初始节点和边：base_model 与它每种衍生类型中影响力最高的 top_n 个子模型。
+    不论家族多大，节点数都不超过 1 + top_n × 衍生类型数。
+    Returns:
+        nodes (list): 节点 id。
+        edges (list): (父节点, 子节点, 边类型)。
+        cursors (dict): 节点 id -> 加载游标（见 child_cursors）；base_model 的游标按衍生类型记录已经展示到第几个。
+    Raises:
+        KeyError: 模型不存在。
+    """
+    nodes, edges = [base_model], []
+    base_cursors = {}
+    for edge_type in subtree_index.edge_types:
+        children, edge_types, total = subtree_index.children(base_model, edge_type, 0, top_n)
+        for child, child_edge_type in zip(children.tolist(), edge_types):
+            nodes.append(subtree_index.node_ids[child])
+            edges.append((base_model, subtree_index.node_ids[child], child_edge_type))
+        if total > top_n:
+            base_cursors[edge_type] = str(top_n)
+    cursors = {node: child_cursors(subtree_index, node) for node in nodes[1:]}
+    cursors[base_model] = base_cursors
+    return nodes, edges, cursors
+
+
+def generate_progressive_graph_html(eg_graph, base_model, subtree_index):
+    """
+    渐进展开视图（view_type 9）：只画出 collect_progressive_view 的节点和边，
+    每个节点带上加载游标 child_cursors，由 network.js 在点击时加载更多子模型。
+    """
+    net = Network(height="1000px", width="100%", notebook=False, directed=True, cdn_resources='remote')
 
-            def add_edge_node_and_stack(): 
-                if successor not in visited and successor not in stack:
-                    if view_type == 3 and successor_attrs.get("author_type", "unknown") == "usr" and successor != base_model:
-                        pass
-                    else:
-                        add_node_to_net(net, successor, successor_attrs, eg_graph)  # 传递 eg_graph 参数
-                        net.add_edge(node, successor, color=edge_color, title=edge_type) 
-                        stack.append(successor)
-
-            # 确保目标节点添加到图中，且根据view_type过滤节点
-            if successor not in net.get_nodes():
-                if view_type == 4:
-                    if edge_type == "adapter":
-                        add_edge_node_and_stack()
-                    else:
-                        continue
-                elif view_type == 5:
-                    if edge_type == "finetune":
-                        add_edge_node_and_stack()
-                    else:
-                        continue
-                elif view_type == 6:
-                    if edge_type == "merge":
-                        add_edge_node_and_stack() 
-                    else:
-                        continue
-                elif view_type == 7:
-                    if edge_type == "quantized":
-                        add_edge_node_and_stack()
-                    else:
-                        continue
-                else:
-                    add_edge_node_and_stack()
-    # 生成 HTML 字符串
-    #return net.generate_html().replace("</body>", menu_html + sidebar_html + "</body>")#.split('<body>')[1].split('</body>')[0]
-    set_physics_options(net)
-    graph_html = net.generate_html()  
-    head_html = net.generate_html().split('<head>')[1].split('</head>')[0]
-    body_html = net.generate_html().split('<body>')[1].split('</body>')[0]
+    nodes, edges, cursors = collect_progressive_view(subtree_index, base_model)
+    for node in nodes:
+        add_node_to_net(net, node, eg_graph.nodes[node], eg_graph, sidebar=False)
+        net.get_node(node)["child_cursors"] = cursors[node]
+    for source, target, edge_type in edges:
+        net.add_edge(source, target, color=EDGE_COLORS.get(edge_type, "black"), title=edge_type)
 
-    # 将 head_content 和 body_content 传递给模板
+    set_physics_options(net)
+    graph_html = net.generate_html()
+    head_html = graph_html.split('<head>')[1].split('</head>')[0]
+    body_html = graph_html.split('<body>')[1].split('</body>')[0]
     return head_html, body_html
 
+
+def children_page(eg_graph, subtree_index, model_id, edge_type=ALL_EDGE_TYPES, cursor="0", limit=CHILDREN_PAGE_SIZE):
+    """
+    按影响力从高到低排列的子模型中的一页，每个子模型附带页面上添加节点和边所需的字段。
+    Args:
+        edge_type (str): 衍生类型，ALL_EDGE_TYPES 表示全部。
+        cursor (str): 上一页返回的 next_cursor（即从第几个子模型开始），第一页为 "0"。
+        limit (int): 每页个数，不超过 CHILDREN_MAX_PAGE_SIZE。
+    Returns:
+        dict: {model_id, type, total, next_cursor, children: [...]}，没有下一页时 next_cursor 为 None。
+    Raises:
+        KeyError: 模型不存在。
+        ValueError: 衍生类型、游标或每页个数无效。
+    """
+    if edge_type != ALL_EDGE_TYPES and not subtree_index.has_edge_type(edge_type):
+        raise ValueError(f"不支持的衍生类型: {edge_type}")
+    try:
+        offset = int(cursor)
+    except (TypeError, ValueError):
+        raise ValueError(f"无效的 cursor: {cursor}")
+    if offset < 0:
+        raise ValueError(f"无效的 cursor: {cursor}")
+    if not 0 < limit <= CHILDREN_MAX_PAGE_SIZE:
+        raise ValueError(f"limit 应在 1 到 {CHILDREN_MAX_PAGE_SIZE} 之间")
+    children, edge_types, total = subtree_index.children(
+        model_id, None if edge_type == ALL_EDGE_TYPES else edge_type, offset, limit)
+    page = []
+    for child, child_edge_type in zip(children.tolist(), edge_types):
+        node = subtree_index.node_ids[child]
+        node_attrs = eg_graph.nodes[node]
+        author_full_name = node_attrs.get("author_full_name", node_attrs.get("author", "unknown"))
+        # 节点字段与 add_node_to_net(sidebar=False) 画出的节点相同
+        page.append({
+            "id": node,
+            "size": math.sqrt(node_attrs.get("influence", 1.0)) * 3,
+            "image": node_attrs.get("pic", "https://huggingface.co/front/assets/huggingface_logo-noborder.svg"),
+            "title": f"{node} \nby {author_full_name}",
+            "edge_type": child_edge_type,
+            "edge_color": EDGE_COLORS.get(child_edge_type, "black"),
+            "child_cursors": child_cursors(subtree_index, node),
+        })
+    end = offset + len(page)
+    return {
+        "model_id": model_id,
+        "type": edge_type,
+        "total": total,
+        "next_cursor": str(end) if end < total else None,
+        "children": page,
+    }
+
+
 # 生成大型TOP K base_model网络的函数，默认view_type = 8
 def generate_large_graph_html(eg_graph, top_k):
     # 初始化 PyVis 图
@@ -337,7 +512,7 @@ def generate_large_graph_html(eg_graph, top_k):
 
         # 添加节点到 PyVis 图
         if node not in net.get_nodes():
-            add_node_to_net(net, node, node_attrs, eg_graph)
+            add_node_to_net(net, node, node_attrs, eg_graph, sidebar=False)
 
         # 获取以 base_model 为根节点的子图，并按 influence 排序
         all_successors = list(eg_graph.successors(node))
@@ -349,7 +524,7 @@ def generate_large_graph_html(eg_graph, top_k):
         top_successors = sorted_successors[:TOPK_K]
         # 前五十结点加入图中
         for successor, attrs in top_successors:
-            add_node_to_net(net, successor, attrs, eg_graph)
+            add_node_to_net(net, successor, attrs, eg_graph, sidebar=False)
             # 添加边到图中
             edge_data = eg_graph[node][successor]
             edge_type = edge_data.get("type", "unknown")
@@ -361,9 +536,9 @@ def generate_large_graph_html(eg_graph, top_k):
     
     # 生成 HTML 字符串
     set_physics_options(net)
-    graph_html = net.generate_html()
-    head_html = net.generate_html().split('<head>')[1].split('</head>')[0]
-    body_html = net.generate_html().split('<body>')[1].split('</body>')[0]
+    graph_html = net.generate_html()  # 只生成一次，head 和 body 都从中切出
+    head_html = graph_html.split('<head>')[1].split('</head>')[0]
+    body_html = graph_html.split('<body>')[1].split('</body>')[0]
 
     return head_html, body_html
 
@@ -395,7 +570,7 @@ def generate_specific_large_graph_html(eg_graph, base_models_to_show):
 
         # 添加节点到 PyVis 图
         if node not in net.get_nodes():
-            add_node_to_net(net, node, node_attrs, eg_graph)
+            add_node_to_net(net, node, node_attrs, eg_graph, sidebar=False)
 
         # 获取以 base_model 为根节点的子图，并按 influence 排序
         all_successors = list(eg_graph.successors(node))
@@ -407,7 +582,7 @@ def generate_specific_large_graph_html(eg_graph, base_models_to_show):
         top_successors = sorted_successors[:TOPK_K]
         # 前五十结点加入图中
         for successor, attrs in top_successors:
-            add_node_to_net(net, successor, attrs, eg_graph)
+            add_node_to_net(net, successor, attrs, eg_graph, sidebar=False)
             # 添加边到图中
             edge_data = eg_graph[node][successor]
             edge_type = edge_data.get("type", "unknown")
@@ -419,9 +594,9 @@ def generate_specific_large_graph_html(eg_graph, base_models_to_show):
 
     # 生成 HTML 字符串
     set_physics_options(net)
-    graph_html = net.generate_html()
-    head_html = net.generate_html().split('<head>')[1].split('</head>')[0]
-    body_html = net.generate_html().split('<body>')[1].split('</body>')[0]
+    graph_html = net.generate_html()  # 只生成一次，head 和 body 都从中切出
+    head_html = graph_html.split('<head>')[1].split('</head>')[0]
+    body_html = graph_html.split('<body>')[1].split('</body>')[0]
 
     return head_html, body_html
 
@@ -640,9 +815,9 @@ def generate_graph_html_for2(eg_graph, base_model):
     #return 
     
     set_physics_options(net)
-    graph_html = net.generate_html()  
-    head_html = net.generate_html().split('<head>')[1].split('</head>')[0]
-    body_html = net.generate_html().split('<body>')[1].split('</body>')[0]
+    graph_html = net.generate_html()  # 只生成一次，head 和 body 都从中切出
+    head_html = graph_html.split('<head>')[1].split('</head>')[0]
+    body_html = graph_html.split('<body>')[1].split('</body>')[0]
 
     # 将 head_content 和 body_content 传递给模板
     return head_html, body_html
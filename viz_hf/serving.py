@@ -0,0 +1,107 @@
+# serving.py
+# 多 worker 部署（gunicorn --preload）时在 worker 之间共享图数据，以及查看每个 worker 的独占 / 共享内存。
+#   - 快照的数组都是只读的文件映射，所有 worker 天然共享同一份物理页（page cache）；
+#   - 主进程在 fork 之前加载图并预先建立查找表（模型 id 索引、分类词表等），之后 gc.freeze()
+#     把这些对象移出 GC 的扫描范围，避免 worker 中的垃圾回收改写对象头导致写时复制；
+#   - graph.pkl 模式下整个图都是 Python 对象，同样在 fork 前加载并冻结。
+# 注意：worker 在 fork 之后热更新得到的新图属于各自进程，直到下次重启 gunicorn 才重新共享。
+# 用法：
+#   gunicorn -c gunicorn.conf.py                 启动（见 gunicorn.conf.py）
+#   python serving.py <gunicorn 主进程 pid>       查看主进程与所有 worker 的内存
+#   curl http://localhost:5000/api/memory        查看处理该请求的 worker 的内存
+
+import gc
+import os
+import sys
+
+
+def prepare_for_fork(app):
+    """
+    在 fork worker 之前调用：加载图、建立查找表，然后冻结当前所有对象，并重新开启 GC
+    （gunicorn.conf.py 在加载期间关闭了 GC；冻结的对象不再被扫描，主进程之后的 GC 不会改写它们）。
+    图数据还没有生成时照常启动，与 init_graph_provider 一致，worker 中第一次用到图的请求再加载。
+    Returns:
+        frozen (int): 被冻结的对象数。
+    """
+    provider = app.extensions['graph_provider']
+    try:
+        provider.warm()
+    except FileNotFoundError:
+        pass
+    gc.collect()
+    gc.freeze()
+    gc.enable()
+    return gc.get_freeze_count()
+
+
+def process_memory(pid="self"):
+    """
+    读取 /proc/<pid>/smaps_rollup，返回进程的内存占用（MB）：
+        rss     常驻内存
+        pss     按共享进程数均摊后的内存
+        unique  仅本进程使用的页（Private_Clean + Private_Dirty），即 USS
+        shared  与其他进程共享的页（Shared_Clean + Shared_Dirty）
+    非 Linux 系统上返回 None。
+    """
+    path = f"/proc/{pid}/smaps_rollup"
+    if not os.path.exists(path):
+        return None
+    fields = {}
+    with open(path, "r") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1]) / 1024  # kB -> MB
+    return {
+        "pid": int(pid) if pid != "self" else os.getpid(),
+        "rss": fields.get("Rss", 0.0),
+        "pss": fields.get("Pss", 0.0),
+        "unique": fields.get("Private_Clean", 0.0) + fields.get("Private_Dirty", 0.0),
+        "shared": fields.get("Shared_Clean", 0.0) + fields.get("Shared_Dirty", 0.0),
+    }
+
+
+def child_pids(pid):
+    """gunicorn 主进程的所有 worker 进程号"""
+    children = []
+    task_dir = f"/proc/{pid}/task"
+    for tid in os.listdir(task_dir):
+        path = os.path.join(task_dir, tid, "children")
+        if os.path.exists(path):
+            with open(path, "r") as f:
+                children.extend(int(child) for child in f.read().split())
+    return children
+
+
+def memory_report(master_pid):
+    """主进程与所有 worker 的内存占用列表，第一项为主进程"""
+    reports = [process_memory(master_pid)]
+    for pid in child_pids(master_pid):
+        report = process_memory(pid)
+        if report is not None:
+            reports.append(report)
+    return reports
+
+
+def print_memory_report(reports):
+    print(f"{'pid':>8} {'rss':>10} {'pss':>10} {'unique':>10} {'shared':>10}")
+    for i, report in enumerate(reports):
+        role = "master" if i == 0 else "worker"
+        print(f"{report['pid']:>8} {report['rss']:>8.1f}MB {report['pss']:>8.1f}MB "
+              f"{report['unique']:>8.1f}MB {report['shared']:>8.1f}MB  {role}")
+    workers = reports[1:]
+    if workers:
+        total_unique = sum(report["unique"] for report in workers)
+        total_pss = sum(report["pss"] for report in reports)
+        print(f"{len(workers)} workers: unique {total_unique:.1f}MB in total, "
+              f"{total_unique / len(workers):.1f}MB per worker; PSS of all processes {total_pss:.1f}MB")
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print("Usage: python serving.py <gunicorn master pid>")
+        sys.exit(1)
+    if process_memory(sys.argv[1]) is None:
+        print("需要 Linux 的 /proc/<pid>/smaps_rollup")
+        sys.exit(1)
+    print_memory_report(memory_report(sys.argv[1]))
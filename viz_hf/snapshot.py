@@ -0,0 +1,275 @@
+# snapshot.py
+# 列式图快照的读取（写入见 data_hf/graph_snapshot.py）。
+# 所有数组都以 np.load(mmap_mode='r') 映射，打开快照只需读取 header.json，不需要反序列化整个图。
+
+import json
+import os
+from datetime import date, timedelta
+
+import numpy as np
+
+SNAPSHOT_FORMAT = "llm-eco-viz-graph-snapshot"
+_EPOCH = date(1970, 1, 1)
+
+
+class StringTable:
+    """
+    快照中的字符串表：blob 为所有字符串 UTF-8 字节的拼接，offsets[i]:offsets[i+1] 为第 i 个字符串。
+    单个字符串按需解码；分类属性的词表很小，第一次整体访问时解码并缓存。
+    """
+
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+        self._strings = None
+        self._lookup = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if self._strings is not None:
+            return self._strings[i]
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+    def tolist(self):
+        """解码并缓存全部字符串"""
+        if self._strings is None:
+            data = self.blob.tobytes()
+            bounds = self.offsets.tolist()
+            self._strings = [data[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+        return self._strings
+
+    def index(self, value):
+        """字符串 -> 编号，不存在时返回 None（第一次调用时建立字典）"""
+        if self._lookup is None:
+            self._lookup = {s: i for i, s in enumerate(self.tolist())}
+        return self._lookup.get(value)
+
+
+class GraphSnapshot:
+    """
+    只读的列式图快照。节点用 0..num_nodes-1 的整数编号，与 model_id 字符串表的顺序一致。
+    """
+
+    def __init__(self, path, header, arrays, tables):
+        self.path = path
+        self.header = header
+        self.arrays = arrays
+        self.tables = tables
+        self.version = header["snapshot_id"]
+        self.num_nodes = header["num_nodes"]
+        self.num_edges = header["num_edges"]
+        self.edge_types = header["edge_types"]
+        self.missing_date = header["missing_date"]
+        self.missing_code = header["missing_code"]
+
+    @classmethod
+    def open(cls, path):
+        """
+        打开快照目录，所有数组以内存映射方式加载。
+        Args:
+            path (str): 快照目录路径。
+        Returns:
+            GraphSnapshot 对象。
+        """
+        header_path = os.path.join(path, "header.json")
+        if not os.path.exists(header_path):
+            raise FileNotFoundError(f"快照未找到，路径: {path}")
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"不是有效的图快照: {path}")
+
+        tables = {}
+        for table in header["string_tables"]:
+            tables[table] = StringTable(
+                np.load(os.path.join(path, f"str_{table}_blob.npy"), mmap_mode="r"),
+                np.load(os.path.join(path, f"str_{table}_offsets.npy"), mmap_mode="r"))
+        arrays = {}
+        for filename in os.listdir(path):
+            if filename.endswith(".npy") and not filename.startswith("str_"):
+                arrays[filename[:-4]] = np.load(os.path.join(path, filename), mmap_mode="r")
+        return cls(path, header, arrays, tables)
+
+    # ---- 节点 ----
+
+    @property
+    def model_ids(self):
+        return self.tables["model_id"]
+
+    def node_index(self, model_id):
+        """模型 id -> 节点编号，不存在时返回 None"""
+        return self.model_ids.index(model_id)
+
+    def column(self, name):
+        return self.arrays[name]
+
+    def categorical(self, column, i):
+        """第 i 个节点的分类属性值，编码为 missing_code 时返回 None"""
+        code = int(self.arrays[column][i])
+        if code == self.missing_code:
+            return None
+        return self.tables[self.header["categorical_columns"][column]].tolist()[code]
+
+    def created_at(self, i):
+        """
+        第 i 个节点的创建日期字符串，缺失时返回 None。
+        格式版本 3 起快照保存了原始字符串（与 graph.pkl 中的相同）；更早的快照只有天数，返回 YYYY-MM-DD。
+        """
+        if "created_at" in self.tables:
+            code = int(self.arrays["created_at_code"][i])
+            return None if code == self.missing_code else self.tables["created_at"][code]
+        days = int(self.arrays["created_at"][i])
+        if days == self.missing_date:
+            return None
+        return (_EPOCH + timedelta(days=days)).isoformat()
+
+    def languages(self, i):
+        indptr = self.arrays["language_indptr"]
+        vocab = self.tables["language"].tolist()
+        return [vocab[code] for code in self.arrays["language"][indptr[i]:indptr[i + 1]].tolist()]
+
+    def node_attrs(self, i):
+        """第 i 个节点的属性字典，键与 build_graph 生成的节点属性一致"""
+        attrs = {column: self.categorical(column, i) for column in self.header["categorical_columns"]}
+        for column in self.header["numeric_columns"]:
+            attrs[column] = self.arrays[column][i].item()
+        attrs["created_at"] = self.created_at(i)
+        attrs["language"] = self.languages(i)
+        return attrs
+
+    # ---- 边 ----
+
+    def successors(self, i):
+        """第 i 个节点的子模型编号数组"""
+        indptr = self.arrays["succ_indptr"]
+        return self.arrays["succ_indices"][indptr[i]:indptr[i + 1]]
+
+    def successor_types(self, i):
+        indptr = self.arrays["succ_indptr"]
+        return self.arrays["succ_type"][indptr[i]:indptr[i + 1]]
+
+    def predecessors(self, i):
+        """第 i 个节点的父模型编号数组"""
+        indptr = self.arrays["pred_indptr"]
+        return self.arrays["pred_indices"][indptr[i]:indptr[i + 1]]
+
+    def predecessor_types(self, i):
+        indptr = self.arrays["pred_indptr"]
+        return self.arrays["pred_type"][indptr[i]:indptr[i + 1]]
+
+    def space_table(self):
+        """构图时预先计算的 Space 影响力表：Space id -> 时间衰减后的 likes"""
+        return dict(zip(self.tables["space_id"].tolist(), self.arrays["space_table_influence"].tolist()))
+
+    def warm(self):
+        """
+        预先建立模型 id 索引并解码所有分类词表。多 worker 部署时在 fork 之前调用，这些对象由所有 worker 共享。
+        """
+        self.model_ids.index(None)
+        for table in self.tables.values():
+            if table is not self.model_ids:
+                table.tolist()
+        return self
+
+    def as_graph(self):
+        """返回与 EasyGraph DiGraph 接口兼容的只读视图，供现有的 graph.nodes / successors 等调用使用"""
+        return SnapshotGraph(self)
+
+
+class SnapshotNodeView:
+    """graph.nodes 的只读视图：模型 id -> 属性字典，属性在访问时才从列中解码"""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return self.snapshot.num_nodes
+
+    def __iter__(self):
+        return iter(self.snapshot.model_ids.tolist())
+
+    def __contains__(self, model_id):
+        return self.snapshot.node_index(model_id) is not None
+
+    def __getitem__(self, model_id):
+        i = self.snapshot.node_index(model_id)
+        if i is None:
+            raise KeyError(model_id)
+        return self.snapshot.node_attrs(i)
+
+    def get(self, model_id, default=None):
+        i = self.snapshot.node_index(model_id)
+        return default if i is None else self.snapshot.node_attrs(i)
+
+    def keys(self):
+        return self.snapshot.model_ids.tolist()
+
+    def values(self):
+        return (self.snapshot.node_attrs(i) for i in range(self.snapshot.num_nodes))
+
+    def items(self):
+        return zip(self.snapshot.model_ids.tolist(), self.values())
+
+
+class SnapshotGraph:
+    """
+    GraphSnapshot 的 EasyGraph 兼容视图，支持 graph.nodes、graph.successors(node)、graph.predecessors(node)、
+    graph[u][v]['type'] 和 graph.graph，节点用模型 id 表示。
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.nodes = SnapshotNodeView(snapshot)
+        self._graph = None
+
+    @property
+    def graph(self):
+        if self._graph is None:
+            header = self.snapshot.header
+            categories = {column: self.snapshot.tables[table].tolist()
+                          for column, table in header["categorical_columns"].items()}
+            categories["language"] = self.snapshot.tables["language"].tolist()
+            self._graph = {"space_influence": self.snapshot.space_table(), "categories": categories}
+        return self._graph
+
+    def warm(self):
+        """见 GraphSnapshot.warm，同时建立 graph.graph 中的 Space 表和分类词表"""
+        self.snapshot.warm()
+        self.graph
+        return self
+
+    def _index(self, model_id):
+        i = self.snapshot.node_index(model_id)
+        if i is None:
+            raise KeyError(model_id)
+        return i
+
+    def number_of_nodes(self):
+        return self.snapshot.num_nodes
+
+    def number_of_edges(self):
+        return self.snapshot.num_edges
+
+    def successors(self, model_id):
+        model_ids = self.snapshot.model_ids
+        return iter([model_ids[j] for j in self.snapshot.successors(self._index(model_id)).tolist()])
+
+    def predecessors(self, model_id):
+        model_ids = self.snapshot.model_ids
+        return iter([model_ids[j] for j in self.snapshot.predecessors(self._index(model_id)).tolist()])
+
+    def __getitem__(self, model_id):
+        """graph[u] -> {v: {'type': 边类型}}"""
+        i = self._index(model_id)
+        model_ids = self.snapshot.model_ids
+        edge_types = self.snapshot.edge_types
+        return {model_ids[j]: {"type": edge_types[t]}
+                for j, t in zip(self.snapshot.successors(i).tolist(), self.snapshot.successor_types(i).tolist())}
+
+    def __contains__(self, model_id):
+        return model_id in self.nodes
+
+    def __len__(self):
+        return self.snapshot.num_nodes
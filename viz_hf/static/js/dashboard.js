@@ -1,17 +1,110 @@
 // global_dashboard/static/js/dashboard.js
 
 document.addEventListener('DOMContentLoaded', function () {
-    // 获取嵌入的数据，使用默认值确保不会出现 Undefined
-    const languageInfo = window.dashboardData.languageInfo || {};
-    const orgTypeInfo = window.dashboardData.orgTypeInfo || {};
-    const taskTypeInfo = window.dashboardData.taskTypeInfo || {};
-    const authorInfo = window.dashboardData.authorInfo || {};
-
-    const languageDict = window.dashboardData.languageDict || {};
-    const orgTypeDict = window.dashboardData.orgTypeDict || {};
-    const taskTypeDict = window.dashboardData.taskTypeDict || {};
-    const authorDict = window.dashboardData.authorDict || {};
-    const top20Models = window.dashboardData.top20_models || [];
+    // 数据不再内嵌在页面中，从 /dashboard/api/data 获取
+    fetch(window.dashboardDataUrl)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(renderDashboard)
+        .catch(error => console.error('加载大屏数据失败：', error));
+
+    // 生态增长趋势：切换维度或指标时重新请求（服务端只做数组切片）
+    const dimensionSelect = document.getElementById('timelineDimension');
+    const metricSelect = document.getElementById('timelineMetric');
+    if (dimensionSelect && metricSelect) {
+        const reload = () => loadTimeline(dimensionSelect.value, metricSelect.value);
+        dimensionSelect.addEventListener('change', reload);
+        metricSelect.addEventListener('change', reload);
+        reload();
+    }
+});
+
+let timelineChart = null;
+
+function loadTimeline(dimension, metric) {
+    const params = new URLSearchParams({
+        dimension: dimension,
+        metric: metric,
+        // 新增模型数按月显示，下载量和影响力显示累计值
+        cumulative: metric === 'count' ? '0' : '1',
+        top: '8'
+    });
+    fetch(`${window.dashboardTimelineUrl}?${params}`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(renderTimeline)
+        .catch(error => console.error('加载增长趋势失败：', error));
+}
+
+function renderTimeline(data) {
+    const canvas = document.getElementById('timelineChart');
+    if (!canvas) {
+        console.error('找不到 #timelineChart 元素！');
+        return;
+    }
+    const palette = ['#00e6e6', '#ff4081', '#ffd54f', '#7c4dff', '#69f0ae', '#ff6e40', '#40c4ff', '#eeff41', '#9e9e9e'];
+    const datasets = (data.series || []).map((series, i) => ({
+        label: series.name,
+        data: series.values,
+        borderColor: palette[i % palette.length],
+        backgroundColor: palette[i % palette.length],
+        fill: false,
+        tension: 0.2,
+        pointRadius: 0
+    }));
+
+    if (timelineChart) {
+        timelineChart.destroy();
+    }
+    timelineChart = new Chart(canvas.getContext('2d'), {
+        type: 'line',
+        data: { labels: data.months || [], datasets: datasets },
+        options: {
+            responsive: true,
+            interaction: { mode: 'index', intersect: false },
+            plugins: {
+                legend: { labels: { color: '#ffffff' } }
+            },
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: { color: '#ffffff' },
+                    grid: { color: '#444' }
+                },
+                x: {
+                    title: {
+                        display: true,
+                        text: '创建月份',
+                        color: '#ffffff'
+                    },
+                    ticks: { color: '#ffffff' },
+                    grid: { color: '#444' }
+                }
+            }
+        }
+    });
+}
+
+function renderDashboard(data) {
+    // 使用默认值确保不会出现 Undefined
+    const languageInfo = data.language_info || {};
+    const orgTypeInfo = data.org_type_info || {};
+    const taskTypeInfo = data.task_type_info || {};
+    const authorInfo = data.author_info || {};
+
+    const languageDict = data.language_dict || {};
+    const orgTypeDict = data.org_type_dict || {};
+    const taskTypeDict = data.task_type_dict || {};
+    const authorDict = data.author_dict || {};
+    const top20Models = data.top20_models || [];
 
     // 获取CSS变量，如果没有定义，提供默认颜色
     const rootStyles = getComputedStyle(document.documentElement);
@@ -600,4 +693,4 @@ document.addEventListener('DOMContentLoaded', function () {
         // 显示模态框
         top10Modal.show();
     }
-});
+}
@@ -25,10 +25,172 @@ function changeView(viewType) {
 // 页面加载完成时设置选中项
 window.onload = setSelectedView;
 
+// 侧边栏数据接口：节点中不再内嵌侧边栏 HTML，点击时按需请求
+const NODE_API = "/network/api/node/";
+const nodeDetailsCache = {};
+
+// 模型 id 中的 "/" 保留为路径分隔符，其余字符转义
+function modelPath(nodeId) {
+    return nodeId.split("/").map(encodeURIComponent).join("/");
+}
+
+// 根据值计算背景颜色和文字颜色（与 network_graph/utils.py 的 calculate_color 相同）
+function calculateColor(value, maxValue, colorStart, colorEnd, textColorLight = "#FFFFFF", textColorDark = "#333333") {
+    const normalized = Math.min(1.0, Math.max(0.0, Math.sqrt(value / maxValue)));
+    const [r, g, b] = [0, 1, 2].map(i => Math.trunc(colorStart[i] + (colorEnd[i] - colorStart[i]) * normalized));
+    const brightness = (r * 0.299 + g * 0.587 + b * 0.114) / 255;
+    return [`rgba(${r}, ${g}, ${b}, 0.8)`, brightness < 0.5 ? textColorLight : textColorDark];
+}
+
+// 转义插入 HTML 的文本
+function escapeHtml(value) {
+    return String(value ?? "unknown").replace(/[&<>"']/g, c => ({"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"})[c]);
+}
+
+// 侧边栏模板（与原来内嵌在节点中的 HTML 相同）
+function renderNodeDetails(d) {
+    const authorTypeOnBoard = d.author_type === "usr" ? "an individual user" : d.author_type === "org" ? "an organization" : "unknown";
+    const categoryHtml = d.parent
+        ? `A <span style="font-weight: bold;">${escapeHtml(d.parent_edge_type)}</span> version of
+           <a href="https://huggingface.co/${escapeHtml(d.parent)}" target="_blank" style="color: #007bff; text-decoration: none;">${escapeHtml(d.parent)}</a>`
+        : "a base model";
+    const [likesBg, likesText] = calculateColor(d.likes, 1000, [251, 233, 231], [217, 83, 79]);
+    const [downloadsBg, downloadsText] = calculateColor(d.downloads, 300000, [233, 247, 239], [40, 167, 69]);
+    const [influenceBg, influenceText] = calculateColor(d.influence, 1000, [255, 249, 231], [240, 173, 78]);
+    const box = "padding: 10px 15px; border-radius: 5px; margin-bottom: 15px; box-shadow: 0 1px 4px rgba(0, 0, 0, 0.1);";
+    const modelUrl = `https://huggingface.co/${escapeHtml(d.id)}`;
+    return `
+    <div style="font-family: 'Roboto', sans-serif; color: #333; line-height: 1.6; max-width: 400px; margin: 0 auto;">
+        <div style="display: flex; align-items: center; margin-bottom: 20px;">
+            <div style="max-width: 70px; max-height: 70px; border-radius: 50%; background: linear-gradient(135deg, #a8edea, #fed6e3); overflow: hidden; display: inline-block; box-shadow: 0 2px 6px rgba(0, 0, 0, 0.2);">
+                <img src="${escapeHtml(d.pic)}" alt="${escapeHtml(d.id)}" style="width: 100%; height: auto; display: block;">
+            </div>
+            <h2 style="margin-left: 15px; font-size: 18px; font-weight: bold;">${escapeHtml(d.id)}</h2>
+        </div>
+        <div style="background: #f0f0f0; ${box}">
+            <p style="margin: 0; font-size: 14px;"><strong>Created at: </strong>${escapeHtml(d.created_at)}</p>
+        </div>
+        <div style="background: #f0f0f0; ${box}">
+            <p style="margin: 0; font-size: 14px;"><strong>Author:</strong> <a href="https://huggingface.co/${escapeHtml(d.author)}" target="_blank" style="color: #007bff; text-decoration: none;">${escapeHtml(d.author_full_name)}</a> <span style="color: #666;">(${authorTypeOnBoard})</span></p>
+        </div>
+        <div style="background: #f0f0f0; ${box}">
+            <p style="margin: 0; font-size: 14px;"><strong>Category:</strong> ${categoryHtml}</p>
+        </div>
+        <div style="display: flex; justify-content: space-between; margin-bottom: 15px;">
+            <div style="flex: 1; text-align: center; padding: 10px; background: ${downloadsBg}; color: ${downloadsText}; border-radius: 5px; margin-right: 10px; box-shadow: 0 1px 4px rgba(0, 0, 0, 0.1);">
+                <p style="margin: 0; font-size: 14px;"><strong>Downloads</strong></p>
+                <p style="margin: 0; font-size: 16px; font-weight: bold;">${escapeHtml(d.downloads)}</p>
+            </div>
+            <div style="flex: 1; text-align: center; padding: 10px; background: ${likesBg}; color: ${likesText}; border-radius: 5px; margin-left: 10px; box-shadow: 0 1px 4px rgba(0, 0, 0, 0.1);">
+                <p style="margin: 0; font-size: 14px;"><strong>Likes</strong></p>
+                <p style="margin: 0; font-size: 16px; font-weight: bold;">${escapeHtml(d.likes)}</p>
+            </div>
+        </div>
+        <div style="background: ${influenceBg}; color: ${influenceText}; padding: 15px; ${box.replace("padding: 10px 15px; ", "")} text-align: center;">
+            <p style="margin: 0; font-size: 14px;"><strong>Influence</strong></p>
+            <p style="margin: 0; font-size: 20px; font-weight: bold;">${Number(d.influence).toFixed(2)}</p>
+        </div>
+        <div style="background: #e3f2fd; ${box}">
+            <p style="margin: 0; font-size: 14px;"><strong>Model URL:</strong> <a href="${modelUrl}" target="_blank" style="color: #007bff; text-decoration: none;">${modelUrl}</a></p>
+        </div>
+    </div>`;
+}
+
+// 取出（必要时请求）模型的侧边栏信息
+function fetchNodeDetails(nodeId) {
+    if (!nodeDetailsCache[nodeId]) {
+        nodeDetailsCache[nodeId] = fetch(NODE_API + modelPath(nodeId)).then(response => {
+            if (!response.ok) {
+                delete nodeDetailsCache[nodeId];
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        });
+    }
+    return nodeDetailsCache[nodeId];
+}
+
+// 渐进展开视图（view_type=9）：节点上的 child_cursors 记录每种衍生类型下一页子模型的游标，点击时按游标加载
+const CHILDREN_API = "/network/api/children/";
+const expanding = new Set();
+let edgeKeys = null;
+
+// 加载一页子模型并加到图中，已经在图中的节点不重复添加
+function expandNode(nodeId) {
+    const cursors = nodes.get(nodeId).child_cursors;
+    if (!cursors || Object.keys(cursors).length === 0 || expanding.has(nodeId)) {
+        return;
+    }
+    if (edgeKeys === null) {
+        edgeKeys = new Set(edges.get().map(edge => `${edge.from}\u0000${edge.to}`));
+    }
+    expanding.add(nodeId);
+    const requests = Object.entries(cursors).map(([type, cursor]) =>
+        fetch(`${CHILDREN_API}${modelPath(nodeId)}?type=${encodeURIComponent(type)}&cursor=${encodeURIComponent(cursor)}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            })
+            .then(page => {
+                const newNodes = [];
+                const newEdges = [];
+                page.children.forEach(child => {
+                    if (!nodes.get(child.id)) {
+                        newNodes.push({
+                            id: child.id, label: child.id, shape: "image", image: child.image, size: child.size,
+                            title: child.title, font: {size: 0}, color: "#97c2fc", child_cursors: child.child_cursors,
+                        });
+                    }
+                    const key = `${nodeId}\u0000${child.id}`;
+                    if (!edgeKeys.has(key)) {
+                        edgeKeys.add(key);
+                        newEdges.push({from: nodeId, to: child.id, color: child.edge_color, title: child.edge_type, arrows: "to"});
+                    }
+                });
+                nodes.add(newNodes);
+                edges.add(newEdges);
+                return [type, page.next_cursor];
+            }));
+    Promise.allSettled(requests).then(results => {
+        // 加载成功的类型更新游标（没有下一页时删除），失败的保留，下次点击时重试
+        const next = Object.assign({}, cursors);
+        results.forEach(result => {
+            if (result.status === "fulfilled") {
+                const [type, cursor] = result.value;
+                if (cursor === null) {
+                    delete next[type];
+                } else {
+                    next[type] = cursor;
+                }
+            }
+        });
+        nodes.update({id: nodeId, child_cursors: next});
+        expanding.delete(nodeId);
+    });
+}
+
 // 监听节点点击事件
 network.on("selectNode", function (params) {
     var nodeId = params.nodes[0]; // 获取节点 ID
     var nodeDetails = nodes.get(nodeId); // 获取节点数据
-    var customDetails = nodeDetails.things_to_show_on_sidebar; // 获取自定义信息（HTML）
-    document.getElementById("node-details").innerHTML = customDetails; // 更新侧边栏内容
+    var sidebar = document.getElementById("node-details");
+    expandNode(nodeId);
+    // 同作者折叠视图的作者节点仍内嵌侧边栏 HTML
+    if (nodeDetails.things_to_show_on_sidebar) {
+        sidebar.innerHTML = nodeDetails.things_to_show_on_sidebar;
+        return;
+    }
+    sidebar.innerHTML = "<p>Loading...</p>";
+    fetchNodeDetails(nodeId)
+        .then(details => {
+            // 请求返回前用户可能已经点了别的节点
+            if (network.getSelectedNodes()[0] === nodeId) {
+                sidebar.innerHTML = renderNodeDetails(details);
+            }
+        })
+        .catch(error => {
+            sidebar.innerHTML = `<p>Failed to load model details (${escapeHtml(error.message)}).</p>`;
+        });
 });
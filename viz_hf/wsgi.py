@@ -0,0 +1,9 @@
+# wsgi.py
+# gunicorn 入口（见 gunicorn.conf.py）。开启 preload_app 时本模块在主进程中执行一次，
+# 图数据在 fork 之前加载并冻结，所有 worker 共享同一份内存。
+
+from app import create_app
+from serving import prepare_for_fork
+
+app = create_app()
+prepare_for_fork(app)